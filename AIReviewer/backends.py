@@ -0,0 +1,38 @@
+import importlib
+import threading
+
+# Modules and classes of the backends of the algorithms. A backend module, and the SDK it needs,
+# is imported when its algorithm is used for the first time, so startup does not pay for unused SDKs.
+BACKENDS = {
+    'PyLint': ('AIReviewer.pylint_collector', 'PylintBackend'),
+    'OpenAI': ('AIReviewer.openai_interface', 'OpenAIBackend'),
+}
+
+# Names of the algorithms, in the order offered to the user
+ALGORITHMS = list(BACKENDS)
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name):
+    """
+    Gets the backend of the algorithm, importing its module on the first call.
+
+    Args:
+        name (str): Name of the algorithm, e.g. 'PyLint'.
+
+    Returns:
+        The backend shared by the whole process.
+
+    Raises:
+        ValueError: If there is no backend of the algorithm.
+    """
+    with _backends_lock:
+        if (backend := _backends.get(name)) is None:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown algorithm {name!r}, expected one of {', '.join(ALGORITHMS)}")
+            module_name, class_name = BACKENDS[name]
+            backend = _backends[name] = getattr(importlib.import_module(module_name), class_name)()
+        return backend
+
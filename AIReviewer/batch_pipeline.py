@@ -0,0 +1,423 @@
+import json
+import os
+import time
+
+import openai
+
+from AIReviewer.batch_review import format_errors
+from AIReviewer.code_chunker import remap_detection
+from AIReviewer.file_catalog import hash_file
+from AIReviewer.file_parser import FileParser
+from AIReviewer.metrics import metrics
+from AIReviewer.openai_interface import ErrorsDetector, ErrorsSolver
+from AIReviewer.transport import RETRYABLE_ERRORS, get_transport
+
+# Endpoint of the requests of the batches
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# Maximum number of requests of a single batch accepted by the API
+MAX_BATCH_REQUESTS = 50000
+
+# Statuses of a batch which will not change anymore
+FINISHED_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+# Statuses of a batch whose requests have to be submitted again
+UNSUCCESSFUL_STATUSES = {'failed', 'expired', 'cancelled'}
+
+# File of the work directory with the identifiers of the submitted batches by the hashes of their input files,
+# a batch is removed once its results are downloaded
+SUBMITTED_BATCHES_FILE = 'submitted-batches.json'
+
+
+class BatchPipeline:
+    """
+    Reviews many files with OpenAI through the Batch API, for scheduled runs which do not wait for the results.
+
+    All detection prompts are written to a JSONL file of batch requests, which is uploaded and submitted
+    as a batch. Once the batch completes, its results are assembled into the error maps of the files the same
+    way as the interactive detection does. Optionally, the corrections of all code blocks with errors are
+    requested by a second batch. The error maps and the corrections are stored in the caches, so the app
+    shows them without any further requests, and the files and prompts found in the caches are not sent again.
+    The submitted batches are recorded in the work directory, so a run stopped before its batches finished
+    waits for the same batches when it is started again instead of submitting them again.
+    """
+
+    def __init__(self, work_dir, cache=None, correction_cache=None, with_corrections=False, changed_lines=None,
+                 poll_interval=30.0, timeout=None, transport=None):
+        """
+        Initializes the pipeline.
+
+        Parameters:
+        work_dir (str): Directory of the JSONL files of the requests and the results, created if missing.
+        cache (AnalysisCache): Optional cache of the detected errors.
+        correction_cache (CorrectionCache): Optional cache of the corrections.
+        with_corrections (bool): Whether the corrections of the code blocks with errors are requested as well.
+        changed_lines (dict): Optional changed line numbers by the absolute paths of the files,
+                              as returned by `git_diff.get_changed_lines`.
+        poll_interval (float): Seconds between the checks of the status of a batch.
+        timeout (float): Seconds to wait for a batch, forever if None.
+        transport (LLMTransport): The transport whose client sends the requests and which retries them
+                                  on transient errors, the shared transport by default.
+        """
+        self.work_dir = work_dir
+        self.cache = cache
+        self.correction_cache = correction_cache
+        self.with_corrections = with_corrections
+        self.changed_lines = changed_lines
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.transport = transport or get_transport()
+        self.client = self.transport.client
+
+    def review(self, root, file_paths, writers):
+        """
+        Reviews the files and passes the results to the writers once all batches finished.
+
+        Parameters:
+        root (str): The reviewed directory, reported paths are relative to it.
+        file_paths (list): Paths of the files to review.
+        writers (list): Result writers receiving the result of each file.
+
+        Returns:
+        int: Number of reviewed files.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        results = []
+        error_maps = []
+        for file_path, result in zip(file_paths, self.detect_errors(file_paths)):
+            result['path'] = os.path.relpath(file_path, root).replace(os.sep, '/')
+            result['algorithm'] = 'OpenAI'
+            results.append(result)
+            error_maps.append(result.pop('line_numbers', None))
+
+        if self.with_corrections:
+            for result, corrections in zip(results, self.correct_errors(file_paths, error_maps)):
+                if corrections is not None:
+                    result['corrections'] = corrections
+
+        for result in results:
+            for writer in writers:
+                writer.write(result)
+        return len(results)
+
+    def detect_errors(self, file_paths):
+        """
+        Detects the errors of the files by a batch, the cached error maps are used instead where available.
+
+        Parameters:
+        file_paths (list): Paths of the files.
+
+        Returns:
+        list: For each file a dict with the keys 'errors' and 'line_numbers', the error map, or 'error'
+              if the detection failed.
+        """
+        detector = ErrorsDetector()
+        results = [{} for _ in file_paths]
+        pending = {}
+        requests = []
+        for index, file_path in enumerate(file_paths):
+            changed_lines = self.changed_lines.get(os.path.abspath(file_path)) if self.changed_lines else None
+            file_parser = FileParser(file_path, cache=self.cache, changed_lines=changed_lines)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    file_content = f.read()
+                line_numbers = file_parser.get_cached_errors('OpenAI')
+                if self.cache is not None:
+                    metrics.record_cache_lookup('analysis', line_numbers is not None)
+                if line_numbers is not None:
+                    results[index] = {'errors': format_errors(line_numbers), 'line_numbers': line_numbers}
+                    continue
+                chunks = detector.get_detection_chunks(file_content, changed_lines)
+            except SyntaxError:
+                # The syntax error is reported without a request, as by the interactive detection
+                line_numbers = file_parser.get_errors_from_file('OpenAI')
+                results[index] = {'errors': format_errors(line_numbers), 'line_numbers': line_numbers}
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                results[index] = {'error': f"{type(e).__name__}: {e}"}
+                continue
+            pending[index] = (file_parser, file_content, chunks)
+            requests += [
+                self.create_request(f"detection-{index}-{chunk_index}",
+                                    {'model': detector.MODEL, 'messages': detector.create_messages(chunk.content),
+                                     'temperature': 0})
+                for chunk_index, chunk in enumerate(chunks)
+            ]
+
+        outputs = self.run_batches(requests, 'detection')
+        for index, (file_parser, file_content, chunks) in pending.items():
+            try:
+                detected_errors = []
+                for chunk_index, chunk in enumerate(chunks):
+                    detected_errors += remap_detection(
+                        self.get_output(outputs, f"detection-{index}-{chunk_index}"), chunk.line_map
+                    )
+                line_numbers = file_parser.build_error_map(file_parser.parse_detected_errors(detected_errors),
+                                                           file_content.splitlines(),
+                                                           file_parser.build_node_index(file_content))
+            except (RuntimeError, SyntaxError) as e:
+                results[index] = {'error': f"{type(e).__name__}: {e}"}
+                continue
+            if self.cache is not None:
+                key = self.cache.make_key(file_content, 'OpenAI', file_parser.get_backend_fingerprint('OpenAI'))
+                self.cache.set_errors(key, line_numbers, os.path.abspath(file_parser.file_path))
+            results[index] = {'errors': format_errors(line_numbers), 'line_numbers': line_numbers}
+        return results
+
+    def correct_errors(self, file_paths, error_maps):
+        """
+        Requests the corrections of all code blocks with errors by a batch, the cached corrections
+        are used instead where available.
+
+        Parameters:
+        file_paths (list): Paths of the files.
+        error_maps (list): The error map of each file, None for the files whose detection failed.
+
+        Returns:
+        list: For each file the list of dicts with the keys 'block_start', 'block_end' and 'correction',
+              or 'error' if the correction failed, None for the files without an error map.
+        """
+        solver = ErrorsSolver()
+        corrections = [None] * len(file_paths)
+        pending = []
+        requests = []
+        for index, line_numbers in enumerate(error_maps):
+            if line_numbers is None:
+                continue
+            corrections[index] = []
+            for block, errors in FileParser.group_errors_by_block(line_numbers).items():
+                messages = solver.create_block_messages(
+                    errors[0].code_block, [(error.line_number, error.char_number, error.error_msg) for error in errors]
+                )
+                correction = {'block_start': block[0] + 1, 'block_end': block[1] + 1}
+                corrections[index].append(correction)
+                key = self.correction_cache.make_key(solver.MODEL, messages) if self.correction_cache else None
+                if key is not None and (cached := self.correction_cache.get(key)) is not None:
+                    metrics.record_cache_lookup('correction', True)
+                    correction['correction'] = cached
+                    continue
+                if key is not None:
+                    metrics.record_cache_lookup('correction', False)
+                custom_id = f"correction-{index}-{block[0]}"
+                pending.append((custom_id, correction, key, os.path.abspath(file_paths[index])))
+                requests.append(self.create_request(custom_id, {'model': solver.MODEL, 'messages': messages}))
+
+        outputs = self.run_batches(requests, 'correction')
+        for custom_id, correction, key, tag in pending:
+            try:
+                correction['correction'] = self.get_output(outputs, custom_id)
+            except RuntimeError as e:
+                correction['error'] = f"{type(e).__name__}: {e}"
+                continue
+            if key is not None:
+                self.correction_cache.set(key, correction['correction'], tag)
+        return corrections
+
+    @staticmethod
+    def create_request(custom_id, body):
+        """
+        Creates a line of the batch input file.
+
+        Parameters:
+        custom_id (str): Identifier of the request, unique within the batch.
+        body (dict): Arguments of the chat completion request.
+
+        Returns:
+        dict: The batch request.
+        """
+        return {'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': body}
+
+    @staticmethod
+    def get_output(outputs, custom_id):
+        """
+        Gets the completion of a request from the outputs of the batches.
+
+        Parameters:
+        outputs (dict): The outputs returned by `run_batches`.
+        custom_id (str): Identifier of the request.
+
+        Returns:
+        str: The content of the completion.
+
+        Raises:
+        RuntimeError: If the request failed or has no output.
+        """
+        output = outputs.get(custom_id)
+        if output is None:
+            raise RuntimeError(f"No result of the batch request {custom_id}")
+        if isinstance(output, Exception):
+            raise output
+        return output
+
+    def run_batches(self, requests, name):
+        """
+        Submits the requests as batches of at most `MAX_BATCH_REQUESTS` requests and waits for all of them.
+
+        Parameters:
+        requests (list): The batch requests created by `create_request`.
+        name (str): Name of the kind of the requests, used in the names of the files.
+
+        Returns:
+        dict: The content of each completion by the identifier of its request, or a RuntimeError
+              if the request failed.
+        """
+        submitted_batches = self.load_submitted_batches()
+        batch_ids = []
+        for start in range(0, len(requests), MAX_BATCH_REQUESTS):
+            input_path = os.path.join(self.work_dir, f"{name}-{start // MAX_BATCH_REQUESTS}-input.jsonl")
+            self.write_requests(requests[start:start + MAX_BATCH_REQUESTS], input_path)
+            input_hash = hash_file(input_path)
+            batch_id = submitted_batches.get(input_hash)
+            if batch_id is not None and self.can_resume(batch_id):
+                metrics.increment('batches_resumed')
+            else:
+                batch_id = submitted_batches[input_hash] = self.submit(input_path)
+                self.save_submitted_batches(submitted_batches)
+            batch_ids.append((input_hash, batch_id))
+
+        outputs = {}
+        for input_hash, batch_id in batch_ids:
+            outputs.update(self.download_outputs(self.wait(batch_id)))
+            del submitted_batches[input_hash]
+            self.save_submitted_batches(submitted_batches)
+        return outputs
+
+    def load_submitted_batches(self):
+        """
+        Loads the batches submitted by the previous runs whose results were not downloaded.
+
+        Returns:
+        dict: The identifiers of the batches by the hashes of their input files.
+        """
+        try:
+            with open(os.path.join(self.work_dir, SUBMITTED_BATCHES_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_submitted_batches(self, submitted_batches):
+        """
+        Saves the batches whose results were not downloaded yet.
+
+        Parameters:
+        submitted_batches (dict): The identifiers of the batches by the hashes of their input files.
+        """
+        with open(os.path.join(self.work_dir, SUBMITTED_BATCHES_FILE), 'w', encoding='utf-8') as f:
+            json.dump(submitted_batches, f, indent=1)
+
+    def can_resume(self, batch_id):
+        """
+        Checks whether a batch submitted by a previous run still runs or completed.
+
+        Parameters:
+        batch_id (str): The identifier of the batch.
+
+        Returns:
+        bool: False if the batch does not exist anymore or it failed, expired or was cancelled.
+        """
+        try:
+            batch = self.transport.call(self.client.batches.retrieve, batch_id)
+        except openai.NotFoundError:
+            return False
+        return batch.status not in UNSUCCESSFUL_STATUSES
+
+    @staticmethod
+    def write_requests(requests, input_path):
+        """
+        Writes the batch input file.
+
+        Parameters:
+        requests (list): The batch requests created by `create_request`.
+        input_path (str): Path to the JSONL file.
+        """
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                f.write(json.dumps(request) + '\n')
+
+    def submit(self, input_path):
+        """
+        Uploads the batch input file and creates the batch.
+
+        Parameters:
+        input_path (str): Path to the JSONL file of the requests.
+
+        Returns:
+        str: The identifier of the batch.
+        """
+        def upload():
+            # Opened for each attempt, a failed attempt may have read a part of the file
+            with open(input_path, 'rb') as f:
+                return self.client.files.create(file=f, purpose='batch')
+
+        input_file = self.transport.call(upload)
+        batch = self.transport.call(self.client.batches.create, input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                    completion_window='24h')
+        metrics.increment('batches_submitted')
+        return batch.id
+
+    def wait(self, batch_id):
+        """
+        Polls the batch until it finishes. The batch keeps running when a check fails on transient errors
+        even after the retries of the transport, so the polling continues until the timeout.
+
+        Parameters:
+        batch_id (str): The identifier of the batch.
+
+        Returns:
+        openai.types.Batch: The finished batch.
+
+        Raises:
+        TimeoutError: If the batch did not finish within the timeout.
+        """
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        status = None
+        with metrics.span('batch.wait', batch=batch_id):
+            while True:
+                try:
+                    batch = self.transport.call(self.client.batches.retrieve, batch_id)
+                except RETRYABLE_ERRORS:
+                    metrics.increment('batch_poll_errors')
+                else:
+                    if batch.status in FINISHED_STATUSES:
+                        return batch
+                    status = batch.status
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Batch {batch_id} did not finish in {self.timeout} s, it is {status}")
+                time.sleep(self.poll_interval)
+
+    def download_outputs(self, batch):
+        """
+        Downloads the results of the finished batch and keeps a copy in the work directory.
+
+        Parameters:
+        batch (openai.types.Batch): The finished batch.
+
+        Returns:
+        dict: The content of each completion by the identifier of its request, or a RuntimeError
+              if the request failed.
+        """
+        outputs = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = self.transport.call(self.client.files.content, file_id).text
+            with open(os.path.join(self.work_dir, f"{batch.id}-{file_id}.jsonl"), 'w', encoding='utf-8') as f:
+                f.write(content)
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                output = json.loads(line)
+                response = output.get('response') or {}
+                if output.get('error') or response.get('status_code') != 200:
+                    error = output.get('error') or response.get('body', {}).get('error') or response
+                    outputs[output['custom_id']] = RuntimeError(f"Batch request failed: {error}")
+                    continue
+                body = response['body']
+                if usage := body.get('usage'):
+                    metrics.increment('openai_tokens', usage['prompt_tokens'], kind='prompt', model=body['model'])
+                    metrics.increment('openai_tokens', usage['completion_tokens'], kind='completion',
+                                      model=body['model'])
+                outputs[output['custom_id']] = body['choices'][0]['message']['content']
+        if batch.status != 'completed':
+            metrics.increment('batches_failed', status=batch.status)
+        return outputs
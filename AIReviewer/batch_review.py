@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+
+from AIReviewer.file_catalog import iter_python_files
+from AIReviewer.file_parser import FileParser
+
+
+def discover_python_files(root, exclude=()):
+    """
+    Recursively finds all Python files under the root directory, skipping the paths ignored by .gitignore files.
+
+    Parameters:
+    root (str): The directory to search.
+    exclude (list): Glob patterns of paths relative to the root which are skipped.
+
+    Returns:
+    list: Sorted paths of the found Python files.
+    """
+    return sorted(entry.path for entry in iter_python_files(root, exclude))
+
+
+def format_errors(line_numbers):
+    """
+    Converts the error map of a file to the errors of a review result.
+
+    Parameters:
+    line_numbers (dict): The errors as returned by `FileParser.get_errors_from_file`.
+
+    Returns:
+    list: The errors as dicts with the keys 'line', 'column', 'message', 'block_start' and 'block_end'.
+    """
+    return [
+        {
+            'line': error.line_number,
+            'column': error.char_number,
+            'message': error.error_msg,
+            'block_start': error.start_line + 1,
+            'block_end': error.end_line + 1,
+        }
+        for line_errors in line_numbers.values()
+        for error in line_errors
+    ]
+
+
+class BatchReviewer:
+    """
+    Reviews many files at once without the Streamlit UI.
+
+    PyLint runs in a pool of worker processes, OpenAI detection runs with a bounded number of requests in flight,
+    and the results are handed to the writers as soon as each file is finished.
+    """
+
+    def __init__(self, algorithms, pylint_pool=None, cache=None, openai_concurrency=8, changed_lines=None):
+        """
+        Initializes the reviewer.
+
+        Parameters:
+        algorithms (list): The algorithms to run on each file, 'PyLint' and/or 'OpenAI'.
+        pylint_pool (PylintWorkerPool): Pool of PyLint workers, required when 'PyLint' is among the algorithms.
+        cache (AnalysisCache): Optional cache of the detected errors.
+        openai_concurrency (int): Maximum number of OpenAI detection requests in flight.
+        changed_lines (dict): Optional changed line numbers by the absolute paths of the files,
+                              as returned by `git_diff.get_changed_lines`. When given, only the errors
+                              on the changed lines of each file are reported.
+        """
+        self.algorithms = algorithms
+        self.pylint_pool = pylint_pool
+        self.cache = cache
+        self.openai_concurrency = openai_concurrency
+        self.changed_lines = changed_lines
+
+    def review(self, root, file_paths, writers):
+        """
+        Reviews the files and streams the results to the writers.
+
+        Parameters:
+        root (str): The reviewed directory, reported paths are relative to it.
+        file_paths (list): Paths of the files to review.
+        writers (list): Result writers receiving the result of each file and algorithm.
+
+        Returns:
+        int: Number of reviewed (file, algorithm) pairs.
+        """
+        return asyncio.run(self._review(root, file_paths, writers))
+
+    async def _review(self, root, file_paths, writers):
+        """
+        Asynchronous implementation of `review`.
+        """
+        pylint_slots = 2 * self.pylint_pool.max_workers if self.pylint_pool else 1
+        semaphores = {
+            'PyLint': asyncio.Semaphore(pylint_slots),
+            'OpenAI': asyncio.Semaphore(self.openai_concurrency),
+        }
+        # Blocking calls wait in threads, make sure there is one for every job allowed to run at once
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=pylint_slots + self.openai_concurrency)
+        )
+
+        tasks = [
+            asyncio.create_task(self._review_file(root, file_path, algorithm, semaphores[algorithm]))
+            for file_path in file_paths for algorithm in self.algorithms
+        ]
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            for writer in writers:
+                writer.write(result)
+        return len(tasks)
+
+    async def _review_file(self, root, file_path, algorithm, semaphore):
+        """
+        Runs one algorithm on one file.
+
+        Parameters:
+        root (str): The reviewed directory.
+        file_path (str): Path to the file.
+        algorithm (str): The algorithm to run.
+        semaphore (asyncio.Semaphore): Limits the number of concurrently running jobs of the algorithm.
+
+        Returns:
+        dict: The result with the keys 'path', 'algorithm' and 'errors', or 'error' if the review failed.
+        """
+        changed_lines = self.changed_lines.get(os.path.abspath(file_path)) if self.changed_lines else None
+        file_parser = FileParser(file_path, cache=self.cache, pylint_pool=self.pylint_pool,
+                                 changed_lines=changed_lines)
+        result = {'path': os.path.relpath(file_path, root).replace(os.sep, '/'), 'algorithm': algorithm}
+        async with semaphore:
+            try:
+                line_numbers = await asyncio.to_thread(file_parser.get_errors_from_file, algorithm)
+            except Exception as e:  # A single broken file must not stop the whole review
+                result['error'] = f"{type(e).__name__}: {e}"
+                return result
+
+        result['errors'] = format_errors(line_numbers)
+        return result
@@ -0,0 +1,374 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from AIReviewer.error_record import ErrorRecord
+
+# Directory holding the on-disk caches, shared by every session and user pointing at the same path
+CACHE_DIR = os.getenv("AIREVIEWER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "aireviewer"))
+
+
+class DiskCache:
+    """
+    Size-bounded key/value store persisted in an SQLite database.
+
+    Values are stored as JSON. When the total size of the stored values exceeds `max_bytes`,
+    the least recently used entries are evicted. Entries older than `ttl` seconds are treated as missing.
+    Entries can be tagged, e.g. by the path of the file they were computed from, and invalidated by the tag.
+    """
+
+    def __init__(self, db_path, max_bytes=64 * 1024 * 1024, ttl=None):
+        """
+        Initializes the cache and creates the database if it does not exist yet.
+
+        Parameters:
+        db_path (str): Path to the SQLite database file.
+        max_bytes (int): Maximum total size of the stored values in bytes.
+        ttl (float): Time to live of the entries in seconds, entries never expire if None.
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL, "
+                "created REAL NOT NULL DEFAULT 0, tag TEXT)"
+            )
+            # Databases created before the TTL and tag support have no `created` and `tag` columns
+            columns = [column[1] for column in conn.execute("PRAGMA table_info(entries)")]
+            if 'created' not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            if 'tag' not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN tag TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)")
+
+    def _connect(self):
+        """
+        Opens a new connection to the database. A connection per operation keeps the cache
+        usable from several threads and processes at once.
+
+        Returns:
+        sqlite3.Connection: The opened connection.
+        """
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, key):
+        """
+        Returns the value stored under the key and marks it as recently used.
+
+        Parameters:
+        key (str): The cache key.
+
+        Returns:
+        object: The decoded value, or None if the key is not cached.
+        """
+        value, _ = self.get_entry(key)
+        return value
+
+    def get_entry(self, key):
+        """
+        Returns the value stored under the key together with its tag and marks it as recently used.
+
+        Parameters:
+        key (str): The cache key.
+
+        Returns:
+        tuple: The decoded value and the tag given to `set`, or (None, None) if the key is not cached.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created, tag FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, None
+            if self.ttl is not None and row[1] < time.time() - self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None, None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0]), row[2]
+
+    def set(self, key, value, tag=None):
+        """
+        Stores the value under the key and evicts the least recently used entries if the cache is full.
+
+        Parameters:
+        key (str): The cache key.
+        value (object): A JSON serializable value.
+        tag (str): Optional tag of the entry for `invalidate_tag`.
+        """
+        data = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed, created, tag) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now, tag)
+            )
+            self._evict(conn)
+
+    def invalidate_tag(self, tag):
+        """
+        Removes the entries with the tag.
+
+        Parameters:
+        tag (str): The tag given to `set`.
+
+        Returns:
+        int: The number of removed entries.
+        """
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM entries WHERE tag = ?", (tag,)).rowcount
+
+    def _evict(self, conn):
+        """
+        Deletes the expired entries and then the least recently used ones until the stored values fit into `max_bytes`.
+
+        Parameters:
+        conn (sqlite3.Connection): An open connection to the database.
+        """
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS total FROM entries) "
+            "WHERE total > ?)",
+            (self.max_bytes,)
+        )
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+
+class AnalysisCache(DiskCache):
+    """
+    Cache of the error maps returned by `FileParser.get_errors_from_file`.
+
+    Entries are addressed by the hash of the file content together with the algorithm and
+    the fingerprint of its backend, so a changed file, rcfile, model or prompt never hits a stale entry.
+    """
+
+    # Version of the stored error map format, entries of older formats are never hit
+    FORMAT_VERSION = 3
+
+    def __init__(self, db_path=None, max_bytes=64 * 1024 * 1024):
+        """
+        Initializes the cache.
+
+        Parameters:
+        db_path (str): Path to the SQLite database file. Defaults to `analysis.sqlite` in `CACHE_DIR`.
+        max_bytes (int): Maximum total size of the stored error maps in bytes.
+        """
+        super().__init__(db_path or os.path.join(CACHE_DIR, "analysis.sqlite"), max_bytes)
+
+    @staticmethod
+    def make_key(file_content, algorithm, fingerprint):
+        """
+        Builds the cache key of an analysis.
+
+        Parameters:
+        file_content (str): The content of the analyzed file.
+        algorithm (str): The algorithm used for error detection.
+        fingerprint (str): Identification of the backend configuration (tool version, rcfile, model, prompt).
+
+        Returns:
+        str: The cache key.
+        """
+        content_hash = hashlib.sha256(file_content.encode('utf-8')).hexdigest()
+        key = f"{content_hash}\0{algorithm}\0{fingerprint}\0{AnalysisCache.FORMAT_VERSION}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get_errors(self, key, lines):
+        """
+        Returns the cached error map.
+
+        Parameters:
+        key (str): The cache key created by `make_key`.
+        lines (list): Lines of the analyzed file, shared by the returned error records.
+
+        Returns:
+        dict: The error map in the format of `FileParser.get_errors_from_file`, or None on a cache miss.
+        """
+        entries = self.get(key)
+        if entries is None:
+            return None
+        return {
+            line_number: [ErrorRecord.from_list(error, lines) for error in errors] for line_number, errors in entries
+        }
+
+    def set_errors(self, key, errors, tag=None):
+        """
+        Stores the error map.
+
+        Parameters:
+        key (str): The cache key created by `make_key`.
+        errors (dict): The error map in the format of `FileParser.get_errors_from_file`.
+        tag (str): Optional tag of the entry, the path of the analyzed file.
+        """
+        # JSON objects only have string keys, store the map as a list of pairs to keep the line numbers intact.
+        # The code blocks are not stored, the records are rebuilt from the lines of the file on a hit
+        self.set(key, [
+            [line_number, [error.to_list() for error in line_errors]] for line_number, line_errors in errors.items()
+        ], tag)
+
+
+class CorrectionCache:
+    """
+    Two-tier cache of the corrections returned by `ErrorsSolver`.
+
+    Recently used corrections are kept in an in-memory LRU, all corrections in an on-disk store with a TTL
+    and a size cap. Concurrent requests for the same correction are coalesced, so only the first one
+    calls the API and the others wait for its result.
+    """
+
+    def __init__(self, disk_cache=None, memory_size=512):
+        """
+        Initializes the cache.
+
+        Parameters:
+        disk_cache (DiskCache): The on-disk tier. Defaults to `corrections.sqlite` in `CACHE_DIR` with a 30 day TTL.
+        memory_size (int): Maximum number of corrections kept in memory.
+        """
+        self.disk_cache = disk_cache or DiskCache(os.path.join(CACHE_DIR, "corrections.sqlite"),
+                                                  ttl=30 * 24 * 60 * 60)
+        self.memory_size = memory_size
+        self.memory_cache = OrderedDict()
+        self.memory_tags = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, messages):
+        """
+        Builds the cache key of a solver prompt. The prompt is normalized first, so differences
+        in line endings and trailing whitespace do not cause cache misses.
+
+        Parameters:
+        model (str): The model answering the prompt.
+        messages (list): The chat messages of the prompt.
+
+        Returns:
+        str: The cache key.
+        """
+        normalized = [
+            {'role': message['role'],
+             'content': '\n'.join(line.rstrip() for line in message['content'].strip().splitlines())}
+            for message in messages
+        ]
+        return hashlib.sha256(json.dumps([model, normalized]).encode('utf-8')).hexdigest()
+
+    def _remember(self, key, value, tag=None):
+        """
+        Stores the value in the in-memory tier and drops the least recently used values over the limit.
+
+        Parameters:
+        key (str): The cache key.
+        value (str): The correction.
+        tag (str): Optional tag of the entry.
+        """
+        self.memory_cache[key] = value
+        self.memory_cache.move_to_end(key)
+        if tag is not None:
+            self.memory_tags[key] = tag
+        while len(self.memory_cache) > self.memory_size:
+            evicted_key, _ = self.memory_cache.popitem(last=False)
+            self.memory_tags.pop(evicted_key, None)
+
+    def get(self, key):
+        """
+        Returns the cached correction without computing it.
+
+        Parameters:
+        key (str): The cache key created by `make_key`.
+
+        Returns:
+        str: The correction, or None on a cache miss.
+        """
+        with self.lock:
+            if key in self.memory_cache:
+                self.memory_cache.move_to_end(key)
+                return self.memory_cache[key]
+        value, tag = self.disk_cache.get_entry(key)
+        if value is not None:
+            with self.lock:
+                # Keeps the tag, so `invalidate_tag` removes the value from memory as well
+                self._remember(key, value, tag)
+        return value
+
+    def set(self, key, value, tag=None):
+        """
+        Stores the correction in both tiers.
+
+        Parameters:
+        key (str): The cache key created by `make_key`.
+        value (str): The correction.
+        tag (str): Optional tag of the entry, the path of the corrected file.
+        """
+        self.disk_cache.set(key, value, tag)
+        with self.lock:
+            self._remember(key, value, tag)
+
+    def invalidate_tag(self, tag):
+        """
+        Removes the corrections with the tag from both tiers.
+
+        Parameters:
+        tag (str): The tag given to `set`.
+        """
+        with self.lock:
+            for key in [key for key, key_tag in self.memory_tags.items() if key_tag == tag]:
+                del self.memory_tags[key]
+                self.memory_cache.pop(key, None)
+        self.disk_cache.invalidate_tag(tag)
+
+    def get_or_compute(self, key, compute, tag=None):
+        """
+        Returns the cached correction, or computes and stores it. When the same key is already
+        being computed by another thread, waits for that computation instead of starting a new one.
+
+        Parameters:
+        key (str): The cache key created by `make_key`.
+        compute (callable): Function without arguments returning the correction.
+        tag (str): Optional tag of the entry, the path of the corrected file.
+
+        Returns:
+        str: The correction.
+        """
+        with self.lock:
+            if key in self.memory_cache:
+                self.memory_cache.move_to_end(key)
+                return self.memory_cache[key]
+            if future := self.in_flight.get(key):
+                owner = False
+            else:
+                future = self.in_flight[key] = Future()
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            value, disk_tag = self.disk_cache.get_entry(key)
+            if value is None:
+                value = compute()
+                self.disk_cache.set(key, value, tag)
+            else:
+                tag = disk_tag
+            with self.lock:
+                self._remember(key, value, tag)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
@@ -0,0 +1,164 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from AIReviewer.backends import ALGORITHMS
+from AIReviewer.batch_review import BatchReviewer, discover_python_files
+from AIReviewer.cache import AnalysisCache, CorrectionCache
+from AIReviewer.git_diff import get_changed_lines
+from AIReviewer.metrics import enable_json_log, metrics
+from AIReviewer.result_writers import JsonlResultWriter, ReviewSummary, SarifResultWriter
+
+# Exit codes of the review
+EXIT_OK = 0
+EXIT_ERRORS_FOUND = 1
+EXIT_FAILURE = 2
+
+
+def create_parser():
+    """
+    Creates the parser of the command line arguments.
+
+    Returns:
+    argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(prog='aireviewer', description='AI assisted review of Python code.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    review_parser = subparsers.add_parser('review', help='Review all Python files in a directory tree.')
+    review_parser.add_argument('directory', help='The directory to review.')
+    review_parser.add_argument('--algorithm', '-a', action='append', choices=ALGORITHMS,
+                               help='Algorithm to run, can be repeated. PyLint only by default.')
+    review_parser.add_argument('--jsonl', help='Write the results as JSON Lines to this file.')
+    review_parser.add_argument('--sarif', help='Write the results as a SARIF log to this file.')
+    review_parser.add_argument('--exclude', action='append', default=[],
+                               help='Glob pattern of paths to skip, can be repeated.')
+    review_parser.add_argument('--workers', type=int, help='Number of PyLint worker processes.')
+    review_parser.add_argument('--pylint-checks', help='Comma separated PyLint checkers or messages to run.')
+    review_parser.add_argument('--openai-concurrency', type=int, default=8,
+                               help='Maximum number of OpenAI requests in flight.')
+    review_parser.add_argument('--no-cache', action='store_true', help='Do not use the analysis and correction caches.')
+    review_parser.add_argument('--base', metavar='REF',
+                               help='Only review the code changed since this git ref, e.g. origin/main.')
+    review_parser.add_argument('--metrics', metavar='PATH',
+                               help='Write the timings and counters in the Prometheus text format to this file.')
+    review_parser.add_argument('--metrics-log', metavar='PATH',
+                               help='Append the timings and counters as JSON Lines to this file.')
+    review_parser.add_argument('--exit-zero', action='store_true',
+                               help='Exit with 0 even if errors were found or files failed to be reviewed.')
+    review_parser.add_argument('--batch', action='store_true',
+                               help='Submit the OpenAI requests as batch jobs and wait for them, '
+                                    'cheaper but slower than the interactive requests.')
+    review_parser.add_argument('--batch-dir', metavar='DIR', default='aireviewer-batches',
+                               help='Directory of the request and result files of the batch jobs.')
+    review_parser.add_argument('--batch-poll-interval', type=float, default=30.0,
+                               help='Seconds between the checks of the status of a batch job.')
+    review_parser.add_argument('--batch-timeout', type=float,
+                               help='Seconds to wait for a batch job, forever by default. A run which timed out waits '
+                                    'for the same batch jobs when it is started again.')
+    review_parser.add_argument('--batch-corrections', action='store_true',
+                               help='Also request the corrections of the code blocks with errors in a batch job.')
+
+    subparsers.add_parser('app', help='Launch the Streamlit application.')
+    return parser
+
+
+def review(args):
+    """
+    Runs the headless review of a directory tree.
+
+    Parameters:
+    args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+    int: The exit code, `EXIT_FAILURE` if a file could not be reviewed, `EXIT_ERRORS_FOUND` if errors were found,
+         otherwise `EXIT_OK`.
+    """
+    algorithms = args.algorithm or ['PyLint']
+    if args.metrics_log:
+        enable_json_log(args.metrics_log)
+    file_paths = discover_python_files(args.directory, args.exclude)
+    changed_lines = None
+    if args.base:
+        try:
+            changed_lines = get_changed_lines(args.directory, args.base)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Cannot get the changes since {args.base}: {getattr(e, 'stderr', None) or e}", file=sys.stderr)
+            return EXIT_FAILURE
+        file_paths = [path for path in file_paths if os.path.abspath(path) in changed_lines]
+    print(f"Reviewing {len(file_paths)} files with {', '.join(algorithms)}", file=sys.stderr)
+
+    writers = []
+    if args.jsonl:
+        writers.append(JsonlResultWriter(args.jsonl))
+    if args.sarif:
+        writers.append(SarifResultWriter(args.sarif))
+    if not writers:
+        print("No output requested, use --jsonl and/or --sarif", file=sys.stderr)
+    summary = ReviewSummary()
+    writers.append(summary)
+
+    pylint_checks = [check.strip() for check in args.pylint_checks.split(',')] if args.pylint_checks else None
+    pylint_pool = None
+    if 'PyLint' in algorithms:
+        from AIReviewer.pylint_pool import PylintWorkerPool  # Imports PyLint, only when it is selected
+        pylint_pool = PylintWorkerPool(args.workers, pylint_checks)
+    cache = None if args.no_cache else AnalysisCache()
+    # With --batch, the OpenAI requests are sent as batch jobs instead of by the reviewer
+    batch = args.batch and 'OpenAI' in algorithms
+    try:
+        interactive_algorithms = [algorithm for algorithm in algorithms if not (batch and algorithm == 'OpenAI')]
+        if interactive_algorithms:
+            reviewer = BatchReviewer(interactive_algorithms, pylint_pool=pylint_pool, cache=cache,
+                                     openai_concurrency=args.openai_concurrency, changed_lines=changed_lines)
+            reviewer.review(args.directory, file_paths, writers)
+        if batch:
+            from AIReviewer.batch_pipeline import BatchPipeline  # Imports OpenAI, only when it is selected
+            pipeline = BatchPipeline(args.batch_dir, cache=cache,
+                                     correction_cache=None if args.no_cache else CorrectionCache(),
+                                     with_corrections=args.batch_corrections, changed_lines=changed_lines,
+                                     poll_interval=args.batch_poll_interval, timeout=args.batch_timeout)
+            pipeline.review(args.directory, file_paths, writers)
+    except TimeoutError as e:
+        print(f"{e}. The submitted batches are recorded in {args.batch_dir}, run the same command again "
+              f"to wait for them instead of submitting them again.", file=sys.stderr)
+        return EXIT_FAILURE
+    finally:
+        if pylint_pool is not None:
+            pylint_pool.shutdown()
+        for writer in writers:
+            writer.close()
+        if args.metrics:
+            metrics.write_prometheus(args.metrics)
+
+    print(f"Found {summary.errors} errors in {len(summary.files_with_errors)} files, "
+          f"{summary.failures} reviews failed", file=sys.stderr)
+    if args.exit_zero:
+        return EXIT_OK
+    if summary.failures:
+        return EXIT_FAILURE
+    return EXIT_ERRORS_FOUND if summary.errors else EXIT_OK
+
+
+def main(argv=None):
+    """
+    Entry point of the `aireviewer` command.
+
+    Parameters:
+    argv (list): The command line arguments, `sys.argv[1:]` by default.
+
+    Returns:
+    int: The exit code.
+    """
+    args = create_parser().parse_args(argv)
+    if args.command == 'review':
+        return review(args)
+    elif args.command == 'app':
+        from AIReviewer.runner import run_streamlit_app
+        return run_streamlit_app()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+from collections import namedtuple
+import ast
+
+from AIReviewer.node_index import node_start_line
+
+# Rough number of characters per token of Python source, used to estimate the prompt size
+CHARS_PER_TOKEN = 4
+
+# Part of a file sent to the model. `line_map[i]` is the file line number of the chunk line `i + 1`,
+# or None if errors reported on that line should be ignored
+CodeChunk = namedtuple('CodeChunk', ['content', 'line_map'])
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of tokens of the text.
+
+    Parameters:
+    text (str): The text.
+
+    Returns:
+    int: The estimated number of tokens.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_into_chunks(file_content, max_tokens):
+    """
+    Splits the file along its top-level AST nodes into chunks of at most `max_tokens` tokens.
+
+    The imports of the module form a header which is prepended to every chunk, so the model sees
+    where the names come from. Errors on header lines are only taken from the first chunk.
+    A single top-level node larger than the budget forms a chunk of its own.
+
+    Parameters:
+    file_content (str): The Python source code.
+    max_tokens (int): The token budget of a chunk, header included.
+
+    Returns:
+    list: List of CodeChunk.
+    """
+    lines = file_content.splitlines()
+    tree = ast.parse(file_content)
+
+    header_lines = []
+    units = []
+    unit_start = 1
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            header_lines.extend(range(node_start_line(node), node.end_lineno + 1))
+            unit_start = node.end_lineno + 1
+            continue
+        # Comments and blank lines before a node belong to it
+        units.append(list(range(unit_start, node.end_lineno + 1)))
+        unit_start = node.end_lineno + 1
+    if unit_start <= len(lines):
+        units.append(list(range(unit_start, len(lines) + 1)))
+
+    header_tokens = estimate_tokens('\n'.join(lines[line - 1] for line in header_lines))
+    budget = max(max_tokens - header_tokens, 1)
+
+    groups = [[]]
+    group_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens('\n'.join(lines[line - 1] for line in unit))
+        if groups[-1] and group_tokens + unit_tokens > budget:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].extend(unit)
+        group_tokens += unit_tokens
+
+    chunks = []
+    for index, group in enumerate(groups):
+        chunk_lines = header_lines + group
+        line_map = [line if index == 0 else None for line in header_lines] + group
+        chunks.append(CodeChunk('\n'.join(lines[line - 1] for line in chunk_lines), line_map))
+    return chunks
+
+
+def remap_detection(detection, line_map):
+    """
+    Converts the line numbers of a detection output from chunk to file coordinates.
+
+    Parameters:
+    detection (str): The detection output, each line being a line number followed by an error description.
+    line_map (list): The line map of the chunk.
+
+    Returns:
+    list: The detection lines with file line numbers. Lines with unknown or ignored line numbers are dropped.
+    """
+    remapped = []
+    for error in detection.splitlines():
+        line_number, _, error_msg = error.strip().partition(' ')
+        if not line_number.isdigit() or not 1 <= int(line_number) <= len(line_map):
+            continue
+        if (file_line := line_map[int(line_number) - 1]) is not None:
+            remapped.append(f"{file_line} {error_msg}")
+    return remapped
+
+
+def build_fragment(tree, lines, start_line, end_line):
+    """
+    Extracts the block of lines as a standalone module which can be analyzed on its own.
+
+    The fragment consists of the imports of the module, a stub import of the other names defined
+    at the module level (so they are not reported as undefined), the enclosing top-level class
+    if there is one (so the members of the class are known) and the block itself.
+    Only the block lines are mapped back to the file.
+
+    Parameters:
+    tree (ast.Module): The parsed module.
+    lines (list): Lines of the file.
+    start_line (int): The first line of the block (1-based).
+    end_line (int): The last line of the block (1-based, inclusive).
+
+    Returns:
+    CodeChunk: The fragment.
+
+    Raises:
+    ValueError: If the block is nested in a function or a compound statement, or it contains imports of the module
+                whose uses are outside the block, its context cannot be reconstructed and the whole file
+                has to be analyzed instead.
+    """
+    for node in ast.walk(tree):
+        body = getattr(node, 'body', None)
+        if not isinstance(node, ast.stmt) or not isinstance(body, list) or not body:
+            continue
+        body_start = node_start_line(body[0])
+        if body_start <= start_line and end_line <= node.end_lineno and not isinstance(node, ast.ClassDef):
+            raise ValueError(f"Lines {start_line}-{end_line} are nested in a {type(node).__name__}")
+
+    import_lines = []
+    outside_nodes = []
+    context_start, context_end = start_line, end_line
+    for node in tree.body:
+        if node_start_line(node) <= end_line and start_line <= node.end_lineno:
+            if _contains_module_import(node):
+                raise ValueError(f"Lines {start_line}-{end_line} contain imports of the module")
+            context_start = min(context_start, node_start_line(node))
+            context_end = max(context_end, node.end_lineno)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            import_lines.extend(range(node_start_line(node), node.end_lineno + 1))
+        else:
+            outside_nodes.append(node)
+
+    content_lines = [lines[line - 1] for line in import_lines]
+    line_map = [None] * len(import_lines)
+    if names := sorted(_get_module_level_names(outside_nodes)):
+        content_lines.append(f"from _aireviewer_context import ({', '.join(names)})")
+        line_map.append(None)
+    content_lines += lines[context_start - 1:context_end]
+    line_map += [line if start_line <= line <= end_line else None for line in range(context_start, context_end + 1)]
+    return CodeChunk('\n'.join(content_lines) + '\n', line_map)
+
+
+def split_changed_nodes(file_content, changed_lines, max_tokens):
+    """
+    Extracts the top-level nodes touching the changed lines into chunks of at most `max_tokens` tokens.
+
+    Each chunk consists of the imports of the module, a stub import of the other names defined at the module
+    level and a group of the changed nodes, like the fragments of `build_fragment`. Only the lines
+    of the changed nodes are mapped back to the file.
+
+    Parameters:
+    file_content (str): The Python source code.
+    changed_lines (set): The changed line numbers (1-based).
+    max_tokens (int): The token budget of a chunk, None for a single chunk.
+
+    Returns:
+    list: List of CodeChunk, empty if no node was changed.
+    """
+    lines = file_content.splitlines()
+    tree = ast.parse(file_content)
+    changed_nodes = [
+        node for node in tree.body
+        if any(node_start_line(node) <= line <= node.end_lineno for line in changed_lines)
+    ]
+
+    groups = [[]]
+    group_tokens = 0
+    for node in changed_nodes:
+        node_tokens = estimate_tokens('\n'.join(lines[node_start_line(node) - 1:node.end_lineno]))
+        if max_tokens and groups[-1] and group_tokens + node_tokens > max_tokens:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].append(node)
+        group_tokens += node_tokens
+    return [_build_nodes_fragment(tree, lines, group) for group in groups if group]
+
+
+def _build_nodes_fragment(tree, lines, nodes):
+    """
+    Extracts the top-level nodes as a standalone module with the imports and the stub import
+    of the other module-level names.
+
+    Parameters:
+    tree (ast.Module): The parsed module.
+    lines (list): Lines of the file.
+    nodes (list): The extracted top-level nodes, in the order of the file.
+
+    Returns:
+    CodeChunk: The fragment, only the lines of the nodes are mapped to the file.
+    """
+    selected = set(map(id, nodes))
+    import_lines = []
+    outside_nodes = []
+    for node in tree.body:
+        if id(node) in selected:
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            import_lines.extend(range(node_start_line(node), node.end_lineno + 1))
+        else:
+            outside_nodes.append(node)
+
+    content_lines = [lines[line - 1] for line in import_lines]
+    line_map = [None] * len(import_lines)
+    if names := sorted(_get_module_level_names(outside_nodes)):
+        content_lines.append(f"from _aireviewer_context import ({', '.join(names)})")
+        line_map.append(None)
+    for node in nodes:
+        node_lines = range(node_start_line(node), node.end_lineno + 1)
+        content_lines += [lines[line - 1] for line in node_lines]
+        line_map += list(node_lines)
+    return CodeChunk('\n'.join(content_lines) + '\n', line_map)
+
+
+def _contains_module_import(node):
+    """
+    Checks whether the top-level statement imports names into the module, e.g. an import
+    or a `try` statement with imports.
+
+    Parameters:
+    node (ast.stmt): Top-level statement of the module.
+
+    Returns:
+    bool: True if the statement contains an import outside of functions and classes.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return True
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            stack.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def _get_module_level_names(nodes):
+    """
+    Collects the names bound at the module level by the statements.
+
+    Parameters:
+    nodes (list): Top-level statements of the module.
+
+    Returns:
+    set: The bound names.
+    """
+    names = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            continue
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in node.names if alias.name != '*')
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        stack.extend(ast.iter_child_nodes(node))
+    return names
@@ -0,0 +1,75 @@
+class ErrorRecord:
+    """
+    A single detected error.
+
+    The record does not hold the text of its code block, only the indexes of the block into the lines
+    of the file, which are shared by all records of the file. The code block is joined on demand,
+    so a file with many errors in one large node keeps a single copy of the source.
+    """
+
+    __slots__ = ('line_number', 'char_number', 'error_msg', 'start_line', 'end_line', 'lines')
+
+    def __init__(self, line_number, char_number, error_msg, start_line, end_line, lines):
+        """
+        Initializes the record.
+
+        Parameters:
+        line_number (int): Line number of the error (1-based).
+        char_number (int): Column of the error.
+        error_msg (str): The error message.
+        start_line (int): The starting line index of the enclosing code block (0-based).
+        end_line (int): The ending line index of the enclosing code block (0-based, inclusive).
+        lines (list): Lines of the file, shared by all records of the file.
+        """
+        self.line_number = line_number
+        self.char_number = char_number
+        self.error_msg = error_msg
+        self.start_line = start_line
+        self.end_line = end_line
+        self.lines = lines
+
+    @property
+    def code_block(self):
+        """
+        str: The code block enclosing the error.
+        """
+        return '\n'.join(self.lines[self.start_line:self.end_line + 1])
+
+    @property
+    def block(self):
+        """
+        tuple: The key (start_line, end_line) of the enclosing code block.
+        """
+        return self.start_line, self.end_line
+
+    def to_list(self):
+        """
+        Converts the record to a list without the lines of the file, e.g. for storing it as JSON.
+
+        Returns:
+        list: [line_number, char_number, error_msg, start_line, end_line].
+        """
+        return [self.line_number, self.char_number, self.error_msg, self.start_line, self.end_line]
+
+    @classmethod
+    def from_list(cls, values, lines):
+        """
+        Creates the record from a list created by `to_list`.
+
+        Parameters:
+        values (list): [line_number, char_number, error_msg, start_line, end_line].
+        lines (list): Lines of the file.
+
+        Returns:
+        ErrorRecord: The record.
+        """
+        return cls(*values, lines)
+
+    def __eq__(self, other):
+        if not isinstance(other, ErrorRecord):
+            return NotImplemented
+        return self.to_list() == other.to_list() and self.code_block == other.code_block
+
+    def __repr__(self):
+        return (f"ErrorRecord(line_number={self.line_number}, char_number={self.char_number}, "
+                f"error_msg={self.error_msg!r}, start_line={self.start_line}, end_line={self.end_line})")
@@ -0,0 +1,397 @@
+import ast
+import builtins
+import re
+
+# Names available in every module besides the builtins
+IMPLICIT_MODULE_NAMES = {'__file__', '__path__', '__builtins__', '__cached__', '__annotations__'}
+
+# Names available in the body of a class and in its methods
+IMPLICIT_CLASS_NAMES = {'__module__', '__qualname__'}
+IMPLICIT_FUNCTION_NAMES = {'__class__'}
+
+BUILTIN_NAMES = set(dir(builtins)) | IMPLICIT_MODULE_NAMES
+
+# PyLint pragma disabling messages on its line or on the next line
+DISABLE_PRAGMA_RE = re.compile(r'#\s*pylint:\s*disable(?P<next>-next)?=(?P<messages>[\w\-, ]+)')
+
+
+class Scope:
+    """
+    Names bound in a module, class or function body.
+    """
+
+    def __init__(self, node, kind, parent=None):
+        """
+        Initializes the scope.
+
+        Parameters:
+        node (ast.AST): The node owning the scope.
+        kind (str): 'module', 'class', 'function' or 'comprehension'.
+        parent (Scope): The enclosing scope, None for the module.
+        """
+        self.node = node
+        self.kind = kind
+        self.parent = parent
+        self.bindings = {}
+        self.loads = []
+        self.declared = set()
+        self.children = []
+
+    def bind(self, name, node):
+        """
+        Records a binding of the name, the first binding is kept.
+
+        Parameters:
+        name (str): The bound name.
+        node (ast.AST): The binding node.
+        """
+        self.bindings.setdefault(name, node)
+
+    def resolves(self, name):
+        """
+        Checks whether the name is defined when loaded in this scope.
+        Class scopes are skipped when resolving names of the nested scopes, as in Python.
+
+        Parameters:
+        name (str): The loaded name.
+
+        Returns:
+        bool: True if the name is bound in this or one of the enclosing scopes.
+        """
+        if self.kind == 'class' and name in IMPLICIT_CLASS_NAMES:
+            return True
+        scope = self
+        while scope is not None:
+            if name in scope.bindings or name in scope.declared:
+                return True
+            if scope.kind == 'function' and name in IMPLICIT_FUNCTION_NAMES:
+                return True
+            scope = scope.parent
+            while scope is not None and scope.kind == 'class':
+                scope = scope.parent
+        return name in BUILTIN_NAMES
+
+
+class ScopeBuilder(ast.NodeVisitor):
+    """
+    Builds the tree of scopes of a module, collecting the bindings and the loads of names of each scope.
+    """
+
+    def __init__(self, tree):
+        """
+        Builds the scopes.
+
+        Parameters:
+        tree (ast.Module): The parsed module.
+        """
+        self.module = Scope(tree, 'module')
+        self.scope = self.module
+        self.imports = []
+        self.loaded_names = set()
+        for statement in tree.body:
+            self.visit(statement)
+
+    def visit_nested(self, scope, nodes):
+        """
+        Visits the nodes in a new scope nested in the current one.
+
+        Parameters:
+        scope (Scope): The new scope.
+        nodes (list): The nodes of its body.
+        """
+        self.scope.children.append(scope)
+        outer, self.scope = self.scope, scope
+        for node in nodes:
+            self.visit(node)
+        self.scope = outer
+
+    def bind_arguments(self, scope, args):
+        """
+        Binds the arguments of a function in its scope.
+
+        Parameters:
+        scope (Scope): The scope of the function.
+        args (ast.arguments): The arguments.
+        """
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+            if arg is not None:
+                scope.bind(arg.arg, arg)
+
+    def visit_annotation(self, node):
+        """
+        Visits an annotation. The names of string annotations count as used, but are not checked.
+
+        Parameters:
+        node (ast.expr): The annotation.
+        """
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            try:
+                expression = ast.parse(node.value, mode='eval')
+            except SyntaxError:
+                return
+            self.loaded_names.update(name.id for name in ast.walk(expression) if isinstance(name, ast.Name))
+        else:
+            self.visit(node)
+
+    def bind_type_params(self, node):
+        """
+        Binds the type parameters of a generic function, class or type alias.
+
+        Parameters:
+        node (ast.AST): The generic node.
+        """
+        for type_param in getattr(node, 'type_params', []):
+            self.scope.bind(type_param.name, type_param)
+
+    def visit_function(self, node):
+        self.bind_type_params(node)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns:
+            self.visit_annotation(node.returns)
+        self.scope.bind(node.name, node)
+        scope = Scope(node, 'function', self.scope)
+        self.bind_arguments(scope, node.args)
+        self.visit_nested(scope, node.body)
+
+    visit_FunctionDef = visit_function
+    visit_AsyncFunctionDef = visit_function
+
+    def visit_Lambda(self, node):
+        self.visit(node.args)
+        scope = Scope(node, 'function', self.scope)
+        self.bind_arguments(scope, node.args)
+        self.visit_nested(scope, [node.body])
+
+    def visit_arguments(self, node):
+        # The defaults and annotations are evaluated in the enclosing scope
+        for default in node.defaults + [default for default in node.kw_defaults if default is not None]:
+            self.visit(default)
+        for arg in node.posonlyargs + node.args + node.kwonlyargs + [node.vararg, node.kwarg]:
+            if arg is not None and arg.annotation is not None:
+                self.visit_annotation(arg.annotation)
+
+    def visit_ClassDef(self, node):
+        self.bind_type_params(node)
+        for expression in node.decorator_list + node.bases + [keyword.value for keyword in node.keywords]:
+            self.visit(expression)
+        self.scope.bind(node.name, node)
+        self.visit_nested(Scope(node, 'class', self.scope), node.body)
+
+    def visit_TypeAlias(self, node):
+        self.bind_type_params(node)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        # A bare annotation does not bind the name
+        if node.value is not None or not isinstance(node.target, ast.Name):
+            self.visit(node.target)
+        if node.value is not None:
+            self.visit(node.value)
+        self.visit_annotation(node.annotation)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            name = alias.asname or alias.name.split('.')[0]
+            self.scope.bind(name, node)
+            self.imports.append((node, alias, name, self.scope))
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name == '*':
+                # The imported names are unknown, so no name of the module can be reported as undefined
+                self.module.declared.add('*')
+                continue
+            name = alias.asname or alias.name
+            self.scope.bind(name, node)
+            if node.module != '__future__':
+                self.imports.append((node, alias, name, self.scope))
+
+    def visit_comprehension_scope(self, node):
+        # The first iterable is evaluated in the enclosing scope, the rest in the scope of the comprehension
+        generators = node.generators
+        self.visit(generators[0].iter)
+        scope = Scope(node, 'comprehension', self.scope)
+        self.scope.children.append(scope)
+        outer, self.scope = self.scope, scope
+        for index, generator in enumerate(generators):
+            self.visit(generator.target)
+            if index:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for element in ('elt', 'key', 'value'):
+            if hasattr(node, element):
+                self.visit(getattr(node, element))
+        self.scope = outer
+
+    visit_ListComp = visit_comprehension_scope
+    visit_SetComp = visit_comprehension_scope
+    visit_GeneratorExp = visit_comprehension_scope
+    visit_DictComp = visit_comprehension_scope
+
+    def visit_NamedExpr(self, node):
+        # The target of an assignment expression is bound outside of the comprehensions
+        scope = self.scope
+        while scope.kind == 'comprehension':
+            scope = scope.parent
+        scope.bind(node.target.id, node.target)
+        self.visit(node.value)
+
+    def visit_Constant(self, node):
+        # Names in strings, e.g. in forward references, count as used
+        if isinstance(node.value, str) and all(part.isidentifier() for part in node.value.split('.')):
+            self.loaded_names.add(node.value.split('.')[0])
+
+    def visit_Global(self, node):
+        self.scope.declared.update(node.names)
+        for name in node.names:
+            self.module.bind(name, node)
+
+    def visit_Nonlocal(self, node):
+        self.scope.declared.update(node.names)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self.scope.bind(node.name, node)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node):
+        if node.name:
+            self.scope.bind(node.name, node)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node):
+        if node.name:
+            self.scope.bind(node.name, node)
+
+    def visit_MatchMapping(self, node):
+        if node.rest:
+            self.scope.bind(node.rest, node)
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, (ast.Load, ast.Del)):
+            self.scope.loads.append(node)
+            self.loaded_names.add(node.id)
+        else:
+            self.scope.bind(node.id, node)
+
+
+def check_source(file_content):
+    """
+    Runs the fast checks on the source code: syntax errors, undefined names, unused imports and unused variables.
+
+    The checks only look at the AST of the file, so they finish in milliseconds, but they are less thorough
+    than PyLint. The messages have the format and the ids of the PyLint messages.
+
+    Parameters:
+    file_content (str): The Python source code.
+
+    Returns:
+    list: Tuples (line_number, char_number, error_msg).
+    """
+    try:
+        tree = ast.parse(file_content)
+    except SyntaxError as e:
+        return [(e.lineno or 1, max((e.offset or 1) - 1, 0), f"E0001: Parsing failed: '{e.msg}' (syntax-error)")]
+
+    builder = ScopeBuilder(tree)
+    errors = _check_undefined_names(builder) + _check_unused_imports(builder, tree) + _check_unused_variables(builder)
+    suppressed = _get_suppressed_messages(file_content)
+    return sorted(
+        (error for error in errors if not suppressed.get(error[0], set()) & _get_message_names(error[2])),
+        key=lambda error: error[:2]
+    )
+
+
+def _get_message_names(error_msg):
+    """
+    Gets the message id and the symbol of a message in the format "msg_id: msg (symbol)".
+    """
+    return {error_msg.partition(':')[0], error_msg.rpartition('(')[2].rstrip(')')}
+
+
+def _get_suppressed_messages(file_content):
+    """
+    Finds the messages disabled by pragmas on a line or on the next line.
+    Pragmas disabling messages for a whole scope are not supported.
+
+    Parameters:
+    file_content (str): The Python source code.
+
+    Returns:
+    dict: Sets of the disabled message ids and symbols by line number.
+    """
+    suppressed = {}
+    for line_number, line in enumerate(file_content.splitlines(), 1):
+        if match := DISABLE_PRAGMA_RE.search(line):
+            messages = {message.strip() for message in match.group('messages').split(',')}
+            suppressed.setdefault(line_number + 1 if match.group('next') else line_number, set()).update(messages)
+    return suppressed
+
+
+def _iter_scopes(scope):
+    """
+    Yields the scope and all scopes nested in it.
+    """
+    yield scope
+    for child in scope.children:
+        yield from _iter_scopes(child)
+
+
+def _check_undefined_names(builder):
+    """
+    Reports the loaded names which are not bound in any enclosing scope.
+    """
+    if '*' in builder.module.declared:
+        return []
+    return [
+        (name.lineno, name.col_offset, f"E0602: Undefined variable '{name.id}' (undefined-variable)")
+        for scope in _iter_scopes(builder.module) for name in scope.loads
+        if not scope.resolves(name.id)
+    ]
+
+
+def _check_unused_imports(builder, tree):
+    """
+    Reports the imported names which are never loaded in the module and are not exported by `__all__`.
+    """
+    exported = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == '__all__'
+                                                for target in node.targets):
+            exported.update(element.value for element in getattr(node.value, 'elts', [])
+                            if isinstance(element, ast.Constant) and isinstance(element.value, str))
+
+    errors = []
+    for node, alias, name, _ in builder.imports:
+        if name in builder.loaded_names or name in exported:
+            continue
+        if isinstance(node, ast.ImportFrom):
+            imported = f"{alias.name} imported from {'.' * node.level}{node.module or ''}"
+            description = f"{imported} as {alias.asname}" if alias.asname else imported
+        else:
+            description = f"import {alias.name} as {alias.asname}" if alias.asname else f"import {alias.name}"
+        errors.append((node.lineno, node.col_offset, f"W0611: Unused {description} (unused-import)"))
+    return errors
+
+
+def _check_unused_variables(builder):
+    """
+    Reports the names assigned in functions which are never loaded in the function or in its nested scopes.
+    """
+    errors = []
+    for scope in _iter_scopes(builder.module):
+        if scope.kind != 'function':
+            continue
+        loaded = {name.id for nested in _iter_scopes(scope) for name in nested.loads}
+        if 'locals' in loaded:
+            continue
+        for name, node in scope.bindings.items():
+            if name in loaded or name in scope.declared or name.startswith('_'):
+                continue
+            if isinstance(node, ast.Name) or isinstance(node, ast.ExceptHandler):
+                errors.append((node.lineno, node.col_offset, f"W0612: Unused variable '{name}' (unused-variable)"))
+    return errors
@@ -0,0 +1,346 @@
+from collections import namedtuple
+from fnmatch import fnmatch
+import hashlib
+import os
+import re
+import threading
+
+# Directories which never contain sources worth reviewing
+EXCLUDED_DIRS = {'.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', '__pycache__', 'node_modules', 'build', 'dist'}
+
+# A Python file of the catalog. `path` is relative to the root with '/' separators, `hash` is the SHA-256
+# of the content
+FileEntry = namedtuple('FileEntry', ['path', 'mtime', 'size', 'hash'])
+
+# A change of the catalog. `kind` is 'added', 'modified' or 'removed', `old` and `new` are the FileEntry
+# before and after the change, None for added and removed files respectively
+FileChange = namedtuple('FileChange', ['kind', 'path', 'old', 'new'])
+
+
+class IgnoreRules:
+    """
+    Patterns of the .gitignore files found in a directory tree.
+
+    The usual .gitignore syntax is supported: comments, negated patterns, directory-only patterns,
+    patterns anchored to the directory of the .gitignore file and the `*`, `?`, `[...]` and `**` wildcards.
+    As in git, the last matching pattern decides.
+    """
+
+    def __init__(self):
+        """
+        Initializes the rules without any patterns.
+        """
+        self.patterns = []
+
+    def add_file(self, ignore_path, base):
+        """
+        Adds the patterns of a .gitignore file.
+
+        Parameters:
+        ignore_path (str): Path to the .gitignore file.
+        base (str): Directory of the .gitignore file relative to the root, '' for the root.
+        """
+        try:
+            with open(ignore_path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            if pattern := self.parse_pattern(line, base):
+                self.patterns.append(pattern)
+
+    @staticmethod
+    def parse_pattern(line, base):
+        """
+        Parses a line of a .gitignore file.
+
+        Parameters:
+        line (str): The line.
+        base (str): Directory of the .gitignore file relative to the root.
+
+        Returns:
+        tuple: (regex, negated, directory_only, base), or None for blank lines and comments.
+        """
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            return None
+        negated = line.startswith('!')
+        if negated or line.startswith('\\'):
+            line = line[1:]
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+        anchored = '/' in line
+        line = line.lstrip('/')
+        regex = _translate_glob(line)
+        regex = f"^{regex}$" if anchored else f"^(?:.*/)?{regex}$"
+        return re.compile(regex), negated, directory_only, base
+
+    def is_ignored(self, relative_path, is_dir):
+        """
+        Checks whether the path is ignored.
+
+        Parameters:
+        relative_path (str): Path relative to the root with '/' separators.
+        is_dir (bool): True if the path is a directory.
+
+        Returns:
+        bool: True if the last matching pattern ignores the path.
+        """
+        ignored = False
+        for regex, negated, directory_only, base in self.patterns:
+            if directory_only and not is_dir:
+                continue
+            if base:
+                if not relative_path.startswith(base + '/'):
+                    continue
+                path = relative_path[len(base) + 1:]
+            else:
+                path = relative_path
+            if regex.match(path):
+                ignored = not negated
+        return ignored
+
+
+def _translate_glob(pattern):
+    """
+    Translates a .gitignore glob to a regular expression.
+
+    Parameters:
+    pattern (str): The glob.
+
+    Returns:
+    str: The regular expression without anchors.
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and (end := pattern.find(']', i + 1)) != -1:
+            characters = pattern[i + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            regex += f"[{characters}]"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def is_excluded(relative_path, exclude):
+    """
+    Checks whether the path matches any of the exclude patterns.
+
+    Parameters:
+    relative_path (str): Path relative to the reviewed root.
+    exclude (list): Glob patterns.
+
+    Returns:
+    bool: True if the path is excluded.
+    """
+    relative_path = relative_path.replace(os.sep, '/')
+    return any(fnmatch(relative_path, pattern) or fnmatch(os.path.basename(relative_path), pattern)
+               for pattern in exclude)
+
+
+def iter_python_files(root, exclude=(), use_gitignore=True):
+    """
+    Recursively finds the Python files under the root directory.
+
+    Parameters:
+    root (str): The directory to search.
+    exclude (list): Glob patterns of paths relative to the root which are skipped.
+    use_gitignore (bool): Whether the paths ignored by the .gitignore files in the tree are skipped.
+
+    Yields:
+    os.DirEntry: The entry of each found file, not sorted.
+    """
+    rules = IgnoreRules()
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        directory = os.path.join(root, relative_dir) if relative_dir else root
+        if use_gitignore:
+            rules.add_file(os.path.join(directory, '.gitignore'), relative_dir)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in EXCLUDED_DIRS or entry.name.endswith('.egg-info') \
+                        or is_excluded(relative_path, exclude) or rules.is_ignored(relative_path, True):
+                    continue
+                stack.append(relative_path)
+            elif entry.name.endswith('.py') and entry.is_file() and not is_excluded(relative_path, exclude) \
+                    and not rules.is_ignored(relative_path, False):
+                yield entry
+
+
+def hash_file(path):
+    """
+    Computes the SHA-256 hash of the content of the file.
+
+    Parameters:
+    path (str): Path to the file.
+
+    Returns:
+    str: The hexadecimal hash.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileCatalog:
+    """
+    Index of the Python files of a source tree.
+
+    The catalog stores the modification time, size and content hash of every file. A refresh only stats
+    the files and hashes just the files whose modification time or size changed, so refreshing a large tree,
+    e.g. on a network filesystem, is cheap. The changes found by a refresh are passed to the subscribed
+    listeners, so the caches of the changed files can be invalidated. Files touched without a change
+    of their content are not reported.
+    """
+
+    def __init__(self, root, exclude=(), use_gitignore=True):
+        """
+        Initializes the catalog and indexes the tree.
+
+        Parameters:
+        root (str): The root directory of the sources.
+        exclude (list): Glob patterns of paths relative to the root which are skipped.
+        use_gitignore (bool): Whether the paths ignored by the .gitignore files in the tree are skipped.
+        """
+        self.root = root
+        self.exclude = list(exclude)
+        self.use_gitignore = use_gitignore
+        self.entries = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.polling = None
+        self.refresh()
+
+    def files(self):
+        """
+        Lists the indexed files.
+
+        Returns:
+        list: Sorted paths of the files relative to the root, with '/' separators.
+        """
+        with self.lock:
+            return sorted(self.entries)
+
+    def get(self, relative_path):
+        """
+        Gets the entry of a file.
+
+        Parameters:
+        relative_path (str): Path of the file relative to the root.
+
+        Returns:
+        FileEntry: The entry, or None if the file is not indexed.
+        """
+        with self.lock:
+            return self.entries.get(relative_path)
+
+    def absolute_path(self, relative_path):
+        """
+        Gets the absolute path of a file of the catalog.
+
+        Parameters:
+        relative_path (str): Path of the file relative to the root.
+
+        Returns:
+        str: The absolute path.
+        """
+        return os.path.abspath(os.path.join(self.root, *relative_path.split('/')))
+
+    def subscribe(self, listener):
+        """
+        Registers a listener of the changes.
+
+        Parameters:
+        listener (callable): Called with the list of FileChange found by each refresh which found any.
+        """
+        self.listeners.append(listener)
+
+    def refresh(self):
+        """
+        Updates the index from the filesystem and notifies the listeners about the changes.
+
+        Returns:
+        list: The found changes as FileChange.
+        """
+        with self.lock:
+            changes = []
+            entries = {}
+            for dir_entry in iter_python_files(self.root, self.exclude, self.use_gitignore):
+                relative_path = os.path.relpath(dir_entry.path, self.root).replace(os.sep, '/')
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                old = self.entries.get(relative_path)
+                if old is not None and old.mtime == stat.st_mtime and old.size == stat.st_size:
+                    entries[relative_path] = old
+                    continue
+                try:
+                    entry = FileEntry(relative_path, stat.st_mtime, stat.st_size, hash_file(dir_entry.path))
+                except OSError:
+                    continue
+                entries[relative_path] = entry
+                if old is None:
+                    changes.append(FileChange('added', relative_path, None, entry))
+                elif old.hash != entry.hash:
+                    changes.append(FileChange('modified', relative_path, old, entry))
+            for relative_path, old in self.entries.items():
+                if relative_path not in entries:
+                    changes.append(FileChange('removed', relative_path, old, None))
+            self.entries = entries
+
+        if changes:
+            for listener in self.listeners:
+                listener(changes)
+        return changes
+
+    def start_polling(self, interval=2.0):
+        """
+        Refreshes the catalog periodically in a background thread.
+
+        Parameters:
+        interval (float): Seconds between the refreshes.
+        """
+        if self.polling is not None:
+            return
+        self.polling = threading.Event()
+
+        def poll(stopped):
+            while not stopped.wait(interval):
+                self.refresh()
+
+        threading.Thread(target=poll, args=(self.polling,), daemon=True, name="aireviewer-catalog").start()
+
+    def stop_polling(self):
+        """
+        Stops the periodic refreshes.
+        """
+        if self.polling is not None:
+            self.polling.set()
+            self.polling = None
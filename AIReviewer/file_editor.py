@@ -0,0 +1,68 @@
+import ast
+import os
+import shutil
+import tempfile
+
+
+def find_overlapping_changes(changes):
+    """
+    Finds the pairs of changes whose line spans overlap.
+
+    Parameters:
+    changes (list): Tuples (line_index_start, line_index_end, new_block).
+
+    Returns:
+    list: Pairs of the overlapping changes.
+    """
+    overlapping = []
+    ordered = sorted(changes, key=lambda change: (change[0], change[1]))
+    for previous, change in zip(ordered, ordered[1:]):
+        if change[0] <= previous[1]:
+            overlapping.append((previous, change))
+    return overlapping
+
+
+def apply_changes_to_file(file_path, changes):
+    """
+    Replaces several blocks of code in a file in a single write.
+
+    The changes are applied from the bottom of the file up, so the line indexes of the remaining
+    changes stay valid. The result is written to a temporary file which replaces the original
+    only if the new content still parses, so the file is never left half-written or broken.
+
+    Parameters:
+    file_path (str): The path to the file to modify.
+    changes (list): Tuples (line_index_start, line_index_end, new_block), where the line indexes are 0-based
+                    and inclusive and refer to the file before any of the changes.
+
+    Returns:
+    str: The new content of the file.
+
+    Raises:
+    ValueError: If some of the changes overlap.
+    SyntaxError: If the changed file would not parse.
+    """
+    if overlapping := find_overlapping_changes(changes):
+        spans = ', '.join(f"{a[0] + 1}-{a[1] + 1} and {b[0] + 1}-{b[1] + 1}" for a, b in overlapping)
+        raise ValueError(f"Overlapping changes of lines {spans}")
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+
+    for line_index_start, line_index_end, new_block in sorted(changes, key=lambda change: change[0], reverse=True):
+        lines[line_index_start:line_index_end + 1] = new_block.split('\n')
+    new_content = '\n'.join(lines) + '\n'
+
+    # Refuse to write a file which no longer parses
+    ast.parse(new_content, filename=file_path)
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as file:
+        file.write(new_content)
+    try:
+        shutil.copymode(file_path, file.name)
+        os.replace(file.name, file_path)
+    except BaseException:
+        os.remove(file.name)
+        raise
+    return new_content
@@ -1,9 +1,31 @@
-from pylint import lint
-from pylint.reporters.text import TextReporter
-from io import StringIO
 import ast
+import hashlib
+import os
+import tempfile
 
-from AIReviewer.openai_interface import ErrorsDetector
+from AIReviewer.backends import get_backend
+from AIReviewer.cache import AnalysisCache
+from AIReviewer.code_chunker import build_fragment
+from AIReviewer.error_record import ErrorRecord
+from AIReviewer.fast_checker import check_source
+from AIReviewer.metrics import metrics
+from AIReviewer.node_index import NodeIndex
+
+# Messages about the fragment module itself, not about the analyzed block. The imports of the fragment
+# are not used by the rest of the module and are followed by the stub import of the module-level names
+FRAGMENT_IGNORED_SYMBOLS = {
+    'missing-module-docstring', 'too-many-lines', 'duplicate-code',
+    'unused-import', 'wrong-import-order', 'ungrouped-imports', 'wrong-import-position',
+}
+
+# PyLint checks enabling the unused-import message, recomputed for the whole file after incremental updates
+UNUSED_IMPORT_CHECKS = {'unused-import', 'W0611', 'variables'}
+
+# Algorithms reporting all errors of the fast checks themselves when all their checks are enabled
+FAST_CHECKS_COVERED_BY = {'PyLint'}
+
+# Above this number of changed blocks, analyzing the whole file is cheaper than analyzing each block
+MAX_INCREMENTAL_CHANGES = 5
 
 
 class FileParser:
@@ -11,32 +33,71 @@ class FileParser:
     A class to parse Python files and detect errors using various algorithms.
     """
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache=None, granularity='def', pylint_checks=None, pylint_pool=None,
+                 changed_lines=None):
         """
         Initializes the FileParser with the path of the file to be analyzed.
 
         Parameters:
         file_path (str): Path to the Python file to be parsed.
+        cache (AnalysisCache): Optional cache of the detected errors, shared across files and sessions.
+        granularity (str): Which enclosing node forms the code block of an error,
+                           'def' (function, method or class), 'statement' or 'top' (top-level node).
+        pylint_checks (list): Names of the PyLint checkers, message ids or symbols to run, all checks if None.
+        pylint_pool (PylintWorkerPool): Optional pool of warm PyLint workers. When given, the files are linted
+                                        by the pool and the checks enabled in the pool are used.
+        changed_lines (set): Line numbers changed since the base of a review, e.g. by `git_diff.get_changed_lines`.
+                             When given, only the errors on these lines are reported and OpenAI only
+                             gets the changed top-level nodes. The whole file is reviewed if None.
         """
         self.file_path = file_path
+        self.cache = cache
+        self.granularity = granularity
+        self.pylint_checks = pylint_pool.enabled_checks if pylint_pool else pylint_checks
+        self.pylint_pool = pylint_pool
+        self.changed_lines = changed_lines
+
+    def build_node_index(self, file_content):
+        """
+        Parses the file content and builds the index of its AST nodes, shared by all detection algorithms.
+
+        Parameters:
+        file_content (str): The content of the file.
+
+        Returns:
+        NodeIndex: The index answering which node encloses a line.
+        """
+        with metrics.span('ast.parse', file=self.file_path):
+            tree = ast.parse(file_content)
+        return NodeIndex(tree, self.granularity)
 
-    def get_node_with_error(self, tree, line_number):
+    def try_build_node_index(self, file_content):
+        """
+        Builds the index of the AST nodes of the file content, if it can be parsed.
+
+        Parameters:
+        file_content (str): The content of the file.
+
+        Returns:
+        NodeIndex: The index of the nodes, or None if the file has a syntax error.
+        """
+        try:
+            return self.build_node_index(file_content)
+        except SyntaxError:
+            return None
+
+    def get_node_with_error(self, node_index, line_number):
         """
         Finds and returns the AST node containing the error based on the line number.
 
         Parameters:
-        tree (list): List of AST nodes parsed from the file content.
+        node_index (NodeIndex): Index of the AST nodes parsed from the file content.
         line_number (int): Line number where the error is located.
 
         Returns:
-        ast.AST: The AST node that contains the specified line number.
+        NodeSpan: The span of the AST node that contains the specified line number, or None.
         """
-        for node in tree:
-            if node.lineno - 1 <= line_number - 1 <= node.end_lineno - 1:
-                if isinstance(node, ast.ClassDef):
-                    if child_node := self.get_node_with_error(node.body, line_number):
-                        return child_node
-                return node
+        return node_index.find(line_number)
 
     def get_errors_from_file(self, selected_algorithm):
         """
@@ -46,78 +107,418 @@ class FileParser:
         selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
 
         Returns:
-        dict: A dictionary where keys are line numbers and values are tuples containing error details.
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord.
         """
+        if self.cache is None:
+            return self.detect_errors(selected_algorithm)
+
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
+
+        key = self.cache.make_key(file_content, selected_algorithm, self.get_backend_fingerprint(selected_algorithm))
+        line_numbers = self.cache.get_errors(key, file_content.splitlines())
+        metrics.record_cache_lookup('analysis', line_numbers is not None)
+        if line_numbers is not None:
+            return line_numbers
+
+        line_numbers = self.detect_errors(selected_algorithm)
+        if line_numbers is not None:
+            self.cache.set_errors(key, line_numbers, os.path.abspath(self.file_path))
+        return line_numbers
+
+    def get_cached_errors(self, selected_algorithm):
+        """
+        Returns the errors of the file from the cache, without running the algorithm.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+
+        Returns:
+        dict: The errors in the format of `get_errors_from_file`, or None if they are not cached.
+        """
+        if self.cache is None:
+            return None
+
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
+
+        key = self.cache.make_key(file_content, selected_algorithm, self.get_backend_fingerprint(selected_algorithm))
+        return self.cache.get_errors(key, file_content.splitlines())
+
+    def start_tiered_analysis(self, selected_algorithm, job_manager):
+        """
+        Starts the analysis of the file in two tiers. The fast checks are run immediately, the specified algorithm
+        is run as a background job and its errors are merged with the errors of the fast checks.
+        Cached errors of the algorithm are merged with the errors of the fast checks and returned immediately instead.
+
+        The job is keyed by the file, its content and the algorithm with its configuration, so sessions
+        analyzing the same version of the file share it.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+        job_manager (JobManager): The manager running the job, with workers for the 'analysis' kind.
+
+        Returns:
+        tuple: The errors of the fast checks in the format of `get_errors_from_file` and the job
+               of the merged errors, or the cached errors and None.
+        """
+        covered = self.covers_fast_checks(selected_algorithm)
+        if (line_numbers := self.get_cached_errors(selected_algorithm)) is not None:
+            # The cache keeps the errors of the algorithm only, as `get_errors_from_file` returns them
+            if not covered:
+                line_numbers = self.merge_errors(self.get_fast_errors_from_file(), line_numbers)
+            return line_numbers, None
+
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
+
+        fast_line_numbers = self.get_fast_errors_from_file()
+
+        def analyze(job):
+            job.report(f"Running {selected_algorithm}")
+            line_numbers = self.get_errors_from_file(selected_algorithm)
+            return line_numbers if covered else self.merge_errors(fast_line_numbers, line_numbers)
+
+        key = AnalysisCache.make_key(file_content, selected_algorithm, self.get_backend_fingerprint(selected_algorithm))
+        return fast_line_numbers, job_manager.submit(('analysis', os.path.abspath(self.file_path), key), analyze)
+
+    def covers_fast_checks(self, selected_algorithm):
+        """
+        Checks whether the algorithm reports all errors of the fast checks itself, so its errors
+        replace the errors of the fast checks instead of being merged with them.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+
+        Returns:
+        bool: True if the errors of the fast checks are covered by the algorithm.
+        """
+        return selected_algorithm in FAST_CHECKS_COVERED_BY and not self.pylint_checks
+
+    def get_fast_errors_from_file(self):
+        """
+        Detects and returns errors from the file using the fast checks, which only look at its AST.
+
+        Returns:
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord
+              sharing the lines of the file.
+        """
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
+            file_content_lines = file_content.splitlines()
+
+        with metrics.span('fast_checks', file=self.file_path):
+            errors = check_source(file_content)
+        return self.build_error_map(errors, file_content_lines, self.try_build_node_index(file_content))
+
+    @staticmethod
+    def merge_errors(fast_line_numbers, line_numbers):
+        """
+        Adds the errors of the fast checks not reported by the algorithm to its errors.
+
+        Parameters:
+        fast_line_numbers (dict): The errors of the fast checks.
+        line_numbers (dict): The errors of the algorithm.
+
+        Returns:
+        dict: The merged errors in the format of `get_errors_from_file`.
+        """
+        if line_numbers is None:
+            return fast_line_numbers
+
+        merged = {line_number: list(line_errors) for line_number, line_errors in line_numbers.items()}
+        for line_number, line_errors in fast_line_numbers.items():
+            reported = {error.error_msg for error in merged.get(line_number, [])}
+            for error in line_errors:
+                if error.error_msg not in reported:
+                    merged.setdefault(line_number, []).append(error)
+        return dict(sorted(merged.items()))
+
+    def detect_errors(self, selected_algorithm):
+        """
+        Runs the specified algorithm on the file, bypassing the cache.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+
+        Returns:
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord.
+        """
+        with metrics.span(f"analysis.{selected_algorithm.lower()}", file=self.file_path):
+            if selected_algorithm == 'PyLint':
+                return self.get_errors_from_file_pylint()
+            elif selected_algorithm == 'OpenAI':
+                return self.get_errors_from_file_openai()
+
+    def get_backend_fingerprint(self, selected_algorithm):
+        """
+        Identifies the configuration of the backend behind the algorithm, so cached results
+        are invalidated when the configuration changes.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+
+        Returns:
+        str: The fingerprint of the backend configuration.
+        """
+        fingerprint = f"granularity={self.granularity}"
+        if self.changed_lines is not None:
+            changed = ','.join(map(str, sorted(self.changed_lines)))
+            fingerprint += f";changed={hashlib.sha256(changed.encode('utf-8')).hexdigest()}"
         if selected_algorithm == 'PyLint':
-            return self.get_errors_from_file_pylint()
+            return f"{get_backend('PyLint').get_fingerprint(self.pylint_checks)};{fingerprint}"
         elif selected_algorithm == 'OpenAI':
-            return self.get_errors_from_file_openai()
+            return f"{get_backend('OpenAI').get_fingerprint()};{fingerprint}"
+        return fingerprint
 
     def get_errors_from_file_pylint(self):
         """
         Detects and returns errors from the file using PyLint.
 
         Returns:
-        dict: A dictionary where keys are line numbers and values are tuples containing:
-              (code_block, line_number, char_number, error_msg, start_line, end_line).
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord
+              sharing the lines of the file.
         """
         with open(self.file_path, 'r', encoding='utf-8') as f:
             file_content = f.read()
             file_content_lines = file_content.splitlines()
 
-        tree = [node for node in ast.walk(ast.parse(file_content)) if hasattr(node, 'lineno')]
-
-        pylint_output = StringIO()
+        # PyLint reports a syntax error of the file as an error of the file
+        node_index = self.try_build_node_index(file_content)
 
-        # Create a Pylint TextReporter to write output to the buffer
-        reporter = TextReporter(pylint_output)
+        messages = self.run_pylint()
+        with metrics.span('output.parse', file=self.file_path):
+            errors = [(message.line, message.column, message.format()) for message in messages]
+        return self.build_error_map(errors, file_content_lines, node_index)
 
-        # Run Pylint with the specified arguments
-        lint.Run([str(self.file_path)], reporter=reporter, exit=False)
+    def run_pylint(self, file_path=None):
+        """
+        Lints the file, by the warm worker pool if available.
 
-        line_numbers = {}
-        for error in pylint_output.getvalue().splitlines()[1:-4]:
-            file_name, error_msg = error.split(' ', maxsplit=1)
-            file_name, line_number, char_number = file_name.strip(':').rsplit(':', maxsplit=2)
-            line_number, char_number = int(line_number), int(char_number)
-            if file_content_lines[line_number - 1].strip().startswith('#'):
-                continue
-            if node := self.get_node_with_error(tree, line_number):
-                code_block = '\n'.join(file_content_lines[node.lineno - 1:node.end_lineno])
-                line_numbers[line_number] = (
-                    code_block, line_number, char_number, error_msg, node.lineno - 1, node.end_lineno - 1
-                )
+        Parameters:
+        file_path (str): Path to the file to lint, the parsed file by default.
 
-        return line_numbers
+        Returns:
+        list: The reported messages as LintMessage records.
+        """
+        file_path = file_path or self.file_path
+        with metrics.span('lint.run', file=file_path):
+            if self.pylint_pool is not None:
+                return self.pylint_pool.lint(file_path)
+            return get_backend('PyLint').lint(file_path, self.pylint_checks)
 
     def get_errors_from_file_openai(self):
         """
         Detects and returns errors from the file using OpenAI's error detection.
 
         Returns:
-        dict: A dictionary where keys are line numbers and values are tuples containing:
-              (code_block, line_number, char_number, error_msg).
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord
+              sharing the lines of the file.
         """
         with open(self.file_path, 'r', encoding='utf-8') as f:
             file_content = f.read()
             file_content_lines = file_content.splitlines()
 
-        tree = [node for node in ast.walk(ast.parse(file_content)) if hasattr(node, 'lineno')]
+        if (node_index := self.try_build_node_index(file_content)) is None:
+            # The file cannot be split into chunks, its syntax error is reported instead
+            return self.build_error_map(check_source(file_content), file_content_lines, None)
 
-        line_numbers = {}
-        detected_errors = ErrorsDetector().get_error_detection(file_content).splitlines()
+        detected_errors = get_backend('OpenAI').detect(file_content, self.changed_lines)
+        with metrics.span('output.parse', file=self.file_path):
+            errors = self.parse_detected_errors(detected_errors.splitlines())
+        return self.build_error_map(errors, file_content_lines, node_index)
+
+    @staticmethod
+    def parse_detected_errors(detected_errors):
+        """
+        Parses the lines of the OpenAI detection output. Lines which do not start with a line number are skipped.
+
+        Parameters:
+        detected_errors (list): Lines of the detection output, each a line number followed by an error description.
+
+        Returns:
+        list: Tuples (line_number, char_number, error_msg).
+        """
+        errors = []
         for error in detected_errors:
-            line_number, error_msg = error.split(' ', maxsplit=1)
-            line_number, char_number = int(line_number), 0
-            if file_content_lines[line_number - 1].strip().startswith('#'):
-                continue
-            if node := self.get_node_with_error(tree, line_number):
-                code_block = '\n'.join(file_content_lines[node.lineno - 1:node.end_lineno])
-                line_numbers[line_number] = (
-                code_block, line_number, char_number, error_msg, node.lineno - 1, node.end_lineno - 1)
+            line_number, _, error_msg = error.strip().partition(' ')
+            if line_number.isdigit():
+                errors.append((int(line_number), 0, error_msg))
+        return errors
+
+    def build_error_map(self, errors, file_content_lines, node_index):
+        """
+        Assigns the code blocks to the errors.
+
+        Parameters:
+        errors (list): Tuples (line_number, char_number, error_msg).
+        file_content_lines (list): Lines of the file.
+        node_index (NodeIndex): Index of the AST nodes parsed from the file content, or None if the file
+                                has a syntax error. The code block of each error is its line then.
 
+        Returns:
+        dict: A dictionary where keys are line numbers and values are lists of ErrorRecord
+              sharing the lines of the file.
+        """
+        line_numbers = {}
+        with metrics.span('node.lookup', file=self.file_path):
+            for line_number, char_number, error_msg in sorted(errors, key=lambda error: error[:2]):
+                if not 1 <= line_number <= len(file_content_lines):
+                    continue
+                if self.changed_lines is not None and line_number not in self.changed_lines:
+                    continue
+                if file_content_lines[line_number - 1].strip().startswith('#'):
+                    continue
+                if node_index is None:
+                    block_line_start = block_line_end = line_number - 1
+                elif span := self.get_node_with_error(node_index, line_number):
+                    block_line_start, block_line_end = span.start - 1, span.end - 1
+                else:
+                    continue
+                line_numbers.setdefault(line_number, []).append(ErrorRecord(
+                    line_number, char_number, error_msg, block_line_start, block_line_end, file_content_lines
+                ))
         return line_numbers
 
+    @staticmethod
+    def group_errors_by_block(line_numbers):
+        """
+        Groups the errors by their enclosing code block, so all errors of a block can be corrected at once.
+
+        Parameters:
+        line_numbers (dict): The errors as returned by `get_errors_from_file`.
+
+        Returns:
+        dict: A dictionary where keys are tuples (start_line, end_line) of the code blocks, in the order of the file,
+              and values are lists of the ErrorRecord of the block.
+        """
+        blocks = {}
+        for line_number in sorted(line_numbers):
+            for error in line_numbers[line_number]:
+                blocks.setdefault(error.block, []).append(error)
+        return blocks
+
+    def update_errors_after_change(self, line_numbers, selected_algorithm, block_line_start, block_line_end,
+                                   new_block):
+        """
+        Updates the errors after a block of the file was replaced, without analyzing the whole file again.
+
+        Parameters:
+        line_numbers (dict): The errors of the file before the change, as returned by `get_errors_from_file`.
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+        block_line_start (int): The starting line index of the replaced block.
+        block_line_end (int): The ending line index of the replaced block.
+        new_block (str): The new block of code, already written to the file.
+
+        Returns:
+        dict: The updated errors in the format of `get_errors_from_file`.
+        """
+        return self.update_errors_after_changes(line_numbers, selected_algorithm,
+                                                [(block_line_start, block_line_end, new_block)])
+
+    def update_errors_after_changes(self, line_numbers, selected_algorithm, changes):
+        """
+        Updates the errors after blocks of the file were replaced, without analyzing the whole file again.
+
+        Only the new blocks are analyzed, together with the imports and the enclosing classes they need.
+        The errors of the replaced blocks are dropped, the other errors are shifted by the change
+        of the size of the blocks above them, and the code blocks of all errors are taken from the changed file.
+        Whether an import is used depends on the whole module, so the unused imports are recomputed
+        for the whole file by the fast checks.
+        When a block is nested in a function or a compound statement, a block contains imports of the module,
+        or there are more than `MAX_INCREMENTAL_CHANGES` changes, the whole file is analyzed instead.
+
+        Parameters:
+        line_numbers (dict): The errors of the file before the changes, as returned by `get_errors_from_file`.
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+        changes (list): Tuples (line_index_start, line_index_end, new_block) of non-overlapping changes,
+                        already written to the file. The line indexes refer to the file before the changes.
+
+        Returns:
+        dict: The updated errors in the format of `get_errors_from_file`.
+        """
+        if len(changes) > MAX_INCREMENTAL_CHANGES:
+            return self.detect_errors(selected_algorithm)
+
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
+            file_content_lines = file_content.splitlines()
+
+        with metrics.span('ast.parse', file=self.file_path):
+            tree = ast.parse(file_content)
+
+        # Positions of the new blocks in the changed file and the size change of each block
+        shifts = []
+        fragments = []
+        delta = 0
+        for block_line_start, block_line_end, new_block in sorted(changes, key=lambda change: change[0]):
+            block_delta = len(new_block.split('\n')) - (block_line_end - block_line_start + 1)
+            new_block_line_start = block_line_start + delta
+            try:
+                fragments.append(build_fragment(tree, file_content_lines, new_block_line_start + 1,
+                                                new_block_line_start + len(new_block.split('\n'))))
+            except ValueError:
+                return self.detect_errors(selected_algorithm)
+            shifts.append((block_line_start, block_line_end, block_delta))
+            delta += block_delta
+
+        errors = []
+        for line_errors in line_numbers.values():
+            for error in line_errors:
+                if any(start <= error.line_number - 1 <= end for start, end, _ in shifts):
+                    continue
+                line_delta = sum(block_delta for start, end, block_delta in shifts if error.line_number - 1 > end)
+                errors.append((error.line_number + line_delta, error.char_number, error.error_msg))
+        for fragment in fragments:
+            errors += self.detect_fragment_errors(selected_algorithm, fragment)
+        if self.reports_unused_imports(selected_algorithm):
+            errors = [error for error in errors if not error[2].endswith('(unused-import)')]
+            errors += [error for error in check_source(file_content) if error[2].endswith('(unused-import)')]
+        return self.build_error_map(errors, file_content_lines, NodeIndex(tree, self.granularity))
+
+    def reports_unused_imports(self, selected_algorithm):
+        """
+        Checks whether the algorithm reports the unused imports, in the format of the fast checks.
+        PyLint does not report them in the `__init__.py` files by default.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+
+        Returns:
+        bool: True if the unused imports of the file are reported by the algorithm.
+        """
+        if selected_algorithm != 'PyLint' or os.path.basename(self.file_path) == '__init__.py':
+            return False
+        return not self.pylint_checks or bool(UNUSED_IMPORT_CHECKS & set(self.pylint_checks))
+
+    def detect_fragment_errors(self, selected_algorithm, fragment):
+        """
+        Detects errors in a fragment of the file.
+
+        Parameters:
+        selected_algorithm (str): The algorithm to use for error detection. Options are 'PyLint' or 'OpenAI'.
+        fragment (CodeChunk): The fragment created by `build_fragment`.
+
+        Returns:
+        list: Tuples (line_number, char_number, error_msg) with line numbers of the file.
+        """
+        if selected_algorithm == 'OpenAI':
+            return self.parse_detected_errors(get_backend('OpenAI').detect_fragment(fragment))
+
+        # Written next to the file, so the imports of its package and of the sibling modules are resolved
+        with tempfile.NamedTemporaryFile('w', suffix='.py', encoding='utf-8', delete=False,
+                                         dir=os.path.dirname(os.path.abspath(self.file_path))) as f:
+            f.write(fragment.content)
+        try:
+            messages = self.run_pylint(f.name)
+        finally:
+            os.remove(f.name)
+        return [
+            (fragment.line_map[message.line - 1], message.column, message.format())
+            for message in messages
+            if 1 <= message.line <= len(fragment.line_map) and fragment.line_map[message.line - 1] is not None
+            and message.symbol not in FRAGMENT_IGNORED_SYMBOLS
+        ]
 
 if __name__ == '__main__':
     file_parser = FileParser(r"C:\Progs\ODBBrowser\v.5.18.6\bin\presentation\comp_widgets.py")
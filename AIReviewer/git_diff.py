@@ -0,0 +1,127 @@
+import os
+import re
+import subprocess
+
+# Header of a hunk of a unified diff, the start and the length of the hunk in the new version
+HUNK_HEADER_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+# Escapes of the C-style quoted paths of git, besides the octal escapes of bytes
+QUOTED_PATH_ESCAPES = {'a': '\a', 'b': '\b', 't': '\t', 'n': '\n', 'v': '\v', 'f': '\f', 'r': '\r',
+                       '"': '"', '\\': '\\'}
+
+
+def run_git(root, *args) -> str:
+    """
+    Runs a git command in the directory.
+
+    Parameters:
+    root (str): The directory to run the command in.
+    *args (str): The arguments of the git command.
+
+    Returns:
+    str: The standard output of the command.
+
+    Raises:
+    subprocess.CalledProcessError: If the command fails, e.g. outside of a repository or with an unknown ref.
+    """
+    return subprocess.run(['git', '-c', 'core.quotePath=false', '-C', root, *args],
+                          capture_output=True, text=True, encoding='utf-8', check=True).stdout
+
+
+def unquote_path(path):
+    """
+    Decodes a path quoted by git. Paths with special characters, and with non-ASCII characters unless
+    `core.quotePath` is false, are enclosed in double quotes with C-style escapes.
+
+    Parameters:
+    path (str): The path as printed by git.
+
+    Returns:
+    str: The path, unchanged if it is not quoted.
+    """
+    if len(path) < 2 or not path.startswith('"') or not path.endswith('"'):
+        return path
+    data = bytearray()
+    i = 1
+    while i < len(path) - 1:
+        if path[i] == '\\' and path[i + 1] in '01234567':
+            data.append(int(path[i + 1:i + 4], 8))
+            i += 4
+        elif path[i] == '\\':
+            data += QUOTED_PATH_ESCAPES.get(path[i + 1], path[i + 1]).encode('utf-8')
+            i += 2
+        else:
+            data += path[i].encode('utf-8')
+            i += 1
+    return data.decode('utf-8', errors='surrogateescape')
+
+
+def parse_diff_path(target):
+    """
+    Parses the path of a `+++` line of a unified diff.
+
+    Parameters:
+    target (str): The rest of the line after '+++ '.
+
+    Returns:
+    str: The path of the file in the new version, None for a removed file.
+    """
+    # Git ends the names containing spaces with a tab, names ending with a tab are quoted
+    target = unquote_path(target.rstrip('\t'))
+    if target == '/dev/null':
+        return None
+    return target[2:] if target.startswith('b/') else target
+
+
+def parse_diff(diff_text):
+    """
+    Parses the changed lines of the new versions of the files from a unified diff with zero context lines.
+
+    Lines removed without a replacement mark the lines around the removal, so code around
+    the removal is still reviewed. Quoted paths are decoded.
+
+    Parameters:
+    diff_text (str): The output of `git diff -U0`.
+
+    Returns:
+    dict: Sets of the changed line numbers (1-based) by the paths of the files in the new version.
+    """
+    changed_lines = {}
+    path = None
+    for line in diff_text.splitlines():
+        if line.startswith('+++ '):
+            path = parse_diff_path(line[4:])
+            if path is not None:
+                changed_lines.setdefault(path, set())
+        elif path is not None and (match := HUNK_HEADER_RE.match(line)):
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                changed_lines[path].update(range(start, start + count))
+            else:
+                changed_lines[path].update(line for line in (start, start + 1) if line >= 1)
+    return changed_lines
+
+
+def get_changed_lines(root, base_ref):
+    """
+    Finds the Python files under the directory changed since the base ref, including the uncommitted
+    changes, and their changed lines.
+
+    Parameters:
+    root (str): The reviewed directory in a git repository.
+    base_ref (str): The ref to compare with, e.g. 'origin/main'.
+
+    Returns:
+    dict: Sets of the changed line numbers (1-based) by the absolute paths of the changed files.
+          The value is None for untracked files, which are new as a whole.
+    """
+    diff_text = run_git(root, 'diff', '-U0', '--no-color', '--no-ext-diff', '--relative', base_ref, '--', '*.py')
+    changed_lines = {
+        os.path.abspath(os.path.join(root, path)): lines for path, lines in parse_diff(diff_text).items()
+    }
+    # Separated by NUL characters, so the paths are not quoted
+    untracked = run_git(root, 'ls-files', '-z', '--others', '--exclude-standard', '--', '*.py')
+    for path in filter(None, untracked.split('\0')):
+        changed_lines[os.path.abspath(os.path.join(root, path))] = None
+    return changed_lines
@@ -0,0 +1,218 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import threading
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job which was cancelled while running.
+    """
+
+
+class Job:
+    """
+    A function running in the background, shared by everybody who submitted the same key.
+
+    The function receives the job, so it can report its progress, publish partial output
+    and stop early when the job is cancelled.
+    """
+
+    def __init__(self, key, function):
+        """
+        Initializes the job.
+
+        Args:
+            key (tuple): The key identifying the job, the first item is the kind of the job.
+            function (callable): The function run by the job, called with the job as the only argument.
+        """
+        self.key = key
+        self.function = function
+        self.future = None
+        self.status = "Queued"
+        self.progress = None
+        self.partial = []
+        self.owners = 0
+        self.cancelled = threading.Event()
+        self.updated = threading.Condition()
+
+    def report(self, status=None, progress=None):
+        """
+        Reports the progress of the job.
+
+        Args:
+            status (str): Description of what the job is doing.
+            progress (float): The done fraction of the job between 0 and 1, None if unknown.
+        """
+        with self.updated:
+            if status is not None:
+                self.status = status
+            self.progress = progress
+            self.updated.notify_all()
+
+    def publish(self, piece):
+        """
+        Publishes a piece of the partial output of the job.
+
+        Args:
+            piece (str): The next piece of the output.
+
+        Raises:
+            JobCancelled: If the job was cancelled, so the function stops producing the output.
+        """
+        self.check_cancelled()
+        with self.updated:
+            self.partial.append(piece)
+            self.updated.notify_all()
+
+    def check_cancelled(self):
+        """
+        Stops the job if it was cancelled.
+
+        Raises:
+            JobCancelled: If the job was cancelled.
+        """
+        if self.cancelled.is_set():
+            raise JobCancelled(f"Job {self.key} was cancelled")
+
+    def stream(self):
+        """
+        Yields the partial output of the job as it is published, the pieces already published immediately.
+
+        Yields:
+            str: The next piece of the output.
+        """
+        position = 0
+        while True:
+            with self.updated:
+                self.updated.wait_for(lambda: len(self.partial) > position or self.done(), timeout=0.1)
+                new_pieces = self.partial[position:]
+            position += len(new_pieces)
+            yield from new_pieces
+            if self.done() and position == len(self.partial):
+                self.result()  # Raise the error of a failed job
+                return
+
+    def done(self) -> bool:
+        """
+        Checks whether the job finished, failed or was cancelled.
+
+        Returns:
+            bool: True if the job is over.
+        """
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Waits for the result of the job.
+
+        Args:
+            timeout (float): How long to wait in seconds, forever if None.
+
+        Returns:
+            The value returned by the function of the job.
+        """
+        return self.future.result(timeout)
+
+    def cancel(self):
+        """
+        Cancels the job. A queued job never starts, a running job is stopped at its next check.
+        """
+        self.cancelled.set()
+        self.future.cancel()
+
+
+class JobManager:
+    """
+    Runs jobs in the background, shared by the whole process.
+
+    Jobs are identified by keys. Submitting a key of a job which is still queued or running returns
+    that job instead of starting a new one, so identical work requested by several sessions runs once.
+    Each kind of jobs has its own pool of worker threads, so slow jobs of one kind do not hold up the others.
+    A job is cancelled when all its owners release it.
+    """
+
+    def __init__(self, workers):
+        """
+        Initializes the manager.
+
+        Args:
+            workers (dict): Number of worker threads by the kind of jobs.
+        """
+        self.executors = {
+            kind: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"aireviewer-{kind}")
+            for kind, max_workers in workers.items()
+        }
+        self.jobs = {}
+        # Reentrant, the done callback of a job finished before it is registered runs under the lock
+        self.lock = threading.RLock()
+
+    def submit(self, key, function) -> Job:
+        """
+        Starts the job, or joins the queued or running job with the same key.
+        The caller becomes an owner of the job and has to release it when it is no longer interested.
+
+        Args:
+            key (tuple): The key identifying the job, the first item is the kind of the job.
+            function (callable): The function run by the job, called with the job as the only argument.
+
+        Returns:
+            Job: The job.
+        """
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None or job.cancelled.is_set():
+                job = self.jobs[key] = Job(key, function)
+                job.future = self.executors[key[0]].submit(self._run, job)
+                job.future.add_done_callback(lambda _: self._forget(job))
+            job.owners += 1
+            return job
+
+    def release(self, job):
+        """
+        Gives up the ownership of the job, the job is cancelled if nobody else owns it.
+
+        Args:
+            job (Job): The job returned by `submit`.
+        """
+        with self.lock:
+            job.owners -= 1
+            if job.owners <= 0 and not job.done():
+                job.cancel()
+
+    def _run(self, job):
+        """
+        Runs the function of the job.
+
+        Args:
+            job (Job): The job.
+
+        Returns:
+            The value returned by the function of the job.
+        """
+        if job.cancelled.is_set():
+            raise CancelledError()
+        job.report("Running")
+        try:
+            return job.function(job)
+        finally:
+            job.report("Done", 1.0)
+
+    def _forget(self, job):
+        """
+        Removes the finished job, the following submits of its key start a new job.
+
+        Args:
+            job (Job): The finished job.
+        """
+        with self.lock:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+
+    def shutdown(self):
+        """
+        Cancels all jobs and stops the workers.
+        """
+        with self.lock:
+            for job in self.jobs.values():
+                job.cancel()
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
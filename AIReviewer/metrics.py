@@ -0,0 +1,235 @@
+from contextlib import contextmanager
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    Timings of the stages of a review and counters of the token usage, cache lookups and retries,
+    shared by the whole process.
+
+    Every finished span and counted event is logged by the `AIReviewer.metrics` logger as a JSON object,
+    so nothing is formatted unless the logger is enabled for INFO, see `enable_json_log`. The aggregates
+    can be exported in the Prometheus text format.
+    """
+
+    def __init__(self):
+        """
+        Initializes empty metrics.
+        """
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """
+        Measures the duration of the block of the `with` statement.
+
+        Args:
+            stage (str): Name of the stage, e.g. 'ast.parse'.
+            **fields: Additional fields of the logged span, e.g. the path of the file.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(stage, time.perf_counter() - start, **fields)
+
+    def record_span(self, stage, seconds, **fields):
+        """
+        Records the duration of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): The duration.
+            **fields: Additional fields of the logged span.
+        """
+        with self.lock:
+            calls, total, longest = self.stages.get(stage, (0, 0.0, 0.0))
+            self.stages[stage] = (calls + 1, total + seconds, max(longest, seconds))
+        self.log('span', stage=stage, seconds=round(seconds, 6), **fields)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): Name of the counter, e.g. 'openai_retries'.
+            amount (int): The increment.
+            **labels: Labels distinguishing the values of the counter, e.g. the model.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self.log('count', name=name, amount=amount, **labels)
+
+    def record_usage(self, usage, model):
+        """
+        Counts the tokens of a completion.
+
+        Args:
+            usage (openai.types.CompletionUsage): The usage reported by the API.
+            model (str): The model of the completion.
+        """
+        self.increment('openai_tokens', usage.prompt_tokens, kind='prompt', model=model)
+        self.increment('openai_tokens', usage.completion_tokens, kind='completion', model=model)
+
+    def record_cache_lookup(self, cache, hit):
+        """
+        Counts a cache lookup.
+
+        Args:
+            cache (str): Name of the cache, 'analysis' or 'correction'.
+            hit (bool): Whether the value was found.
+        """
+        self.increment('cache_lookups', cache=cache, result='hit' if hit else 'miss')
+
+    def get_counter(self, name, **labels):
+        """
+        Sums the values of a counter with the given labels.
+
+        Args:
+            name (str): Name of the counter.
+            **labels: Labels the summed values must have, all values if none.
+
+        Returns:
+            int: The sum.
+        """
+        with self.lock:
+            return sum(value for (counter_name, counter_labels), value in self.counters.items()
+                       if counter_name == name and labels.items() <= dict(counter_labels).items())
+
+    def get_cache_hit_rate(self, cache):
+        """
+        Gets the fraction of the lookups of the cache which found the value.
+
+        Args:
+            cache (str): Name of the cache.
+
+        Returns:
+            float: The hit rate, None before the first lookup.
+        """
+        hits = self.get_counter('cache_lookups', cache=cache, result='hit')
+        lookups = self.get_counter('cache_lookups', cache=cache)
+        return hits / lookups if lookups else None
+
+    def get_stages(self):
+        """
+        Gets the aggregated timings of the stages.
+
+        Returns:
+            dict: Tuples (calls, total seconds, longest seconds) by the stage.
+        """
+        with self.lock:
+            return dict(self.stages)
+
+    def log(self, event, **fields):
+        """
+        Logs an event as a JSON object.
+
+        Args:
+            event (str): Type of the event, 'span' or 'count'.
+            **fields: Fields of the event.
+        """
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'event': event, 'time': time.time(), **fields}, default=str))
+
+    def to_prometheus(self):
+        """
+        Formats the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        with self.lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+
+        lines = [
+            "# HELP aireviewer_stage_calls_total Number of runs of the stage.",
+            "# TYPE aireviewer_stage_calls_total counter",
+        ]
+        lines += [f"aireviewer_stage_calls_total{_format_labels({'stage': stage})} {calls}"
+                  for stage, (calls, _, _) in stages]
+        lines += [
+            "# HELP aireviewer_stage_seconds_total Time spent in the stage.",
+            "# TYPE aireviewer_stage_seconds_total counter",
+        ]
+        lines += [f"aireviewer_stage_seconds_total{_format_labels({'stage': stage})} {total:.6f}"
+                  for stage, (_, total, _) in stages]
+        lines += [
+            "# HELP aireviewer_stage_seconds_max Longest run of the stage.",
+            "# TYPE aireviewer_stage_seconds_max gauge",
+        ]
+        lines += [f"aireviewer_stage_seconds_max{_format_labels({'stage': stage})} {longest:.6f}"
+                  for stage, (_, _, longest) in stages]
+
+        previous_name = None
+        for (name, labels), value in counters:
+            if name != previous_name:
+                lines.append(f"# TYPE aireviewer_{name}_total counter")
+                previous_name = name
+            lines.append(f"aireviewer_{name}_total{_format_labels(dict(labels))} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics in the Prometheus text format to a file, e.g. for the textfile collector
+        of the node exporter. The file is replaced atomically, so it is never read half-written.
+
+        Args:
+            path (str): Path to the file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as f:
+            f.write(self.to_prometheus())
+        os.replace(f.name, path)
+
+    def reset(self):
+        """
+        Clears all metrics.
+        """
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+
+
+def _format_labels(labels):
+    """
+    Formats the labels of a Prometheus sample.
+
+    Args:
+        labels (dict): The label values by the label names.
+
+    Returns:
+        str: The labels in braces, empty if there are none.
+    """
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def enable_json_log(path):
+    """
+    Appends the spans and events to a file as JSON Lines.
+
+    Args:
+        path (str): Path to the log file.
+    """
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+# The metrics of the process
+metrics = Metrics()
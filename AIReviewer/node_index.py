@@ -0,0 +1,136 @@
+from bisect import bisect_right
+from collections import namedtuple
+import ast
+
+# Span of lines (1-based, inclusive) covered by an AST node, decorators included
+NodeSpan = namedtuple('NodeSpan', ['start', 'end', 'node'])
+
+DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# Supported granularities of the index:
+#   'def'       - innermost enclosing function, method or class, or the statement directly in a module/class body
+#   'statement' - innermost enclosing statement
+#   'top'       - enclosing top-level statement of the module
+GRANULARITIES = ('def', 'statement', 'top')
+
+
+class NodeIndex:
+    """
+    Sorted span index answering which AST node encloses a given line.
+
+    The spans of the AST nodes are properly nested, so they are flattened once into sorted,
+    non-overlapping segments, each one pointing to the innermost node covering it.
+    A lookup is then a binary search over the segment starts.
+    """
+
+    def __init__(self, tree, granularity='def'):
+        """
+        Builds the index over the nodes of the parsed module.
+
+        Parameters:
+        tree (ast.Module): The parsed module.
+        granularity (str): Which nodes are indexed, one of `GRANULARITIES`.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}, expected one of {GRANULARITIES}")
+        self.granularity = granularity
+        self._starts = []
+        self._spans = []
+
+        spans = sorted(self._collect_spans(tree, granularity), key=lambda span: (span.start, -span.end))
+        stack = []
+        next_line = 1
+        for span in spans:
+            # Close the spans which end before the current one starts
+            while stack and stack[-1].end < span.start:
+                next_line = self._close_span(stack, next_line)
+            if span.start > next_line:
+                self._add_segment(next_line, stack[-1] if stack else None)
+                next_line = span.start
+            stack.append(span)
+        while stack:
+            next_line = self._close_span(stack, next_line)
+        # Lines after the last node are not covered by any node
+        self._add_segment(next_line, None)
+
+    @staticmethod
+    def _collect_spans(tree, granularity):
+        """
+        Collects the spans of the nodes indexed with the given granularity.
+
+        Parameters:
+        tree (ast.Module): The parsed module.
+        granularity (str): Which nodes are indexed, one of `GRANULARITIES`.
+
+        Returns:
+        list: List of NodeSpan.
+        """
+        if granularity == 'top':
+            nodes = tree.body
+        elif granularity == 'statement':
+            nodes = [node for node in ast.walk(tree) if isinstance(node, ast.stmt)]
+        else:
+            nodes = []
+            for parent in ast.walk(tree):
+                if isinstance(parent, (ast.Module, ast.ClassDef)):
+                    nodes.extend(parent.body)
+                else:
+                    nodes.extend(node for node in ast.iter_child_nodes(parent) if isinstance(node, DEFINITION_TYPES))
+        return [NodeSpan(node_start_line(node), node.end_lineno, node) for node in nodes]
+
+    def _add_segment(self, start, span):
+        """
+        Starts a new segment of lines covered by the span.
+
+        Parameters:
+        start (int): The first line of the segment.
+        span (NodeSpan): The innermost span covering the segment, or None.
+        """
+        if self._starts and self._starts[-1] == start:
+            self._spans[-1] = span
+        else:
+            self._starts.append(start)
+            self._spans.append(span)
+
+    def _close_span(self, stack, next_line):
+        """
+        Pops the innermost open span and assigns its remaining lines to it.
+
+        Parameters:
+        stack (list): The open spans, innermost last.
+        next_line (int): The first line not yet assigned to a segment.
+
+        Returns:
+        int: The first line not yet assigned to a segment after closing the span.
+        """
+        span = stack.pop()
+        if span.end >= next_line:
+            self._add_segment(next_line, span)
+            next_line = span.end + 1
+        return next_line
+
+    def find(self, line_number):
+        """
+        Finds the innermost indexed node enclosing the line.
+
+        Parameters:
+        line_number (int): The line number (1-based).
+
+        Returns:
+        NodeSpan: The span of the enclosing node, or None if no indexed node covers the line.
+        """
+        index = bisect_right(self._starts, line_number) - 1
+        return self._spans[index] if index >= 0 else None
+
+
+def node_start_line(node):
+    """
+    Returns the first line of the node, including its decorators.
+
+    Parameters:
+    node (ast.AST): The AST node.
+
+    Returns:
+    int: The first line of the node (1-based).
+    """
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
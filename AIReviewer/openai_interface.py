@@ -1,12 +1,14 @@
-import openai
-import os
+from concurrent.futures import ThreadPoolExecutor
+
+from AIReviewer.code_chunker import CodeChunk, estimate_tokens, remap_detection, split_changed_nodes, split_into_chunks
+from AIReviewer.metrics import metrics
+from AIReviewer.transport import get_transport
 
 
 class ErrorsSolver:
     """
     Class for solving coding errors using OpenAI's language models.
     """
-    OPENAI_API_KEY_PATH = "../openai_key.txt"
     MODEL = "gpt-4o"
     SYSTEM_MESSAGE = {
         'role': 'system',
@@ -22,29 +24,50 @@ class ErrorsSolver:
                                "COLUMN: {2}\n"
                                "ERROR MESSAGE: {3}")
 
-    def __init__(self):
+    BLOCK_SYSTEM_MESSAGE = {
+        'role': 'system',
+        'content': "You are a skilled coding assistant. As an input, you get a codeblock with one or more errors,"
+                   "the location of each error and its error message. You should return the same codeblock"
+                   "but all the specified errors should be removed."
+                   "DO NOT USE MARKDOWN!!! Be careful not to introduce another error!"
+                   "IT IS CRUCIAL TO RETURN ONLY CODE, no other text should be included!!!!!!!!!!!!!!"
+    }
+
+    BLOCK_SPECIFICATION_TPL = "THE BLOCK OF CODE: {0}\n{1}"
+    BLOCK_ERROR_TPL = ("LINE: {0}\n"
+                       "COLUMN: {1}\n"
+                       "ERROR MESSAGE: {2}")
+
+    def __init__(self, cache=None, transport=None):
         """
-        Initialize the ErrorsSolver class by setting up the OpenAI API client.
+        Initialize the ErrorsSolver class.
+
+        Args:
+            cache (CorrectionCache): Optional cache of the corrections, shared across errors, files and sessions.
+            transport (LLMTransport): Transport to the OpenAI API, the one shared by the whole process by default.
         """
-        if "OPENAI_API_KEY" not in os.environ:
-            self.openai_api_key = self.get_openai_api_key()
-            os.environ["OPENAI_API_KEY"] = self.openai_api_key
-        self.client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
+        self.cache = cache
+        self.transport = transport or get_transport()
 
-    def get_openai_api_key(self):
+    def get_error_correction(self, block: str, line: int, column: int, message: str) -> str:
         """
-        Retrieve the OpenAI API key from a file.
+        Get corrected code for the given code block with an error.
+
+        Args:
+            block (str): The block of code containing the error.
+            line (int): The line number where the error occurs.
+            column (int): The column number where the error occurs.
+            message (str): The error message describing the issue.
 
         Returns:
-            str: The OpenAI API key.
+            str: The corrected code block.
         """
-        with open(self.OPENAI_API_KEY_PATH, "r") as f:
-            openai_api_key = f.readline().strip()
-        return openai_api_key
+        messages = [self.SYSTEM_MESSAGE, self.create_user_message(block, line, column, message)]
+        return self.get_correction(messages)
 
-    def get_error_correction(self, block: str, line: int, column: int, message: str) -> str:
+    def stream_error_correction(self, block: str, line: int, column: int, message: str):
         """
-        Get corrected code for the given code block with an error.
+        Stream corrected code for the given code block with an error as the tokens arrive.
 
         Args:
             block (str): The block of code containing the error.
@@ -52,15 +75,107 @@ class ErrorsSolver:
             column (int): The column number where the error occurs.
             message (str): The error message describing the issue.
 
+        Yields:
+            str: The next piece of the corrected code block.
+        """
+        messages = [self.SYSTEM_MESSAGE, self.create_user_message(block, line, column, message)]
+        yield from self.stream_correction(messages)
+
+    def get_block_correction(self, block: str, errors: list, tag: str = None) -> str:
+        """
+        Get corrected code for the given code block with all its errors fixed in a single completion.
+
+        Args:
+            block (str): The block of code containing the errors.
+            errors (list): Tuples (line, column, message) of the errors in the block.
+            tag (str): Optional tag of the cached correction, the path of the corrected file.
+
+        Returns:
+            str: The corrected code block.
+        """
+        return self.get_correction(self.create_block_messages(block, errors), tag)
+
+    def stream_block_correction(self, block: str, errors: list, tag: str = None):
+        """
+        Stream corrected code for the given code block with all its errors fixed as the tokens arrive.
+
+        Args:
+            block (str): The block of code containing the errors.
+            errors (list): Tuples (line, column, message) of the errors in the block.
+            tag (str): Optional tag of the cached correction, the path of the corrected file.
+
+        Yields:
+            str: The next piece of the corrected code block.
+        """
+        yield from self.stream_correction(self.create_block_messages(block, errors), tag)
+
+    def get_correction(self, messages: list, tag: str = None) -> str:
+        """
+        Get the correction for the prompt, from the cache if available.
+
+        Args:
+            messages (list): The chat messages of the prompt.
+            tag (str): Optional tag of the cached correction, the path of the corrected file.
+
         Returns:
             str: The corrected code block.
         """
-        user_message = self.create_user_message(block, line, column, message)
-        response = self.client.chat.completions.create(
-            model=self.MODEL,  # You can use other models as well
-            messages=[self.SYSTEM_MESSAGE, user_message]
-        )
-        return response.choices[0].message.content
+        if self.cache is None:
+            return self.request_correction(messages)
+
+        requested = []
+
+        def request():
+            requested.append(True)
+            return self.request_correction(messages)
+
+        correction = self.cache.get_or_compute(self.cache.make_key(self.MODEL, messages), request, tag)
+        metrics.record_cache_lookup('correction', not requested)
+        return correction
+
+    def stream_correction(self, messages: list, tag: str = None):
+        """
+        Stream the correction for the prompt as the tokens arrive.
+        A cached correction is yielded at once, a streamed one is cached when complete.
+
+        Args:
+            messages (list): The chat messages of the prompt.
+            tag (str): Optional tag of the cached correction, the path of the corrected file.
+
+        Yields:
+            str: The next piece of the corrected code block.
+        """
+        key = self.cache.make_key(self.MODEL, messages) if self.cache is not None else None
+        if key is not None:
+            correction = self.cache.get(key)
+            metrics.record_cache_lookup('correction', correction is not None)
+            if correction is not None:
+                yield correction
+                return
+
+        pieces = []
+        with metrics.span('openai.correction'):
+            for piece in self.transport.stream_completion(model=self.MODEL, messages=messages):
+                pieces.append(piece)
+                yield piece
+        if key is not None:
+            self.cache.set(key, ''.join(pieces), tag)
+
+    def request_correction(self, messages: list) -> str:
+        """
+        Send the prompt to the OpenAI API.
+
+        Args:
+            messages (list): The chat messages of the prompt.
+
+        Returns:
+            str: The corrected code block.
+        """
+        with metrics.span('openai.correction'):
+            return self.transport.create_completion(
+                model=self.MODEL,  # You can use other models as well
+                messages=messages
+            )
 
     def create_user_message(self, block: str, line: int, column: int, message: str) -> dict:
         """
@@ -82,13 +197,49 @@ class ErrorsSolver:
         }
         return user_message
 
+    def create_block_messages(self, block: str, errors: list) -> list:
+        """
+        Create the chat messages of the prompt correcting all errors of a code block.
+
+        Args:
+            block (str): The block of code containing the errors.
+            errors (list): Tuples (line, column, message) of the errors in the block.
+
+        Returns:
+            list: The chat messages of the prompt.
+        """
+        return [self.BLOCK_SYSTEM_MESSAGE, self.create_block_user_message(block, errors)]
+
+    def create_block_user_message(self, block: str, errors: list) -> dict:
+        """
+        Create a user message listing all errors of a code block for the OpenAI API call.
+
+        Args:
+            block (str): The block of code containing the errors.
+            errors (list): Tuples (line, column, message) of the errors in the block.
+
+        Returns:
+            dict: The user message in the required format.
+        """
+        error_specifications = '\n\n'.join(self.BLOCK_ERROR_TPL.format(*error) for error in errors)
+        user_message = {
+            'role': 'user',
+            'content': self.BLOCK_SPECIFICATION_TPL.format(block, error_specifications)
+        }
+        return user_message
+
 
 class ErrorsDetector:
     """
     Class for detecting coding errors in Python source files using OpenAI's language models.
     """
-    OPENAI_API_KEY_PATH = "../openai_key.txt"
     MODEL = "gpt-4o"
+    # Bump whenever the prompts change, cached detections of older prompts are then ignored
+    PROMPT_VERSION = 1
+    # Files estimated to have more tokens are split into chunks of this size, None disables the chunking
+    CHUNK_TOKENS = 4000
+    # Maximum number of chunks of one file sent at once
+    MAX_CONCURRENCY = 4
     SYSTEM_MESSAGE = {
         'role': 'system',
         'content': "You are a skilled coding assistant. As an input, you get a python source code file."
@@ -100,30 +251,104 @@ class ErrorsDetector:
                    "YOU WILL GET A BIG REWARD IF YOU CORRECTLY FOLLOW ALL MY INSTRUCTION!!!!!!!!!!!!!!"
     }
 
-    def __init__(self):
+    def __init__(self, chunk_tokens=CHUNK_TOKENS, max_concurrency=MAX_CONCURRENCY, transport=None):
         """
-        Initialize the ErrorsDetector class by setting up the OpenAI API client.
+        Initialize the ErrorsDetector class.
+
+        Args:
+            chunk_tokens (int): Token budget of a chunk of a large file, None to always send the whole file.
+            max_concurrency (int): Maximum number of chunks of one file sent at once.
+            transport (LLMTransport): Transport to the OpenAI API, the one shared by the whole process by default.
         """
-        if "OPENAI_API_KEY" not in os.environ:
-            self.openai_api_key = self.get_openai_api_key()
-            os.environ["OPENAI_API_KEY"] = self.openai_api_key
-        self.client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
-        print("class ErrorsDetector:")
+        self.transport = transport or get_transport()
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
 
-    def get_openai_api_key(self):
+    def get_error_detection(self, file_content: str) -> str:
         """
-        Retrieve the OpenAI API key from a file.
+        Get a list of detected errors in the given Python source code.
+
+        Args:
+            file_content (str): The Python source code content.
 
         Returns:
-            str: The OpenAI API key.
+            str: The list of detected errors, one per line.
         """
-        with open(self.OPENAI_API_KEY_PATH, "r") as f:
-            openai_api_key = f.readline().strip()
-        return openai_api_key
+        if self.chunk_tokens and estimate_tokens(file_content) > self.chunk_tokens:
+            try:
+                return self.get_error_detection_chunked(file_content)
+            except SyntaxError:
+                pass  # The file cannot be split along its AST, send it whole
+        return self.request_detection(file_content)
 
-    def get_error_detection(self, file_content: str) -> str:
+    def get_error_detection_chunked(self, file_content: str) -> str:
         """
-        Get a list of detected errors in the given Python source code.
+        Split the source code along its top-level nodes into chunks, detect the errors of all chunks
+        concurrently and map the reported line numbers back to the file.
+
+        Args:
+            file_content (str): The Python source code content.
+
+        Returns:
+            str: The list of detected errors, one per line, with line numbers of the file.
+        """
+        return self.detect_chunks(split_into_chunks(file_content, self.chunk_tokens))
+
+    def get_changed_error_detection(self, file_content: str, changed_lines: set) -> str:
+        """
+        Get a list of detected errors in the top-level nodes of the source code touching the changed lines.
+        Only the changed nodes are sent, together with the imports and the names of the rest of the module.
+
+        Args:
+            file_content (str): The Python source code content.
+            changed_lines (set): The changed line numbers (1-based).
+
+        Returns:
+            str: The list of detected errors, one per line, with line numbers of the file.
+        """
+        return self.detect_chunks(split_changed_nodes(file_content, changed_lines, self.chunk_tokens))
+
+    def detect_chunks(self, chunks: list) -> str:
+        """
+        Detect the errors of all chunks concurrently and map the reported line numbers back to the file.
+
+        Args:
+            chunks (list): The CodeChunk of the file.
+
+        Returns:
+            str: The list of detected errors, one per line, with line numbers of the file.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            detections = executor.map(self.request_detection, [chunk.content for chunk in chunks])
+            detected_errors = []
+            for chunk, detection in zip(chunks, detections):
+                detected_errors.extend(remap_detection(detection, chunk.line_map))
+        return '\n'.join(detected_errors)
+
+    def get_detection_chunks(self, file_content: str, changed_lines: set = None) -> list:
+        """
+        Split the source code into the parts sent in separate prompts, the same way as `get_error_detection`
+        and `get_changed_error_detection` do.
+
+        Args:
+            file_content (str): The Python source code content.
+            changed_lines (set): When given, only the top-level nodes touching these lines are included.
+
+        Returns:
+            list: The CodeChunk of the file, a single chunk of the whole file if it is not split.
+        """
+        if changed_lines is not None:
+            return split_changed_nodes(file_content, changed_lines, self.chunk_tokens)
+        if self.chunk_tokens and estimate_tokens(file_content) > self.chunk_tokens:
+            try:
+                return split_into_chunks(file_content, self.chunk_tokens)
+            except SyntaxError:
+                pass  # The file cannot be split along its AST, send it whole
+        return [CodeChunk(file_content, list(range(1, len(file_content.splitlines()) + 1)))]
+
+    def request_detection(self, file_content: str) -> str:
+        """
+        Send the source code to the OpenAI API in a single prompt.
 
         Args:
             file_content (str): The Python source code content.
@@ -131,14 +356,38 @@ class ErrorsDetector:
         Returns:
             str: The list of detected errors, one per line.
         """
-        secondary_system_message = self.create_secondary_system_message(file_content)
-        user_message = self.create_user_message(file_content)
-        response = self.client.chat.completions.create(
-            model=self.MODEL,  # You can use other models as well
-            messages=[self.SYSTEM_MESSAGE, secondary_system_message, user_message],
-            temperature=0
-        )
-        return response.choices[0].message.content
+        with metrics.span('openai.detection'):
+            return self.transport.create_completion(
+                model=self.MODEL,  # You can use other models as well
+                messages=self.create_messages(file_content),
+                temperature=0
+            )
+
+    def stream_error_detection(self, file_content: str):
+        """
+        Stream the detected errors of the given Python source code, sent in a single prompt, as the tokens arrive.
+
+        Args:
+            file_content (str): The Python source code content.
+
+        Yields:
+            str: The next piece of the list of detected errors.
+        """
+        yield from self.transport.stream_completion(model=self.MODEL, messages=self.create_messages(file_content),
+                                                    temperature=0)
+
+    def create_messages(self, file_content: str) -> list:
+        """
+        Create the chat messages of the prompt detecting the errors of the source code.
+
+        Args:
+            file_content (str): The Python source code content.
+
+        Returns:
+            list: The chat messages of the prompt.
+        """
+        return [self.SYSTEM_MESSAGE, self.create_secondary_system_message(file_content),
+                self.create_user_message(file_content)]
 
     def create_user_message(self, file_content: str) -> dict:
         """
@@ -177,6 +426,49 @@ class ErrorsDetector:
         return secondary_system_message
 
 
+class OpenAIBackend:
+    """
+    Backend of the 'OpenAI' algorithm, loaded by `backends.get_backend` on first use.
+    """
+
+    def get_fingerprint(self) -> str:
+        """
+        Identifies the model, the prompts and the chunking of the detection.
+
+        Returns:
+            str: The fingerprint of the configuration.
+        """
+        return (f"model={ErrorsDetector.MODEL};prompt={ErrorsDetector.PROMPT_VERSION};"
+                f"chunk={ErrorsDetector.CHUNK_TOKENS}")
+
+    def detect(self, file_content: str, changed_lines: set = None) -> str:
+        """
+        Get a list of detected errors in the source code.
+
+        Args:
+            file_content (str): The Python source code content.
+            changed_lines (set): When given, only the top-level nodes touching these lines are sent.
+
+        Returns:
+            str: The list of detected errors, one per line, with line numbers of the file.
+        """
+        if changed_lines is not None:
+            return ErrorsDetector().get_changed_error_detection(file_content, changed_lines)
+        return ErrorsDetector().get_error_detection(file_content)
+
+    def detect_fragment(self, fragment) -> list:
+        """
+        Get the detected errors of a fragment of the file.
+
+        Args:
+            fragment (CodeChunk): The fragment created by `code_chunker.build_fragment`.
+
+        Returns:
+            list: The detected errors, one per item, with line numbers of the file.
+        """
+        return remap_detection(ErrorsDetector().request_detection(fragment.content), fragment.line_map)
+
+
 if __name__ == "__main__":
     block = ("def add(a, b):\n"
              "return a + b\n"
@@ -0,0 +1,136 @@
+class CorrectionPrefetcher:
+    """
+    Requests corrections of the code blocks with errors ahead of time, so navigating between blocks
+    does not wait for OpenAI. All errors of a block are corrected by a single request.
+
+    The requests run as jobs of the shared job manager, so a block requested by several sessions is corrected once
+    and the number of requests in flight is capped by the workers of the manager. Rate limits and retries
+    are handled by the transport of the solver. The corrections are streamed, so a correction which is still
+    being generated can be displayed progressively.
+    """
+
+    def __init__(self, errors_solver, job_manager, lookahead=10, tag=None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            errors_solver (ErrorsSolver): The solver used to get the corrections.
+            job_manager (JobManager): The manager running the correction jobs, with workers for the 'correction' kind.
+            lookahead (int): Number of blocks, in list order, prefetched from the requested one. All blocks if None.
+            tag (str): Optional tag of the cached corrections, the path of the corrected file.
+        """
+        self.errors_solver = errors_solver
+        self.job_manager = job_manager
+        self.lookahead = lookahead
+        self.tag = tag
+        self.blocks = {}
+        self.jobs = {}
+
+    def start(self, blocks, first_key=None, prefetch=True):
+        """
+        Start prefetching the corrections of the code blocks.
+
+        Args:
+            blocks (dict): The errors grouped by block as returned by `FileParser.group_errors_by_block`.
+            first_key (tuple): Key of the block to prefetch first, the first block by default.
+            prefetch (bool): Whether the corrections are requested ahead. If False, only the blocks
+                passed to `get_job` are corrected, e.g. while the errors are provisional.
+        """
+        self.blocks = blocks
+        if blocks and prefetch:
+            self.schedule(first_key if first_key in blocks else next(iter(blocks)))
+
+    def schedule(self, key):
+        """
+        Schedule the correction of the block and of the following `lookahead` blocks, unless already scheduled.
+
+        Args:
+            key (tuple): Key (start_line, end_line) of the block.
+        """
+        keys = list(self.blocks)
+        start = keys.index(key)
+        end = len(keys) if self.lookahead is None else start + 1 + self.lookahead
+        for scheduled_key in keys[start:end]:
+            if scheduled_key not in self.jobs:
+                self.jobs[scheduled_key] = self._submit(self.blocks[scheduled_key])
+
+    def get_job(self, key):
+        """
+        Get the job correcting the block. Prefetching of the following blocks is scheduled as well.
+
+        Args:
+            key (tuple): Key (start_line, end_line) of the block.
+
+        Returns:
+            Job: The correction job, its partial output are the pieces of the corrected code block.
+        """
+        self.schedule(key)
+        return self.jobs[key]
+
+    def get_correction(self, key) -> str:
+        """
+        Get the correction of the block, waiting for it if it is still being fetched.
+        Prefetching of the following blocks is scheduled as well.
+
+        Args:
+            key (tuple): Key (start_line, end_line) of the block.
+
+        Returns:
+            str: The corrected code block.
+        """
+        return self.get_job(key).result()
+
+    def stream_correction(self, key):
+        """
+        Stream the correction of the block as it is being generated. The pieces already received
+        are yielded immediately. Prefetching of the following blocks is scheduled as well.
+
+        Args:
+            key (tuple): Key (start_line, end_line) of the block.
+
+        Yields:
+            str: The next piece of the corrected code block.
+        """
+        yield from self.get_job(key).stream()
+
+    def is_ready(self, key) -> bool:
+        """
+        Check whether the correction of the block is already available.
+
+        Args:
+            key (tuple): Key (start_line, end_line) of the block.
+
+        Returns:
+            bool: True if the correction was fetched.
+        """
+        job = self.jobs.get(key)
+        return job is not None and job.done()
+
+    def _submit(self, errors):
+        """
+        Submit the job correcting a single block. The job is keyed by the content of the prompt,
+        so the same block with the same errors is shared with the other sessions.
+
+        Args:
+            errors (list): The ErrorRecord of the block.
+
+        Returns:
+            Job: The correction job.
+        """
+        code_block = errors[0].code_block
+        block_errors = tuple((error.line_number, error.char_number, error.error_msg) for error in errors)
+
+        def correct(job):
+            for piece in self.errors_solver.stream_block_correction(code_block, list(block_errors), self.tag):
+                job.publish(piece)
+            return ''.join(job.partial)
+
+        return self.job_manager.submit(('correction', code_block, block_errors), correct)
+
+    def close(self):
+        """
+        Release the jobs, the jobs nobody else waits for are cancelled.
+        """
+        for job in self.jobs.values():
+            self.job_manager.release(job)
+        self.jobs = {}
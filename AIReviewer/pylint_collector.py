@@ -0,0 +1,130 @@
+from typing import NamedTuple, Optional
+import hashlib
+import os
+
+from astroid import MANAGER
+from pylint import lint
+from pylint.config import find_default_config_files
+from pylint.reporters.collecting_reporter import CollectingReporter
+import pylint
+
+
+class LintMessage(NamedTuple):
+    """
+    A single message reported by PyLint.
+    """
+    path: str
+    line: int
+    column: int
+    end_line: Optional[int]
+    end_column: Optional[int]
+    msg_id: str
+    symbol: str
+    msg: str
+    confidence: str
+
+    @classmethod
+    def from_message(cls, message):
+        """
+        Creates the record from a PyLint message.
+
+        Args:
+            message (pylint.message.Message): The message collected by the reporter.
+
+        Returns:
+            LintMessage: The message record.
+        """
+        return cls(message.path, message.line, message.column, message.end_line, message.end_column,
+                   message.msg_id, message.symbol, message.msg, message.confidence.name)
+
+    def format(self) -> str:
+        """
+        Formats the message the same way as the PyLint text output does.
+
+        Returns:
+            str: The message in the form "msg_id: msg (symbol)".
+        """
+        return f"{self.msg_id}: {self.msg} ({self.symbol})"
+
+
+def get_pylint_args(file_paths, enabled_checks=None) -> list:
+    """
+    Builds the PyLint command line arguments.
+
+    Args:
+        file_paths (list): Paths of the files to lint.
+        enabled_checks (list): Names of the checkers, message ids or symbols to enable. When given,
+            all other checks are disabled, so PyLint only runs the checkers which are needed.
+
+    Returns:
+        list: The command line arguments.
+    """
+    args = [str(file_path) for file_path in file_paths]
+    if enabled_checks:
+        args += ['--disable=all', f"--enable={','.join(enabled_checks)}"]
+    return args
+
+
+def run_pylint(file_path, enabled_checks=None) -> list:
+    """
+    Runs PyLint on the file and collects the reported messages without formatting them to text.
+
+    Args:
+        file_path (str): Path to the Python file to lint.
+        enabled_checks (list): Names of the checkers, message ids or symbols to enable, all checks if None.
+
+    Returns:
+        list: The reported messages as LintMessage records.
+    """
+    evict_module(file_path)
+    reporter = CollectingReporter()
+    lint.Run(get_pylint_args([file_path], enabled_checks), reporter=reporter, exit=False)
+    return [LintMessage.from_message(message) for message in reporter.messages]
+
+
+def evict_module(file_path):
+    """
+    Removes the module of the file from the astroid cache. Astroid returns the cached module
+    for a file it has already parsed, so a file changed since would be linted in its old version.
+
+    Args:
+        file_path (str): Path to the Python file.
+    """
+    file_path = os.path.abspath(file_path)
+    for name, module in list(MANAGER.astroid_cache.items()):
+        if module.file and os.path.abspath(module.file) == file_path:
+            del MANAGER.astroid_cache[name]
+
+
+class PylintBackend:
+    """
+    Backend of the 'PyLint' algorithm, loaded by `backends.get_backend` on first use.
+    """
+
+    def get_fingerprint(self, enabled_checks=None) -> str:
+        """
+        Identifies the PyLint version, the configuration file and the enabled checks.
+
+        Args:
+            enabled_checks (list): Names of the checkers, message ids or symbols to enable, all checks if None.
+
+        Returns:
+            str: The fingerprint of the configuration.
+        """
+        rcfile = next(find_default_config_files(), None)
+        rcfile_hash = hashlib.sha256(rcfile.read_bytes()).hexdigest() if rcfile else ''
+        checks = ','.join(sorted(enabled_checks or []))
+        return f"pylint={pylint.__version__};rcfile={rcfile_hash};checks={checks}"
+
+    def lint(self, file_path, enabled_checks=None) -> list:
+        """
+        Lints the file in this process.
+
+        Args:
+            file_path (str): Path to the Python file to lint.
+            enabled_checks (list): Names of the checkers, message ids or symbols to enable, all checks if None.
+
+        Returns:
+            list: The reported messages as LintMessage records.
+        """
+        return run_pylint(file_path, enabled_checks)
@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from astroid import MANAGER
+from pylint import config
+from pylint.lint import PyLinter
+from pylint.reporters.collecting_reporter import CollectingReporter
+
+from AIReviewer.pylint_collector import LintMessage, get_pylint_args, run_pylint
+
+try:
+    # Not a public API of PyLint, the supported versions are pinned in setup.py
+    from pylint.config.config_initialization import _config_initialization
+except ImportError:
+    _config_initialization = None
+
+# State of the pool worker process, created once by `_initialize_worker`
+_worker_linter = None
+_worker_enabled_checks = None
+_worker_last_check = 0.0
+
+
+def _initialize_worker(enabled_checks):
+    """
+    Creates the linter of the worker process. Plugins and configuration are loaded only once,
+    and the astroid cache of the imported modules stays warm for all files checked by the worker.
+    If the installed PyLint cannot configure a linter this way, the worker runs PyLint for each file instead.
+
+    Args:
+        enabled_checks (list): Names of the checkers, message ids or symbols to enable, all checks if None.
+    """
+    global _worker_linter, _worker_enabled_checks, _worker_last_check
+    _worker_last_check = time.time()
+    _worker_enabled_checks = enabled_checks
+    if _config_initialization is None:
+        return
+    _worker_linter = PyLinter()
+    _worker_linter.load_default_plugins()
+    _config_initialization(_worker_linter, get_pylint_args([], enabled_checks), CollectingReporter(),
+                           config_file=next(config.find_default_config_files(), None))
+
+
+def _evict_stale_modules():
+    """
+    Removes modules whose source files changed since the previous check from the astroid cache,
+    so the inference does not use outdated versions of the edited modules.
+    """
+    for name, module in list(MANAGER.astroid_cache.items()):
+        try:
+            if module.file and os.path.getmtime(module.file) >= _worker_last_check:
+                del MANAGER.astroid_cache[name]
+        except OSError:
+            del MANAGER.astroid_cache[name]
+
+
+def _lint_file(file_path):
+    """
+    Lints the file by the warm linter of the worker process.
+
+    Args:
+        file_path (str): Path to the Python file to lint.
+
+    Returns:
+        list: The reported messages as LintMessage records.
+    """
+    global _worker_last_check
+    if _worker_linter is None:
+        return run_pylint(file_path, _worker_enabled_checks)
+    _evict_stale_modules()
+    _worker_last_check = time.time()
+
+    reporter = CollectingReporter()
+    _worker_linter.set_reporter(reporter)
+    _worker_linter.check([str(file_path)])
+    return [LintMessage.from_message(message) for message in reporter.messages]
+
+
+class PylintWorkerPool:
+    """
+    Pool of pre-warmed PyLint worker processes.
+
+    Each worker initializes PyLint once and then lints the files it receives over the pool queue,
+    which saves the per-file start-up of `lint.Run` and keeps the astroid inference cache hot.
+    Workers are recycled after a number of files to bound the memory growth of the cache.
+    """
+
+    def __init__(self, max_workers=None, enabled_checks=None, recycle_after=200):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers (int): Number of worker processes, the number of CPU cores by default.
+            enabled_checks (list): Names of the checkers, message ids or symbols to enable, all checks if None.
+            recycle_after (int): Number of files after which a worker process is replaced by a fresh one.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.enabled_checks = enabled_checks
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_initialize_worker,
+            initargs=(enabled_checks,),
+            max_tasks_per_child=recycle_after
+        )
+
+    def submit(self, file_path):
+        """
+        Queue the file for linting.
+
+        Args:
+            file_path (str): Path to the Python file to lint.
+
+        Returns:
+            concurrent.futures.Future: Future resolving to the list of LintMessage records.
+        """
+        return self.executor.submit(_lint_file, os.path.abspath(file_path))
+
+    def lint(self, file_path) -> list:
+        """
+        Lint the file and wait for the result.
+
+        Args:
+            file_path (str): Path to the Python file to lint.
+
+        Returns:
+            list: The reported messages as LintMessage records.
+        """
+        return self.submit(file_path).result()
+
+    def shutdown(self):
+        """
+        Stop the worker processes.
+        """
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
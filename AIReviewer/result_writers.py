@@ -0,0 +1,135 @@
+import json
+import re
+
+from AIReviewer import __version__
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# PyLint message categories mapped to SARIF levels
+SARIF_LEVELS = {'F': 'error', 'E': 'error', 'W': 'warning', 'R': 'note', 'C': 'note', 'I': 'note'}
+
+MESSAGE_ID_RE = re.compile(r'^([A-Z]\d{4}): ')
+
+
+class JsonlResultWriter:
+    """
+    Writes the review results as JSON Lines, one line per reviewed file and algorithm.
+    """
+
+    def __init__(self, output_path):
+        """
+        Opens the output file.
+
+        Parameters:
+        output_path (str): Path to the output file.
+        """
+        self.file = open(output_path, 'w', encoding='utf-8')
+
+    def write(self, result):
+        """
+        Appends the result of one file and flushes it, so the output can be followed while the review runs.
+
+        Parameters:
+        result (dict): The result produced by `BatchReviewer`.
+        """
+        self.file.write(json.dumps(result) + '\n')
+        self.file.flush()
+
+    def close(self):
+        """
+        Closes the output file.
+        """
+        self.file.close()
+
+
+class SarifResultWriter:
+    """
+    Writes the review results as a SARIF 2.1.0 log.
+
+    The results are streamed into the `results` array as they come, the enclosing document is closed by `close`.
+    """
+
+    def __init__(self, output_path):
+        """
+        Opens the output file and writes the header of the log.
+
+        Parameters:
+        output_path (str): Path to the output file.
+        """
+        self.file = open(output_path, 'w', encoding='utf-8')
+        self.first_result = True
+        header = json.dumps({
+            'version': '2.1.0',
+            '$schema': SARIF_SCHEMA,
+            'runs': [{'tool': {'driver': {'name': 'AIReviewer', 'version': __version__}}, 'results': []}],
+        })
+        # Keep the document open right after the opening bracket of the results array
+        self.footer = header[header.rindex('[]') + 1:]
+        self.file.write(header[:header.rindex('[]') + 1])
+
+    def write(self, result):
+        """
+        Appends the errors of one file to the log.
+
+        Parameters:
+        result (dict): The result produced by `BatchReviewer`.
+        """
+        for error in result.get('errors', []):
+            if match := MESSAGE_ID_RE.match(error['message']):
+                rule_id, level = match.group(1), SARIF_LEVELS.get(match.group(1)[0], 'warning')
+            else:
+                rule_id, level = result['algorithm'], 'warning'
+            sarif_result = {
+                'ruleId': rule_id,
+                'level': level,
+                'message': {'text': error['message']},
+                'locations': [{
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': result['path']},
+                        'region': {'startLine': error['line'], 'startColumn': error['column'] + 1},
+                    }
+                }],
+                'properties': {'algorithm': result['algorithm']},
+            }
+            self.file.write(('' if self.first_result else ',') + '\n' + json.dumps(sarif_result))
+            self.first_result = False
+        self.file.flush()
+
+    def close(self):
+        """
+        Closes the log document and the output file.
+        """
+        self.file.write('\n' + self.footer)
+        self.file.close()
+
+
+class ReviewSummary:
+    """
+    Counts the errors and the failed files of the review results, for the exit code of the review.
+    """
+
+    def __init__(self):
+        """
+        Initializes the counts.
+        """
+        self.errors = 0
+        self.files_with_errors = set()
+        self.failures = 0
+
+    def write(self, result):
+        """
+        Counts the errors of one file, or its failure.
+
+        Parameters:
+        result (dict): The result produced by `BatchReviewer`.
+        """
+        if 'error' in result:
+            self.failures += 1
+        elif result['errors']:
+            self.errors += len(result['errors'])
+            self.files_with_errors.add(result['path'])
+
+    def close(self):
+        """
+        Nothing to release, the counts stay available.
+        """
@@ -46,25 +46,21 @@ def run_streamlit_app():
     Sets environment variables and runs the Streamlit application.
 
     The function sets the `OPENAI_API_KEY` and `SOURCE_DIR_CONFIG_FILE_PATH` environment variables
-    by reading from specified files. Then, it determines the path to the Streamlit executable and
-    runs the Streamlit app specified by `streamlit_app_path`.
+    by reading from specified files. Then, it runs the Streamlit app of the installed package
+    by the Streamlit module of the current Python interpreter.
 
     Returns:
-    None
+    int: The exit code of Streamlit.
     """
     # Set environment variables.
     get_openai_api_key()
     get_source_dir()
 
-    # Define the path to your Streamlit app
-    streamlit_app_path = os.path.abspath('AIReviewer\\streamlit_app.py')  # Replace with your Streamlit app path
-
-    python_dir = os.path.dirname(sys.executable)
-    streamlit_path = os.path.join(python_dir, 'streamlit.exe')
-    print(streamlit_path)
+    # The app is next to this module, wherever the package is installed
+    streamlit_app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
 
     # Run the Streamlit app
-    subprocess.run([streamlit_path, 'run', streamlit_app_path])
+    return subprocess.run([sys.executable, '-m', 'streamlit', 'run', streamlit_app_path]).returncode
 
 
 if __name__ == "__main__":
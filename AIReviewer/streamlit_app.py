@@ -1,37 +1,202 @@
 import streamlit as st
 from streamlit_ace import st_ace
+from AIReviewer.backends import ALGORITHMS
+from AIReviewer.cache import AnalysisCache, CorrectionCache
+from AIReviewer.file_catalog import FileCatalog
+from AIReviewer.file_editor import apply_changes_to_file
 from AIReviewer.file_parser import FileParser
-from AIReviewer.openai_interface import ErrorsSolver
+from AIReviewer.job_manager import JobManager
+from AIReviewer.metrics import enable_json_log, metrics
+from AIReviewer.prefetcher import CorrectionPrefetcher
 import os
 
+try:
+    # The component behind `st_ace`, which passes any further arguments on to the editor
+    from streamlit_ace import _render_component as render_ace
+except ImportError:
+    render_ace = None
+
 # Get the source directory from environment variables
 SOURCE_DIR = os.getenv("SOURCE_DIR_CONFIG_FILE_PATH")
 
+# Optional comma separated list of PyLint checkers or messages to run, all checks are run if not set
+PYLINT_CHECKS = [check.strip() for check in os.getenv("AIREVIEWER_PYLINT_CHECKS", "").split(',') if check.strip()]
+
+# Maximum number of correction requests in flight, shared by all sessions, and how many blocks ahead
+# of the selected one are prefetched
+PREFETCH_CONCURRENCY = int(os.getenv("AIREVIEWER_PREFETCH_CONCURRENCY", "4"))
+PREFETCH_LOOKAHEAD = int(os.getenv("AIREVIEWER_PREFETCH_LOOKAHEAD", "10"))
+
+# Optional comma separated list of glob patterns of paths skipped in the source directory
+EXCLUDE = [pattern.strip() for pattern in os.getenv("AIREVIEWER_EXCLUDE", "").split(',') if pattern.strip()]
+
+# Seconds between the checks of the source directory for changed files
+CATALOG_POLL_INTERVAL = float(os.getenv("AIREVIEWER_CATALOG_POLL_INTERVAL", "2"))
+
+# Number of full analyses running in the background at once, shared by all sessions
+ANALYSIS_WORKERS = int(os.getenv("AIREVIEWER_ANALYSIS_WORKERS", "4"))
+
+# Optional paths of the JSON Lines log of the timings and counters and of the file with the metrics
+# in the Prometheus text format, rewritten while the app runs
+METRICS_LOG = os.getenv("AIREVIEWER_METRICS_LOG")
+METRICS_FILE = os.getenv("AIREVIEWER_METRICS_FILE")
+
+# Number of lines of the file sent to the editor at once, the window is paged through the rest of the file
+EDITOR_WINDOW_LINES = int(os.getenv("AIREVIEWER_EDITOR_WINDOW_LINES", "200"))
+
+
+# Function to get the analysis cache shared by all sessions
+@st.cache_resource
+def get_analysis_cache():
+    """
+    Creates the on-disk cache of detected errors, shared by all sessions of the app.
+
+    Returns:
+    AnalysisCache: The analysis cache.
+    """
+    return AnalysisCache()
+
+
+# Function to get the correction cache shared by all sessions
+@st.cache_resource
+def get_correction_cache():
+    """
+    Creates the cache of corrections, shared by all sessions of the app.
+
+    Returns:
+    CorrectionCache: The correction cache.
+    """
+    return CorrectionCache()
+
+
+# Function to get the job manager shared by all sessions
+@st.cache_resource
+def get_job_manager():
+    """
+    Creates the manager running the analyses and the corrections in the background, shared by all sessions
+    of the app, so identical jobs requested by several sessions run once.
+
+    Returns:
+    JobManager: The job manager.
+    """
+    return JobManager({'analysis': ANALYSIS_WORKERS, 'correction': PREFETCH_CONCURRENCY})
+
+
+# Function to get the PyLint workers shared by all sessions
+@st.cache_resource
+def get_pylint_pool():
+    """
+    Starts the pool of warm PyLint workers, shared by all sessions of the app.
+
+    Returns:
+    PylintWorkerPool: The worker pool.
+    """
+    from AIReviewer.pylint_pool import PylintWorkerPool  # Imports PyLint, only when it is selected
+    return PylintWorkerPool(enabled_checks=PYLINT_CHECKS or None)
+
+
+# Function to get the catalog of the source files shared by all sessions
+@st.cache_resource
+def get_file_catalog():
+    """
+    Indexes the source directory and starts watching it for changes, shared by all sessions of the app.
+    The cached errors and corrections of the removed files are invalidated. The entries of changed files
+    are kept: both caches are addressed by the content, so they are never hit by a stale version, and
+    the corrections of the unchanged blocks stay valid. Outdated entries expire by the size limits and the TTL.
+
+    Returns:
+    FileCatalog: The file catalog.
+    """
+    catalog = FileCatalog(SOURCE_DIR, EXCLUDE)
+    analysis_cache = get_analysis_cache()
+    correction_cache = get_correction_cache()
+
+    def invalidate(changes):
+        for change in changes:
+            if change.kind == 'removed':
+                analysis_cache.invalidate_tag(catalog.absolute_path(change.path))
+                correction_cache.invalidate_tag(catalog.absolute_path(change.path))
+
+    catalog.subscribe(invalidate)
+    catalog.start_polling(CATALOG_POLL_INTERVAL)
+    return catalog
+
+
+# Function to set up the export of the metrics once per process
+@st.cache_resource
+def setup_metrics_log():
+    """
+    Starts logging the timings and counters as JSON Lines, if a log file is configured.
+
+    Returns:
+    bool: True if the log is enabled.
+    """
+    if METRICS_LOG:
+        enable_json_log(METRICS_LOG)
+    return bool(METRICS_LOG)
+
+
+# Function to display the timings of the stages and the usage counters in the sidebar
+@st.fragment(run_every=5)
+def show_metrics():
+    """
+    Displays the time spent in each stage, the token usage, the cache hit rates and the retries
+    of the whole process, and writes the metrics file if configured.
+
+    Returns:
+    None
+    """
+    with st.expander("Timings"):
+        st.dataframe(
+            [
+                {'stage': stage, 'calls': calls, 'total s': round(total, 3),
+                 'mean ms': round(total / calls * 1000, 1), 'max ms': round(longest * 1000, 1)}
+                for stage, (calls, total, longest) in sorted(metrics.get_stages().items())
+            ],
+            hide_index=True,
+            width='stretch',
+        )
+        hit_rates = {cache: metrics.get_cache_hit_rate(cache) for cache in ('analysis', 'correction')}
+        st.caption(
+            f"Tokens: {metrics.get_counter('openai_tokens', kind='prompt')} prompt, "
+            f"{metrics.get_counter('openai_tokens', kind='completion')} completion · "
+            f"Retries: {metrics.get_counter('openai_retries')} · Cache hits: "
+            + ', '.join(f"{cache} {'-' if rate is None else f'{rate:.0%}'}" for cache, rate in hit_rates.items())
+        )
+        prometheus_text = metrics.to_prometheus()
+        st.download_button("Download metrics", prometheus_text, file_name="aireviewer.prom", mime="text/plain")
+    if METRICS_FILE:
+        metrics.write_prometheus(METRICS_FILE)
+
 
 # Function to list all Python files in the specified directory
 def list_files():
     """
-    Lists all Python files in the source directory.
+    Lists all Python files in the source directory and its subdirectories.
 
     Returns:
-    list: A list of filenames (str) of all Python files in the source directory.
+    list: A list of paths (str) of all Python files relative to the source directory.
     """
-    return [f for f in os.listdir(SOURCE_DIR) if f.endswith('.py')]
+    return get_file_catalog().files()
 
 
-# Function to read the content of a file
-def read_file(file_path):
+# Function to read the lines of a file, shared by all sessions until the file changes
+@st.cache_resource(max_entries=16)
+def read_file_lines(file_path, modified, size):
     """
-    Reads the content of a file from the source directory.
+    Reads the lines of a file from the source directory. The version of the file is part of the arguments,
+    so a file is read again only after it changed.
 
     Parameters:
     file_path (str): The relative path to the file to read.
+    modified (int): The modification time of the file in nanoseconds.
+    size (int): The size of the file in bytes.
 
     Returns:
-    str: The content of the file.
+    tuple: The lines of the file.
     """
     with open(os.path.join(SOURCE_DIR, file_path), 'r', encoding='utf-8') as file:
-        return file.read()
+        return tuple(file.read().splitlines())
 
 
 # Function to replace a block of code in a file with a new block of code
@@ -48,54 +213,311 @@ def apply_change_to_file(selected_file, line_index_start, line_index_end, new_bl
     Returns:
     None
     """
-    with open(selected_file, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-        lines = [line.rstrip('\n') for line in lines]
+    apply_changes_to_file(selected_file, [(line_index_start, line_index_end, new_block)])
 
-        # Split the new block into lines
-        new_lines = new_block.split('\n')
 
-        # Replace the old block with the new block
-        updated_lines = lines[:line_index_start] + new_lines + lines[line_index_end + 1:]
+# Function to start prefetching the corrections of the code blocks with errors
+def start_prefetcher(blocks, prefetch=True):
+    """
+    Replaces the prefetcher of the session by a new one prefetching the corrections of the code blocks.
+    The new prefetcher joins the jobs of the blocks which did not change before the old one releases them,
+    so their corrections are not cancelled and requested again.
+
+    Parameters:
+    blocks (dict): The errors grouped by block as returned by `FileParser.group_errors_by_block`.
+    prefetch (bool): Whether the corrections are requested ahead, otherwise only the selected block is corrected.
 
-        # Write the updated content back to the file
-        with open(selected_file, 'w', encoding='utf-8') as file:
-            file.writelines('\n'.join(updated_lines) + '\n')
+    Returns:
+    None
+    """
+    from AIReviewer.openai_interface import ErrorsSolver  # Imports the OpenAI SDK, only when there are errors
+    previous = st.session_state.get("prefetcher")
+    st.session_state.prefetcher = CorrectionPrefetcher(
+        ErrorsSolver(get_correction_cache()), get_job_manager(), PREFETCH_LOOKAHEAD if prefetch else 0,
+        tag=get_file_catalog().absolute_path(st.session_state.selected_file)
+    )
+    st.session_state.prefetcher.start(blocks, prefetch=prefetch)
+    if previous is not None:
+        previous.close()
 
 
-# JavaScript code to add the underline marker
-underline_js = """
-<script>
-    // Function to add underline marker to a line
-    function addUnderline(editor, line) {
+# Function to replace the errors of the session
+def set_errors(line_numbers, final=True):
+    """
+    Replaces the errors of the session, resets the selection and starts prefetching the corrections.
 
-        // Define a custom class for the underline
-        var css = `.ace_line.underline { border-bottom: 2px solid red !important; }`,
-            head = document.head || document.getElementsByTagName('head')[0],
-            style = document.createElement('style');
+    Parameters:
+    line_numbers (dict): The errors as returned by `FileParser.get_errors_from_file`.
+    final (bool): False for the provisional errors of the fast checks, which are replaced once the full
+                  analysis finishes. Their corrections are not prefetched, only the selected block is corrected.
 
-        style.type = 'text/css';
-        if (style.styleSheet) {
-            style.styleSheet.cssText = css;
-        } else {
-            style.appendChild(document.createTextNode(css));
-        }
-        head.appendChild(style);
-
-        // Add the marker to the line
-        editor.session.addMarker(new (window.ace).Range(line, 0, line, 1), 'underline', 'fullLine');
-    }
-
-    // Wait for the editor to be available
-    setTimeout(() => {
-        console.warn("test")
-        var editor = window.ace.edit("ace-editor-{selected_file}");
-        if (editor) {
-            addUnderline(editor, {line_number});
+    Returns:
+    None
+    """
+    st.session_state.line_numbers = line_numbers
+    st.session_state.blocks = FileParser.group_errors_by_block(line_numbers)
+    st.session_state.accepted_changes = {}
+    start_prefetcher(st.session_state.blocks, prefetch=final)
+
+
+# Function to start the analysis of the selected file
+def start_analysis(file_parser, selected_algorithm):
+    """
+    Shows the errors of the fast checks immediately and starts the full analysis in the background.
+
+    Parameters:
+    file_parser (FileParser): The parser of the selected file.
+    selected_algorithm (str): The algorithm used for error detection.
+
+    Returns:
+    None
+    """
+    if (analysis := st.session_state.get("analysis")) is not None:
+        get_job_manager().release(analysis)
+    line_numbers, st.session_state.analysis = file_parser.start_tiered_analysis(selected_algorithm,
+                                                                                get_job_manager())
+    set_errors(line_numbers, final=st.session_state.analysis is None)
+
+
+# Function to merge the results of the background analysis once it finishes
+@st.fragment(run_every=1)
+def watch_analysis():
+    """
+    Polls the full analysis running in the background and reruns the app with its errors once it finishes.
+
+    Returns:
+    None
+    """
+    analysis = st.session_state.get("analysis")
+    if analysis is None:
+        return
+    if not analysis.done():
+        st.info(f"Full analysis: {analysis.status}...")
+        return
+
+    st.session_state.analysis = None
+    get_job_manager().release(analysis)
+    try:
+        set_errors(analysis.result())
+    except Exception as e:  # Keep the errors of the fast checks
+        st.session_state.analysis_error = f"The full analysis failed: {e}"
+    st.rerun()
+
+
+# Function to apply corrections to the selected file and update the errors
+def apply_corrections(file_parser, selected_algorithm, changes):
+    """
+    Applies the corrections to the file in a single write and re-analyses only the changed blocks.
+
+    Parameters:
+    file_parser (FileParser): The parser of the selected file.
+    selected_algorithm (str): The algorithm used for error detection.
+    changes (list): Tuples (line_index_start, line_index_end, new_block).
+
+    Returns:
+    None
+    """
+    with metrics.span('app.apply', file=file_parser.file_path):
+        apply_changes_to_file(file_parser.file_path, changes)
+    if st.session_state.get("analysis") is not None:
+        # The errors are only from the fast checks yet, the file has to be analyzed again
+        start_analysis(file_parser, selected_algorithm)
+        return
+    set_errors(file_parser.update_errors_after_changes(st.session_state.line_numbers, selected_algorithm, changes))
+
+
+# Function to display the correction of the selected block while it is being generated
+@st.fragment(run_every=0.5)
+def watch_correction(selected_block):
+    """
+    Polls the correction job of the block, displays its partial output and reruns the app once it finishes.
+
+    Parameters:
+    selected_block (tuple): The key (start_line, end_line) of the block.
+
+    Returns:
+    None
+    """
+    job = st.session_state.prefetcher.get_job(selected_block)
+    if job.done():
+        st.rerun()
+    st.caption(f"{job.status}...")
+    st.code(''.join(job.partial), language='python')
+
+
+# Function to describe a code block in the error selection
+def format_block(block):
+    """
+    Describes the code block with errors by its lines and the number of its errors.
+
+    Parameters:
+    block (tuple): The key (start_line, end_line) of the block.
+
+    Returns:
+    str: The description of the block.
+    """
+    errors = st.session_state.blocks[block]
+    return f"Lines {block[0] + 1}-{block[1] + 1} ({len(errors)} error{'s' if len(errors) > 1 else ''})"
+
+
+# Function to compute the lines of the file shown in the editor
+def get_editor_window(line_count, first_line):
+    """
+    Computes the window of lines shown in the editor, kept inside the file.
+
+    Parameters:
+    line_count (int): Number of lines of the file.
+    first_line (int): Index of the requested first line of the window.
+
+    Returns:
+    tuple: The indexes (start, end) of the first line and past the last line of the window.
+    """
+    start = max(0, min(first_line, line_count - EDITOR_WINDOW_LINES))
+    return start, min(line_count, start + EDITOR_WINDOW_LINES)
+
+
+# Function to move the editor window by a number of lines
+def page_editor(lines):
+    """
+    Moves the window of the editor, called when a paging button is clicked.
+
+    Parameters:
+    lines (int): Number of lines to move by, negative to move up.
+
+    Returns:
+    None
+    """
+    st.session_state.editor_window_start = max(0, st.session_state.editor_window_start + lines)
+
+
+# Function to build the annotations of the error lines in the editor window
+def build_annotations(line_numbers, start, end):
+    """
+    Creates the editor annotations of the error lines inside the window, shown as icons in the gutter
+    with the messages as their tooltips.
+
+    Parameters:
+    line_numbers (dict): The errors as returned by `FileParser.get_errors_from_file`.
+    start (int): Index of the first line of the window.
+    end (int): Index past the last line of the window.
+
+    Returns:
+    list: The annotations with rows relative to the window.
+    """
+    return [
+        {
+            'row': line_number - 1 - start,
+            'column': line_errors[0].char_number,
+            'type': 'error',
+            'text': '\n'.join(f"Line {line_number}: {error.error_msg}" for error in line_errors),
         }
-    }, 1000);
-</script>
-"""
+        for line_number, line_errors in line_numbers.items() if start < line_number <= end
+    ]
+
+
+# Function to build the marker of the selected block in the editor window
+def build_markers(selected_block, start, end):
+    """
+    Creates the editor marker highlighting the lines of the selected block inside the window.
+
+    Parameters:
+    selected_block (tuple): The key (start_line, end_line) of the block, or None.
+    start (int): Index of the first line of the window.
+    end (int): Index past the last line of the window.
+
+    Returns:
+    list: The markers with rows relative to the window.
+    """
+    if selected_block is None or selected_block[1] < start or selected_block[0] >= end:
+        return []
+    return [{
+        'startRow': max(selected_block[0], start) - start,
+        'startCol': 0,
+        'endRow': min(selected_block[1], end - 1) - start,
+        'endCol': 1,
+        'className': 'ace_step',  # Highlighted by all themes, used by debuggers for the current line
+        'type': 'fullLine',
+    }]
+
+
+# Function to display the window of the file around the selected block
+@st.fragment
+def show_editor(selected_file, selected_block):
+    """
+    Displays the lines of the file around the selected block in the editor, with the error lines annotated
+    and the block highlighted. Only the window is sent to the browser, the buttons page through the rest
+    of the file and rerun only the editor.
+
+    The arguments of the editor only change with the file, the window or the errors, so the unchanged editor
+    is not rendered again on the other reruns.
+
+    Parameters:
+    selected_file (str): The relative path to the selected file.
+    selected_block (tuple): The key (start_line, end_line) of the selected block, or None.
+
+    Returns:
+    None
+    """
+    stat = os.stat(os.path.join(SOURCE_DIR, selected_file))
+    lines = read_file_lines(selected_file, stat.st_mtime_ns, stat.st_size)
+
+    # Show the selected block near the top of the window when the selection changes
+    anchor = (selected_file, selected_block)
+    if st.session_state.get("editor_anchor") != anchor:
+        st.session_state.editor_anchor = anchor
+        first_line = selected_block[0] - EDITOR_WINDOW_LINES // 4 if selected_block else 0
+        st.session_state.editor_window_start = get_editor_window(len(lines), first_line)[0]
+    start, end = get_editor_window(len(lines), st.session_state.editor_window_start)
+    st.session_state.editor_window_start = start
+
+    previous_column, caption_column, next_column = st.columns([1, 3, 1])
+    previous_column.button("Previous lines", key="editor_previous", disabled=start == 0,
+                           on_click=page_editor, args=(-EDITOR_WINDOW_LINES,))
+    if render_ace is not None:
+        caption_column.caption(f"Lines {start + 1}-{end} of {len(lines)}")
+    else:
+        caption_column.caption(f"Lines {start + 1}-{end} of {len(lines)}, editor line 1 is line {start + 1}")
+    next_column.button("Next lines", key="editor_next", disabled=end >= len(lines),
+                       on_click=page_editor, args=(EDITOR_WINDOW_LINES,))
+
+    show_ace(
+        '\n'.join(lines[start:end]),
+        start + 1,
+        annotations=build_annotations(st.session_state.line_numbers, start, end),
+        markers=build_markers(selected_block, start, end),
+        # A new window or version of the file is a new editor, the editor only reads its value when created
+        key=f'ace-editor-{selected_file}-{stat.st_mtime_ns}-{start}',
+    )
+
+
+# Function to display the editor with the line numbers of the file
+def show_ace(value, first_line_number, annotations, markers, key):
+    """
+    Displays the window of the file in the Ace editor, numbering its lines from the first line of the window,
+    so the gutter shows the line numbers of the file. The arguments are the same as `st_ace` sends
+    to the component, with the `firstLineNumber` option of the editor added. If the component
+    is not available, `st_ace` numbers the lines from 1.
+
+    Parameters:
+    value (str): The lines of the window.
+    first_line_number (int): The line number of the file of the first line of the window.
+    annotations (list): The annotations of the error lines.
+    markers (list): The markers of the selected block.
+    key (str): The key of the editor.
+
+    Returns:
+    None
+    """
+    if render_ace is None:
+        st_ace(value=value, language='python', theme='monokai', readonly=False, height=1000,
+               annotations=annotations, markers=markers, key=key)
+        return
+    render_ace(
+        defaultValue=value, placeholder='', height=1000, minLines=12, maxLines=None, fontSize=14, tabSize=4,
+        mode='python', theme='monokai', showGutter=True, showPrintMargin=False, wrapEnabled=False, readOnly=False,
+        keyboardHandler='vscode', annotations=annotations, markers=markers, autoUpdate=False,
+        setOptions={'firstLineNumber': first_line_number}, key=key, default=value,
+    )
 
 
 # Main function to set up the Streamlit app layout and functionality
@@ -109,66 +531,94 @@ def main():
     st.set_page_config(layout="wide")  # Set the layout to wide
 
     st.sidebar.title("Python Code Viewer")
+    setup_metrics_log()
+    with st.sidebar:
+        show_metrics()
 
     # Sidebar for file selection
     files = list_files()
     selected_file = st.sidebar.selectbox("Choose a file", files, key="file_selector")
 
     # Sidebar for algorithm selection
-    algorithms = ['PyLint', 'OpenAI']
-    selected_algorithm = st.sidebar.selectbox("Choose a method to get errors", algorithms)
+    selected_algorithm = st.sidebar.selectbox("Choose a method to get errors", ALGORITHMS)
 
-    # Read and display the content of the selected file
-    file_content = read_file(selected_file)
-    file_parser = FileParser(os.path.join(SOURCE_DIR, selected_file))
+    file_parser = FileParser(os.path.join(SOURCE_DIR, selected_file), cache=get_analysis_cache(),
+                             pylint_pool=get_pylint_pool() if selected_algorithm == 'PyLint' else None)
 
     # Check if algorithm or file has changed and update session state accordingly
     if "selected_algorithm" not in st.session_state or selected_algorithm != st.session_state.selected_algorithm or \
             "selected_file" not in st.session_state or selected_file != st.session_state.selected_file:
         st.session_state.selected_algorithm = selected_algorithm
         st.session_state.selected_file = selected_file
-        st.session_state.line_numbers = file_parser.get_errors_from_file(selected_algorithm)
+        st.session_state.pop("analysis_error", None)
 
-    # Select and display a specific error
-    selected_error = st.sidebar.selectbox("Choose an error", st.session_state.line_numbers.keys())
+        # Show the errors of the fast checks and run the full analysis in the background
+        start_analysis(file_parser, selected_algorithm)
 
-    code_block, line_number, char_number, error_msg, block_line_start, block_line_end = st.session_state.line_numbers[
-        selected_error]
+    with st.sidebar:
+        watch_analysis()
+    if "analysis_error" in st.session_state:
+        st.sidebar.warning(st.session_state.analysis_error)
 
-    # Check if error has changed and update session state accordingly
-    if "selected_algorithm" not in st.session_state or selected_algorithm != st.session_state.selected_algorithm or \
-            "selected_file" not in st.session_state or selected_file != st.session_state.selected_file or \
-            "selected_error" not in st.session_state or selected_error != st.session_state.selected_error:
-        st.session_state.selected_error = selected_error
-        solver = ErrorsSolver()
-        st.session_state.correction = solver.get_error_correction(code_block, line_number, char_number, error_msg)
+    # Select a code block and display all its errors
+    selected_block = st.sidebar.selectbox("Choose an error", st.session_state.blocks.keys(),
+                                          format_func=format_block)
+
+    # Ace editor for displaying the lines around the selected block with syntax highlighting
+    st.subheader("Source Code")
+    show_editor(selected_file, selected_block)
+
+    if selected_block is None:
+        st.sidebar.text("No errors found")
+        return
+
+    block_line_start, block_line_end = selected_block
 
-    # Sidebar to display the selected error message
-    st.sidebar.subheader("Found error")
-    st.sidebar.text(error_msg)
+    # Sidebar to display the error messages of the selected block
+    st.sidebar.subheader("Found errors")
+    st.sidebar.text('\n'.join(
+        f"{error.line_number}:{error.char_number} {error.error_msg}"
+        for error in st.session_state.blocks[selected_block]
+    ))
 
     # Sidebar to display the correction code
     st.sidebar.subheader("Fixes Code")
-    st.sidebar.code(st.session_state.correction, language='python')
+
+    # Render the correction progressively while it is being generated, without blocking the page
+    correction = None
+    correction_job = st.session_state.prefetcher.get_job(selected_block)
+    if not correction_job.done():
+        with st.sidebar:
+            watch_correction(selected_block)
+    else:
+        try:
+            correction = correction_job.result()
+            st.sidebar.code(correction, language='python')
+        except Exception as e:
+            st.sidebar.error(f"The correction failed: {e}")
 
     # Button to apply the correction to the file
-    apply_change = st.sidebar.button("Apply change", key="apply_change")
+    apply_change = st.sidebar.button("Apply change", key="apply_change", disabled=correction is None)
     if apply_change:
-        selected_file_path = os.path.join(SOURCE_DIR, selected_file)
-        apply_change_to_file(selected_file_path, block_line_start, block_line_end, st.session_state.correction)
-        st.rerun()
-
-    # Ace editor for displaying the file content with syntax highlighting
-    st.subheader("Source Code")
-    st_ace(
-        value=file_content,
-        language='python',
-        theme='monokai',
-        readonly=False,
-        height=1000,
-        key=f'ace-editor-{selected_file}',  # Ensure unique key per file
-    )
+        try:
+            apply_corrections(file_parser, selected_algorithm, [(block_line_start, block_line_end, correction)])
+            st.rerun()
+        except SyntaxError as e:
+            st.sidebar.error(f"The correction was not applied, the file would not parse: {e}")
+
+    # Buttons to collect corrections and apply all of them at once
+    accepted_changes = st.session_state.accepted_changes
+    if st.sidebar.button("Accept change", key="accept_change", disabled=correction is None):
+        accepted_changes[selected_block] = (block_line_start, block_line_end, correction)
+    if st.sidebar.button(f"Apply accepted changes ({len(accepted_changes)})", key="apply_accepted",
+                         disabled=not accepted_changes):
+        try:
+            apply_corrections(file_parser, selected_algorithm, list(accepted_changes.values()))
+            st.rerun()
+        except (ValueError, SyntaxError) as e:
+            st.sidebar.error(f"The changes were not applied: {e}")
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.span('app.rerun'):
+        main()
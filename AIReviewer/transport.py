@@ -0,0 +1,254 @@
+import os
+import random
+import threading
+import time
+
+import openai
+
+from AIReviewer.code_chunker import estimate_tokens
+from AIReviewer.metrics import metrics
+
+# Path to the file containing the OpenAI API key, used when the key is not set in the environment
+OPENAI_API_KEY_PATH = "../openai_key.txt"
+
+# Errors worth retrying, everything else is returned to the caller immediately
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of a resource per minute.
+
+    The bucket holds at most one minute worth of tokens and is refilled continuously.
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize the bucket full.
+
+        Args:
+            per_minute (float): The allowed amount of the resource per minute.
+        """
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """
+        Add the tokens accumulated since the last update. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1):
+        """
+        Take tokens from the bucket, waiting until enough of them are available.
+
+        Args:
+            amount (float): Number of tokens to take. Amounts over the capacity are capped to it.
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, amount: float):
+        """
+        Take tokens without waiting, the bucket may go into debt. Used to account for the difference
+        between the estimated and the actual usage.
+
+        Args:
+            amount (float): Number of tokens to take, negative amounts return tokens.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class LLMTransport:
+    """
+    Process-wide access to the chat completions API shared by `ErrorsSolver` and `ErrorsDetector`.
+
+    A single client keeps its pooled HTTP connections alive across requests. Requests are scheduled
+    by token buckets for the requests-per-minute and tokens-per-minute limits, and failed requests
+    are retried with jittered exponential backoff. A rate limit response pauses all requests
+    for the time requested by the server.
+    """
+
+    def __init__(self, api_key=None, base_url=None, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=5, max_backoff=60.0):
+        """
+        Initialize the transport.
+
+        Args:
+            api_key (str): The OpenAI API key.
+            base_url (str): Base URL of the API, e.g. of a local OpenAI-compatible stub. The OpenAI API by default.
+            requests_per_minute (float): Requests-per-minute limit, unlimited if None.
+            tokens_per_minute (float): Tokens-per-minute limit, unlimited if None.
+            max_retries (int): How many times a failed request is retried.
+            max_backoff (float): Upper bound of the backoff delay in seconds.
+        """
+        # Retries are handled here, so they are coordinated with the rate limiting
+        self.client = openai.Client(api_key=api_key, base_url=base_url, max_retries=0)
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+
+    def _schedule(self, estimated_tokens: int):
+        """
+        Wait until the request may be sent.
+
+        Args:
+            estimated_tokens (int): The estimated token usage of the request.
+        """
+        if (delay := self.paused_until - time.monotonic()) > 0:
+            time.sleep(delay)
+        if self.request_bucket:
+            self.request_bucket.acquire()
+        if self.token_bucket:
+            self.token_bucket.acquire(estimated_tokens)
+
+    def _backoff(self, error, attempt: int) -> float:
+        """
+        Get how long to wait before retrying a failed request.
+
+        Args:
+            error (openai.APIError): The error of the request.
+            attempt (int): Number of the failed attempt, starting from 0.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        try:
+            delay = float(error.response.headers['retry-after'])
+        except (AttributeError, KeyError, ValueError):
+            delay = random.uniform(0, min(self.max_backoff, 2.0 ** attempt))
+        if isinstance(error, openai.RateLimitError):
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call the API, retrying the call on transient errors with the backoff of the transport.
+        Used for the requests of the other endpoints as well, e.g. the files and batches of the Batch API.
+
+        Args:
+            function (callable): The API call, called again for each attempt.
+            *args: Positional arguments of the call.
+            **kwargs: Keyword arguments of the call.
+
+        Returns:
+            The result of the call.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return function(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                metrics.increment('openai_errors', error=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                metrics.increment('openai_retries', error=type(e).__name__)
+                time.sleep(self._backoff(e, attempt))
+
+    def _send(self, kwargs: dict):
+        """
+        Send the request, retrying it on transient errors.
+
+        Args:
+            kwargs (dict): Arguments of the chat completion request.
+
+        Returns:
+            The chat completion, or the stream of chunks for streamed requests.
+        """
+        estimated_tokens = sum(estimate_tokens(message['content']) for message in kwargs['messages'])
+
+        def create():
+            self._schedule(estimated_tokens)
+            return self.client.chat.completions.create(**kwargs)
+
+        response = self.call(create)
+        if self.token_bucket and getattr(response, 'usage', None):
+            self.token_bucket.consume(response.usage.total_tokens - estimated_tokens)
+        return response
+
+    def create_completion(self, **kwargs) -> str:
+        """
+        Request a chat completion.
+
+        Args:
+            **kwargs: Arguments of the chat completion request.
+
+        Returns:
+            str: The content of the completion.
+        """
+        response = self._send(kwargs)
+        if response.usage:
+            metrics.record_usage(response.usage, kwargs['model'])
+        return response.choices[0].message.content
+
+    def stream_completion(self, **kwargs):
+        """
+        Request a chat completion and yield its content as the tokens arrive.
+
+        Args:
+            **kwargs: Arguments of the chat completion request.
+
+        Yields:
+            str: The next piece of the completion content.
+        """
+        # The usage is sent in the last chunk, without choices
+        for chunk in self._send(dict(kwargs, stream=True, stream_options={'include_usage': True})):
+            if chunk.usage:
+                metrics.record_usage(chunk.usage, kwargs['model'])
+            if chunk.choices and (content := chunk.choices[0].delta.content):
+                yield content
+
+
+def get_openai_api_key() -> str:
+    """
+    Retrieve the OpenAI API key from the environment, or from the key file if it is not set.
+
+    Returns:
+        str: The OpenAI API key.
+    """
+    if "OPENAI_API_KEY" not in os.environ:
+        with open(OPENAI_API_KEY_PATH, "r") as f:
+            os.environ["OPENAI_API_KEY"] = f.readline().strip()
+    return os.environ["OPENAI_API_KEY"]
+
+
+def get_transport() -> LLMTransport:
+    """
+    Get the transport shared by the whole process, creating it on the first call.
+
+    The transport is configured by the environment variables `OPENAI_BASE_URL` (e.g. a local stub),
+    `AIREVIEWER_REQUESTS_PER_MINUTE` and `AIREVIEWER_TOKENS_PER_MINUTE`.
+
+    Returns:
+        LLMTransport: The shared transport.
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            requests_per_minute = os.getenv("AIREVIEWER_REQUESTS_PER_MINUTE")
+            tokens_per_minute = os.getenv("AIREVIEWER_TOKENS_PER_MINUTE")
+            _transport = LLMTransport(
+                api_key=get_openai_api_key(),
+                base_url=os.getenv("OPENAI_BASE_URL"),
+                requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None
+            )
+        return _transport
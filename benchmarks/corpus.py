@@ -0,0 +1,107 @@
+"""
+Generates a synthetic corpus of Python files for the benchmarks.
+
+Each function of a file has the probability given by the error density to use an undefined name
+starting with `undefined_`, which both PyLint and the fake OpenAI server report.
+
+Usage:
+    python benchmarks/corpus.py DIRECTORY [--files N] [--lines N] [--error-density F] [--seed N]
+"""
+import argparse
+import os
+import random
+
+# Lines of a generated function, including the blank line after it
+FUNCTION_LINES = 7
+
+
+def generate_function(rng, index, with_error):
+    """
+    Generates a small function.
+
+    Parameters:
+    rng (random.Random): The random generator.
+    index (int): Index of the function within its module.
+    with_error (bool): Whether the function uses an undefined name.
+
+    Returns:
+    list: The lines of the function.
+    """
+    factor = rng.randint(2, 9)
+    operand = f"undefined_{index}" if with_error else f"len(values) * {factor}"
+    return [
+        f"def function_{index}(values, offset={rng.randint(0, 99)}):",
+        f'    """Scales the values of batch {index}."""',
+        "    result = []",
+        "    for value in values:",
+        f"        result.append(value * {factor} + offset + {operand})",
+        "    return result",
+        "",
+    ]
+
+
+def generate_module(rng, lines, error_density):
+    """
+    Generates a module of small functions.
+
+    Parameters:
+    rng (random.Random): The random generator.
+    lines (int): Approximate number of lines of the module.
+    error_density (float): Probability of each function to contain an error.
+
+    Returns:
+    tuple: The source code and the number of injected errors.
+    """
+    source_lines = ['"""Synthetic module generated for the benchmarks."""', "import math", ""]
+    errors = 0
+    for index in range(max(1, (lines - len(source_lines) - 3) // FUNCTION_LINES)):
+        with_error = rng.random() < error_density
+        errors += with_error
+        source_lines += generate_function(rng, index, with_error)
+    source_lines += ["", "def norm(values):", "    return math.sqrt(sum(value * value for value in values))"]
+    return '\n'.join(source_lines) + '\n', errors
+
+
+def generate_corpus(directory, files=20, lines=300, error_density=0.1, seed=0):
+    """
+    Writes the synthetic modules to the directory.
+
+    Parameters:
+    directory (str): The output directory, created if missing.
+    files (int): Number of modules.
+    lines (int): Approximate number of lines of each module.
+    error_density (float): Probability of each function to contain an error.
+    seed (int): Seed of the random generator, the same seed generates the same corpus.
+
+    Returns:
+    tuple: The sorted paths of the written files and the total number of injected errors.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    file_paths = []
+    total_errors = 0
+    for index in range(files):
+        source, errors = generate_module(rng, lines, error_density)
+        file_path = os.path.join(directory, f"module_{index:04d}.py")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        file_paths.append(file_path)
+        total_errors += errors
+    return file_paths, total_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('directory', help="output directory")
+    parser.add_argument('--files', type=int, default=20, help="number of modules")
+    parser.add_argument('--lines', type=int, default=300, help="approximate number of lines of each module")
+    parser.add_argument('--error-density', type=float, default=0.1, help="probability of a function to have an error")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    file_paths, errors = generate_corpus(args.directory, args.files, args.lines, args.error_density, args.seed)
+    print(f"Wrote {len(file_paths)} files with {errors} errors to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
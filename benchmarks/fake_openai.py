@@ -0,0 +1,395 @@
+"""
+Local OpenAI-compatible server for benchmarks, answering the chat completion requests of AIReviewer
+without the real API.
+
+Detection prompts are answered with the lines of the code containing `undefined_`, the marker of the errors
+injected by the corpus generator. Correction prompts are answered with the code block of the prompt.
+The latency and the rate limiting of the server are configurable. The files and batches endpoints
+of the Batch API are supported as well, the batches complete after a configurable delay.
+
+Usage:
+    python benchmarks/fake_openai.py [--port N] [--latency S] [--piece-latency S] [--requests-per-minute N]
+    OPENAI_BASE_URL=http://127.0.0.1:N/v1 OPENAI_API_KEY=fake aireviewer review ...
+"""
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+
+from AIReviewer.code_chunker import estimate_tokens
+
+# Prefix of the user message of the correction prompts
+BLOCK_PREFIX = "THE BLOCK OF CODE: "
+
+# Marker of the injected errors reported by the detection
+ERROR_MARKER = "undefined_"
+
+# Size of the pieces of the streamed completions in characters
+PIECE_SIZE = 16
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI-compatible chat completions server running in a background thread.
+    """
+
+    def __init__(self, port=0, latency=0.05, piece_latency=0.0, requests_per_minute=None, rate_limit_probability=0.0,
+                 retry_after=0.5, batch_latency=0.5, batch_error_probability=0.0):
+        """
+        Initializes the server, it does not listen until started.
+
+        Parameters:
+        port (int): The port to listen on, a free port if 0.
+        latency (float): Seconds before the response of each request.
+        piece_latency (float): Seconds between the pieces of a streamed completion.
+        requests_per_minute (int): Requests allowed in any minute, the rest is rejected with 429. Unlimited if None.
+        rate_limit_probability (float): Probability of rejecting an allowed request with 429 anyway.
+        retry_after (float): Value of the retry-after header of the 429 responses in seconds.
+        batch_latency (float): Seconds before a batch completes.
+        batch_error_probability (float): Probability of a request of a batch failing.
+        """
+        self.port = port
+        self.latency = latency
+        self.piece_latency = piece_latency
+        self.requests_per_minute = requests_per_minute
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.batch_latency = batch_latency
+        self.batch_error_probability = batch_error_probability
+        self.request_times = []
+        self.stats = {'requests': 0, 'rate_limited': 0, 'batch_requests': 0, 'prompt_tokens': 0,
+                      'completion_tokens': 0}
+        self.files = {}
+        self.batches = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        """
+        str: The base URL of the API, the value of `OPENAI_BASE_URL`.
+        """
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        """
+        Starts listening in a background thread.
+
+        Returns:
+        FakeOpenAIServer: The server itself.
+        """
+        handler = type('Handler', (FakeOpenAIHandler,), {'fake': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="fake-openai").start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        """
+        Zeroes the counters of the requests and the tokens.
+        """
+        with self.lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def admit(self) -> bool:
+        """
+        Counts the request and decides whether it is rate limited.
+
+        Returns:
+        bool: True if the request is allowed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.stats['requests'] += 1
+            self.request_times = [t for t in self.request_times if t > now - 60]
+            limited = self.requests_per_minute is not None and len(self.request_times) >= self.requests_per_minute
+            limited = limited or random.random() < self.rate_limit_probability
+            if limited:
+                self.stats['rate_limited'] += 1
+            else:
+                self.request_times.append(now)
+            return not limited
+
+    def count_tokens(self, messages, content):
+        """
+        Adds the estimated tokens of the prompt and the completion to the counters.
+
+        Parameters:
+        messages (list): The messages of the prompt.
+        content (str): The completion.
+
+        Returns:
+        dict: The usage of the completion in the format of the API.
+        """
+        prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+        completion_tokens = estimate_tokens(content)
+        with self.lock:
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['completion_tokens'] += completion_tokens
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+
+    def add_file(self, content, filename, purpose):
+        """
+        Stores an uploaded file.
+
+        Parameters:
+        content (bytes): The content of the file.
+        filename (str): The name of the file.
+        purpose (str): The purpose of the file, e.g. 'batch'.
+
+        Returns:
+        dict: The file object in the format of the API.
+        """
+        file_id = f"file-fake{next(self.ids)}"
+        with self.lock:
+            self.files[file_id] = (content, {
+                'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                'filename': filename, 'purpose': purpose, 'status': 'processed',
+            })
+        return self.files[file_id][1]
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        """
+        Creates a batch, which is processed in a background thread.
+
+        Parameters:
+        input_file_id (str): The uploaded file of the requests.
+        endpoint (str): The endpoint of the requests.
+        completion_window (str): The time frame of the batch.
+
+        Returns:
+        dict: The batch object in the format of the API.
+        """
+        batch_id = f"batch_fake{next(self.ids)}"
+        batch = {
+            'id': batch_id, 'object': 'batch', 'endpoint': endpoint, 'completion_window': completion_window,
+            'input_file_id': input_file_id, 'status': 'validating', 'created_at': int(time.time()),
+            'output_file_id': None, 'error_file_id': None, 'errors': None,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        threading.Thread(target=self.process_batch, args=(batch_id,), daemon=True).start()
+        return batch
+
+    def process_batch(self, batch_id):
+        """
+        Answers the requests of a batch and stores the output and error files.
+
+        Parameters:
+        batch_id (str): The batch.
+        """
+        batch = self.batches[batch_id]
+        requests = [json.loads(line) for line in self.files[batch['input_file_id']][0].decode('utf-8').splitlines()
+                    if line.strip()]
+        with self.lock:
+            batch.update(status='in_progress', in_progress_at=int(time.time()))
+            batch['request_counts']['total'] = len(requests)
+            self.stats['batch_requests'] += len(requests)
+        time.sleep(self.batch_latency)
+
+        outputs = []
+        errors = []
+        for index, request in enumerate(requests):
+            output = {'id': f"batch_req_{index}", 'custom_id': request['custom_id']}
+            if random.random() < self.batch_error_probability:
+                output.update(response={'status_code': 500, 'request_id': f"req_{index}", 'body': {
+                    'error': {'message': "The server had an error processing the request", 'type': 'server_error'}
+                }}, error=None)
+                errors.append(output)
+                continue
+            content = answer(request['body']['messages'])
+            output.update(response={'status_code': 200, 'request_id': f"req_{index}", 'body': {
+                'id': f"chatcmpl-fake{index}", 'object': 'chat.completion', 'created': int(time.time()),
+                'model': request['body']['model'], 'usage': self.count_tokens(request['body']['messages'], content),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+            }}, error=None)
+            outputs.append(output)
+
+        output_file = self.add_file(''.join(json.dumps(output) + '\n' for output in outputs).encode('utf-8'),
+                                    f"{batch_id}_output.jsonl", 'batch_output')
+        error_file = self.add_file(''.join(json.dumps(error) + '\n' for error in errors).encode('utf-8'),
+                                   f"{batch_id}_error.jsonl", 'batch_output') if errors else None
+        with self.lock:
+            batch.update(status='completed', completed_at=int(time.time()), output_file_id=output_file['id'],
+                         error_file_id=error_file['id'] if error_file else None)
+            batch['request_counts'].update(completed=len(outputs), failed=len(errors))
+
+
+def answer(messages):
+    """
+    Creates the completion of the prompt.
+
+    Parameters:
+    messages (list): The messages of the prompt.
+
+    Returns:
+    str: The content of the completion.
+    """
+    user_content = messages[-1]['content']
+    if user_content.startswith(BLOCK_PREFIX):
+        return user_content[len(BLOCK_PREFIX):].split('\nLINE: ')[0]
+    code_lines = user_content.split('\n')[1:]
+    return '\n'.join(f"{line_number} Undefined variable" for line_number, line in enumerate(code_lines, 1)
+                     if ERROR_MARKER in line)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the requests of `FakeOpenAIServer`, the server is the `fake` class attribute.
+    """
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data, headers=()):
+        """
+        Sends a JSON response.
+
+        Parameters:
+        status (int): The HTTP status.
+        data (object): The JSON serializable body.
+        headers (tuple): Additional pairs (name, value) of the headers.
+        """
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_event(self, data):
+        """
+        Sends a server-sent event as a chunk of the response.
+
+        Parameters:
+        data (str): The data of the event.
+        """
+        event = f"data: {data}\n\n".encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+        self.wfile.flush()
+
+    def send_not_found(self):
+        """
+        Sends the error response of an unknown path or object.
+        """
+        self.send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}})
+
+    def do_GET(self):
+        parts = self.path.rstrip('/').split('/')
+        if parts[-1] == 'stats':
+            with self.fake.lock:
+                self.send_json(200, self.fake.stats)
+        elif parts[-2:-1] == ['batches'] and parts[-1] in self.fake.batches:
+            with self.fake.lock:
+                self.send_json(200, self.fake.batches[parts[-1]])
+        elif parts[-3:-2] == ['files'] and parts[-1] == 'content' and parts[-2] in self.fake.files:
+            content = self.fake.files[parts[-2]][0]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif parts[-2:-1] == ['files'] and parts[-1] in self.fake.files:
+            self.send_json(200, self.fake.files[parts[-1]][1])
+        else:
+            self.send_not_found()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        path = self.path.rstrip('/')
+        if path.endswith('/files'):
+            form = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body
+            )
+            fields = {part.get_param('name', header='content-disposition'): part for part in form.iter_parts()}
+            self.send_json(200, self.fake.add_file(fields['file'].get_payload(decode=True),
+                                                   fields['file'].get_filename(), fields['purpose'].get_content()))
+            return
+        body = json.loads(body)
+        if path.endswith('/batches'):
+            self.send_json(200, self.fake.create_batch(body['input_file_id'], body['endpoint'],
+                                                       body['completion_window']))
+            return
+        if not path.endswith('/chat/completions'):
+            self.send_not_found()
+            return
+        if not self.fake.admit():
+            self.send_json(429, {'error': {'message': "Rate limit reached", 'type': 'requests', 'code': None}},
+                           [('retry-after', str(self.fake.retry_after))])
+            return
+
+        time.sleep(self.fake.latency)
+        content = answer(body['messages'])
+        usage = self.fake.count_tokens(body['messages'], content)
+        completion = {'id': 'chatcmpl-fake', 'created': int(time.time()), 'model': body['model']}
+        if not body.get('stream'):
+            self.send_json(200, dict(completion, object='chat.completion', usage=usage, choices=[
+                {'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}
+            ]))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(content), PIECE_SIZE):
+            if start:
+                time.sleep(self.fake.piece_latency)
+            self.send_event(json.dumps(dict(completion, object='chat.completion.chunk', choices=[
+                {'index': 0, 'delta': {'content': content[start:start + PIECE_SIZE]}, 'finish_reason': None}
+            ])))
+        self.send_event(json.dumps(dict(completion, object='chat.completion.chunk', choices=[
+            {'index': 0, 'delta': {}, 'finish_reason': 'stop'}
+        ])))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self.send_event(json.dumps(dict(completion, object='chat.completion.chunk', choices=[], usage=usage)))
+        self.send_event('[DONE]')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible server for benchmarks.")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds before each response")
+    parser.add_argument('--piece-latency', type=float, default=0.0, help="seconds between streamed pieces")
+    parser.add_argument('--requests-per-minute', type=int, help="requests allowed per minute, unlimited by default")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0,
+                        help="probability of rejecting a request with 429")
+    parser.add_argument('--batch-latency', type=float, default=0.5, help="seconds before a batch completes")
+    parser.add_argument('--batch-error-probability', type=float, default=0.0,
+                        help="probability of a request of a batch failing")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.port, args.latency, args.piece_latency, args.requests_per_minute,
+                              args.rate_limit_probability, batch_latency=args.batch_latency,
+                              batch_error_probability=args.batch_error_probability).start()
+    print(f"Listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the import time of the AIReviewer modules with `python -X importtime` and checks it against a budget,
+so the entry points do not start importing the PyLint or OpenAI SDKs again before they are used.
+
+The exit code is 1 if a module takes longer than the budget or imports a forbidden package.
+
+Usage:
+    python benchmarks/import_time.py [--modules M ...] [--budget-ms N] [--forbid P ...] [--repeat N]
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Modules imported on startup of the command line interface and the app before an algorithm is used
+DEFAULT_MODULES = ['AIReviewer.cli', 'AIReviewer.file_parser', 'AIReviewer.batch_review', 'AIReviewer.backends']
+
+# Packages of the backends, imported only when their algorithm is used
+DEFAULT_FORBIDDEN = ['pylint', 'astroid', 'openai']
+
+IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_import(module):
+    """
+    Imports the module in a new interpreter and collects its `-X importtime` report.
+
+    Parameters:
+    module (str): Name of the module, None to measure the startup of the interpreter only.
+
+    Returns:
+    tuple: The cumulative import time of the module in milliseconds and the dict of the cumulative times
+           of the imported top-level packages in milliseconds.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}" if module else 'pass'],
+                            capture_output=True, text=True, check=True)
+    packages = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if match := IMPORT_TIME_RE.match(line):
+            cumulative = int(match.group(2)) / 1000
+            name = match.group(4)
+            if name == module:
+                total = cumulative
+            package = name.split('.')[0]
+            packages[package] = max(packages.get(package, 0.0), cumulative)
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES, help="modules to import")
+    parser.add_argument('--budget-ms', type=float, default=200.0, help="allowed import time of each module")
+    parser.add_argument('--forbid', nargs='*', default=DEFAULT_FORBIDDEN, help="packages the modules may not import")
+    parser.add_argument('--repeat', type=int, default=3, help="imports of each module, the fastest one is reported")
+    args = parser.parse_args()
+
+    # Packages imported by the interpreter itself, e.g. by site customizations, are not attributed to the modules
+    _, startup_packages = measure_import(None)
+    failures = []
+    print(f"{'module':<32}{'import ms':>10}  heaviest packages")
+    for module in args.modules:
+        measurements = [measure_import(module) for _ in range(args.repeat)]
+        total, packages = min(measurements, key=lambda measurement: measurement[0])
+        packages = {package: time for package, time in packages.items()
+                    if package not in startup_packages and package != 'AIReviewer'}
+        heaviest = sorted(((time, package) for package, time in packages.items()), reverse=True)[:3]
+        print(f"{module:<32}{total:>10.1f}  " + ', '.join(f"{package} {time:.1f}" for time, package in heaviest))
+        if total > args.budget_ms:
+            failures.append(f"{module} imports in {total:.1f} ms, the budget is {args.budget_ms:.0f} ms")
+        for package in args.forbid:
+            if package in packages:
+                failures.append(f"{module} imports {package} ({packages[package]:.1f} ms)")
+
+    for failure in failures:
+        print(f"Over budget: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Compares the memory held by an error map of the old tuple format, where every error carries its own copy
+of the code block, with the map of ErrorRecord sharing the lines of the file.
+
+Usage:
+    python benchmarks/memory_error_records.py [--classes N] [--methods N] [--errors-per-line N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from AIReviewer.file_parser import FileParser
+
+
+def generate_source(classes, methods):
+    """
+    Generates a module of large classes.
+
+    Parameters:
+    classes (int): Number of classes.
+    methods (int): Number of methods of each class.
+
+    Returns:
+    str: The source code.
+    """
+    lines = []
+    for class_index in range(classes):
+        lines.append(f"class Generated{class_index}:")
+        for method_index in range(methods):
+            lines += [
+                f"    def method_{method_index}(self, value):",
+                f"        result = value * {method_index} + len(str(value))",
+                "        return result",
+                "",
+            ]
+        lines.append("")
+    return '\n'.join(lines) + '\n'
+
+
+def build_tuple_map(line_numbers):
+    """
+    Converts the error map to the old format with a copy of the code block in every error tuple.
+
+    Parameters:
+    line_numbers (dict): The error map of ErrorRecord.
+
+    Returns:
+    dict: The error map of tuples (code_block, line_number, char_number, error_msg, start_line, end_line).
+    """
+    return {
+        line_number: [
+            (error.code_block, error.line_number, error.char_number, error.error_msg, error.start_line, error.end_line)
+            for error in line_errors
+        ]
+        for line_number, line_errors in line_numbers.items()
+    }
+
+
+def measure(build):
+    """
+    Measures the memory held by the result of the function.
+
+    Parameters:
+    build (callable): Function building the measured structure.
+
+    Returns:
+    tuple: The size in bytes and the structure, which must be kept alive while measuring.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--classes', type=int, default=20, help="number of generated classes")
+    parser.add_argument('--methods', type=int, default=100, help="number of methods of each class")
+    parser.add_argument('--errors-per-line', type=int, default=1, help="number of errors reported on each line")
+    args = parser.parse_args()
+
+    file_content = generate_source(args.classes, args.methods)
+    file_content_lines = file_content.splitlines()
+    # The top-level granularity makes every error carry a whole class, as the first match of `ast.walk` did
+    file_parser = FileParser(None, granularity='top')
+    node_index = file_parser.build_node_index(file_content)
+    errors = [
+        (line_number, 4, f"C0000: Synthetic message {index} (synthetic)")
+        for line_number, line in enumerate(file_content_lines, 1) if line.strip()
+        for index in range(args.errors_per_line)
+    ]
+
+    records_size, line_numbers = measure(lambda: file_parser.build_error_map(errors, file_content_lines, node_index))
+    tuples_size, _ = measure(lambda: build_tuple_map(line_numbers))
+
+    print(f"File: {len(file_content_lines)} lines, {len(file_content) / 1024:.0f} KiB, {len(errors)} errors")
+    print(f"Tuples with code blocks: {tuples_size / 1024 / 1024:10.2f} MiB")
+    print(f"Records sharing lines:   {records_size / 1024 / 1024:10.2f} MiB")
+    print(f"Reduction:               {tuples_size / max(records_size, 1):10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
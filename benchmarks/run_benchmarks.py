@@ -0,0 +1,249 @@
+"""
+Benchmarks the PyLint and OpenAI analysis, the corrections and the batch pipeline on a synthetic corpus,
+with OpenAI replaced by the local fake server, so the results do not depend on the network or the API limits.
+
+Each scenario reports its throughput, the p50 and p95 latency of its items, the peak of the traced memory
+and the tokens sent to the server. With `--baseline`, the results are compared with a previous `--json`
+output and the exit code is 1 if any scenario is slower than the baseline by more than the tolerance.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--files N] [--lines N] [--error-density F] [--latency S]
+                                        [--requests-per-minute N] [--batch-latency S] [--json PATH]
+                                        [--baseline PATH]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    # Not available on Windows, the peak of the traced memory is reported there only
+    import resource
+except ImportError:
+    resource = None
+
+from corpus import generate_corpus
+from fake_openai import FakeOpenAIServer
+
+SCENARIOS = ['pylint', 'openai', 'solver', 'batch']
+
+
+def percentile(values, fraction):
+    """
+    Computes a percentile by the nearest-rank method.
+
+    Parameters:
+    values (list): The measured values.
+    fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+    float: The percentile, 0 for no values.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def run_scenario(name, function, items, concurrency, server):
+    """
+    Runs the function on all items and measures it. The first item is processed once before measuring,
+    so imports and new connections are not measured.
+
+    Parameters:
+    name (str): Name of the scenario.
+    function (callable): Function called with each item.
+    items (list): The items.
+    concurrency (int): Number of items processed at once.
+    server (FakeOpenAIServer): The fake server, its token counters are reset.
+
+    Returns:
+    tuple: The measurements as a dict and the results of the function in the order of the items.
+    """
+    def timed(item):
+        start = time.perf_counter()
+        result = function(item)
+        return time.perf_counter() - start, result
+
+    if items:
+        function(items[0])
+    server.reset_stats()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(timed, items))
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+
+    latencies = [latency for latency, _ in timings]
+    measurements = {
+        'scenario': name,
+        'items': len(items),
+        'seconds': elapsed,
+        'throughput': len(items) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'peak_memory': peak_memory,
+        **server.stats,
+    }
+    return measurements, [result for _, result in timings]
+
+
+def run_benchmarks(args, server):
+    """
+    Generates the corpus and runs the selected scenarios.
+
+    Parameters:
+    args (argparse.Namespace): The command line arguments.
+    server (FakeOpenAIServer): The running fake server.
+
+    Returns:
+    list: The measurements of the scenarios.
+    """
+    # Imported after the environment points the shared transport to the fake server
+    from AIReviewer.file_parser import FileParser
+    from AIReviewer.openai_interface import ErrorsSolver
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        file_paths, errors = generate_corpus(directory, args.files, args.lines, args.error_density, args.seed)
+        print(f"Corpus: {len(file_paths)} files of ~{args.lines} lines, {errors} injected errors", file=sys.stderr)
+
+        if 'pylint' in args.scenarios:
+            measurements, _ = run_scenario(
+                'pylint', lambda path: FileParser(path).get_errors_from_file('PyLint'), file_paths, 1, server
+            )
+            results.append(measurements)
+
+        if 'openai' in args.scenarios or 'solver' in args.scenarios:
+            measurements, error_maps = run_scenario(
+                'openai', lambda path: FileParser(path).get_errors_from_file('OpenAI'), file_paths,
+                args.concurrency, server
+            )
+            if 'openai' in args.scenarios:
+                results.append(measurements)
+
+            if 'solver' in args.scenarios:
+                blocks = [
+                    block_errors for line_numbers in error_maps
+                    for block_errors in FileParser.group_errors_by_block(line_numbers).values()
+                ]
+                errors_solver = ErrorsSolver()
+                measurements, _ = run_scenario(
+                    'solver',
+                    lambda block_errors: errors_solver.get_block_correction(
+                        block_errors[0].code_block,
+                        [(error.line_number, error.char_number, error.error_msg) for error in block_errors]
+                    ),
+                    blocks, args.concurrency, server
+                )
+                results.append(measurements)
+
+        if 'batch' in args.scenarios:
+            # The whole corpus is a single item, reviewed by one detection and one correction batch
+            from AIReviewer.batch_pipeline import BatchPipeline
+            batch_pipeline = BatchPipeline(os.path.join(directory, 'batches'), with_corrections=True,
+                                           poll_interval=0.05)
+            measurements, _ = run_scenario(
+                'batch', lambda paths: batch_pipeline.review(directory, paths, []), [file_paths], 1, server
+            )
+            results.append(measurements)
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares the results with the baseline.
+
+    Parameters:
+    results (list): The measurements of the scenarios.
+    baseline (list): The measurements of a previous run.
+    tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20 %.
+
+    Returns:
+    list: Descriptions of the regressions.
+    """
+    baseline = {measurements['scenario']: measurements for measurements in baseline}
+    regressions = []
+    for measurements in results:
+        if (previous := baseline.get(measurements['scenario'])) is None:
+            continue
+        if measurements['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append(f"{measurements['scenario']}: throughput {measurements['throughput']:.2f}/s, "
+                               f"baseline {previous['throughput']:.2f}/s")
+        if measurements['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append(f"{measurements['scenario']}: p95 {measurements['p95'] * 1000:.1f} ms, "
+                               f"baseline {previous['p95'] * 1000:.1f} ms")
+    return regressions
+
+
+def print_results(results):
+    """
+    Prints the measurements as a table.
+
+    Parameters:
+    results (list): The measurements of the scenarios.
+    """
+    print(f"{'scenario':<10}{'items':>7}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak MiB':>10}"
+          f"{'requests':>10}{'429s':>6}{'prompt tok':>12}{'compl. tok':>12}")
+    for m in results:
+        print(f"{m['scenario']:<10}{m['items']:>7}{m['throughput']:>10.2f}{m['p50'] * 1000:>10.1f}"
+              f"{m['p95'] * 1000:>10.1f}{m['peak_memory'] / 1024 / 1024:>10.1f}{m['requests']:>10}"
+              f"{m['rate_limited']:>6}{m['prompt_tokens']:>12}{m['completion_tokens']:>12}")
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Peak resident memory of the process: {max_rss / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20, help="number of generated modules")
+    parser.add_argument('--lines', type=int, default=300, help="approximate number of lines of each module")
+    parser.add_argument('--error-density', type=float, default=0.1, help="probability of a function to have an error")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the corpus generator")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS, help="scenarios to run")
+    parser.add_argument('--concurrency', type=int, default=8, help="files or blocks processed at once by OpenAI")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds before each response of the server")
+    parser.add_argument('--piece-latency', type=float, default=0.0, help="seconds between streamed pieces")
+    parser.add_argument('--requests-per-minute', type=int, help="requests per minute allowed by the server")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0,
+                        help="probability of the server rejecting a request with 429")
+    parser.add_argument('--batch-latency', type=float, default=0.5, help="seconds before a batch completes")
+    parser.add_argument('--json', metavar='PATH', help="write the measurements as JSON")
+    parser.add_argument('--baseline', metavar='PATH', help="JSON measurements of a previous run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative slowdown against the baseline")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(latency=args.latency, piece_latency=args.piece_latency,
+                              requests_per_minute=args.requests_per_minute,
+                              rate_limit_probability=args.rate_limit_probability,
+                              batch_latency=args.batch_latency).start()
+    os.environ['OPENAI_BASE_URL'] = server.url
+    os.environ['OPENAI_API_KEY'] = 'fake'
+    tracemalloc.start()
+    try:
+        results = run_benchmarks(args, server)
+    finally:
+        tracemalloc.stop()
+        server.stop()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
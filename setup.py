@@ -11,8 +11,10 @@ setup(
     packages=find_packages(),
     package_data={'': ['res/*.exe']},
 
-    install_requires=['openai', 'pylint', 'streamlit', 'streamlit-ace'],
+    python_requires='>=3.11',
+    install_requires=['openai', 'pylint>=3.0,<5', 'streamlit>=1.49', 'streamlit-ace'],
     extras_require={'test': ['pytest-runner', 'pytest', 'TestConfiguration', 'pytest-cov']},
+    entry_points={'console_scripts': ['aireviewer=AIReviewer.cli:main']},
     zip_safe=True,
     test_suite="tests",
 )
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+import json
+import os
+import tempfile
+import unittest
+
+import httpx
+import openai
+
+from AIReviewer.batch_pipeline import SUBMITTED_BATCHES_FILE, BatchPipeline
+from AIReviewer.transport import LLMTransport
+
+REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/batches')
+
+
+class FakeBatchClient:
+    """
+    Client of the files and batches endpoints whose calls fail with connection errors a given number of times.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.uploads = []
+        self.batches = SimpleNamespace(create=self.create_batch, retrieve=self.retrieve_batch)
+        self.files = SimpleNamespace(create=self.create_file, content=self.get_content)
+        self.statuses = {}
+
+    def fail(self):
+        if self.failures:
+            self.failures -= 1
+            raise openai.APIConnectionError(request=REQUEST)
+
+    def create_file(self, file, purpose):
+        self.fail()
+        self.uploads.append(file.read().decode())
+        return SimpleNamespace(id=f'file-{len(self.uploads)}')
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        self.fail()
+        batch_id = f'batch-{input_file_id}'
+        self.statuses[batch_id] = 'in_progress'
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve_batch(self, batch_id):
+        self.fail()
+        if batch_id not in self.statuses:
+            raise openai.NotFoundError("No such batch", response=httpx.Response(404, request=REQUEST), body=None)
+        return SimpleNamespace(id=batch_id, status=self.statuses[batch_id], output_file_id='output', error_file_id=None)
+
+    def get_content(self, file_id):
+        self.fail()
+        body = {'model': 'gpt-4o', 'choices': [{'message': {'content': 'answer'}}]}
+        return SimpleNamespace(text=json.dumps({'custom_id': 'request-1',
+                                                'response': {'status_code': 200, 'body': body}}))
+
+
+class CompletingStatuses(dict):
+    """
+    Statuses of the batches which complete once they are checked.
+    """
+
+    def __getitem__(self, batch_id):
+        status = super().__getitem__(batch_id)
+        self[batch_id] = 'completed'
+        return status
+
+
+class BatchPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.work_dir = directory.name
+        self.requests = [BatchPipeline.create_request('request-1', {'model': 'gpt-4o', 'messages': []})]
+
+    def create_pipeline(self, client, timeout=None):
+        transport = LLMTransport(api_key='test', max_retries=2, max_backoff=0.0)
+        transport.client = client
+        return BatchPipeline(self.work_dir, poll_interval=0.0, timeout=timeout, transport=transport)
+
+    def read_submitted_batches(self):
+        with open(os.path.join(self.work_dir, SUBMITTED_BATCHES_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_transient_errors_are_retried(self):
+        client = FakeBatchClient(failures=2)
+        client.statuses = CompletingStatuses(client.statuses)
+        pipeline = self.create_pipeline(client)
+
+        self.assertEqual(pipeline.run_batches(self.requests, 'detection'), {'request-1': 'answer'})
+        self.assertEqual(len(client.uploads), 1)
+        self.assertEqual(json.loads(client.uploads[0]), self.requests[0])
+        self.assertEqual(self.read_submitted_batches(), {})
+
+    def test_timed_out_batch_is_resumed(self):
+        client = FakeBatchClient()
+        with self.assertRaisesRegex(TimeoutError, 'batch-file-1'):
+            self.create_pipeline(client, timeout=0.0).run_batches(self.requests, 'detection')
+        self.assertEqual(list(self.read_submitted_batches().values()), ['batch-file-1'])
+
+        client.statuses['batch-file-1'] = 'completed'
+        outputs = self.create_pipeline(client).run_batches(self.requests, 'detection')
+
+        self.assertEqual(outputs, {'request-1': 'answer'})
+        self.assertEqual(len(client.uploads), 1)
+        self.assertEqual(self.read_submitted_batches(), {})
+
+    def test_unsuccessful_or_missing_batch_is_submitted_again(self):
+        client = FakeBatchClient()
+        with self.assertRaises(TimeoutError):
+            self.create_pipeline(client, timeout=0.0).run_batches(self.requests, 'detection')
+        client.statuses['batch-file-1'] = 'expired'
+        with self.assertRaisesRegex(TimeoutError, 'batch-file-2'):
+            self.create_pipeline(client, timeout=0.0).run_batches(self.requests, 'detection')
+        del client.statuses['batch-file-2']
+
+        client.statuses = CompletingStatuses(client.statuses)
+        self.assertEqual(self.create_pipeline(client).run_batches(self.requests, 'detection'), {'request-1': 'answer'})
+        self.assertEqual(len(client.uploads), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
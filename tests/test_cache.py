@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from AIReviewer.cache import AnalysisCache, CorrectionCache, DiskCache
+from AIReviewer.error_record import ErrorRecord
+
+
+class Clock:
+    """
+    Replacement of the `time` module of the cache with a manually advanced time.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.clock = Clock()
+        patcher = mock.patch('AIReviewer.cache.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_disk_cache(self, name='cache.sqlite', **kwargs):
+        return DiskCache(os.path.join(self.directory, name), **kwargs)
+
+
+class DiskCacheTest(CacheTestCase):
+
+    def test_round_trip(self):
+        cache = self.create_disk_cache()
+
+        cache.set('key', {'errors': [[1, 0, 'message']]})
+
+        self.assertEqual(cache.get('key'), {'errors': [[1, 0, 'message']]})
+        self.assertIsNone(cache.get('other'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        # Each value takes 12 bytes as JSON, two of them fit
+        cache = self.create_disk_cache(max_bytes=30)
+        cache.set('a', 'a' * 10)
+        self.clock.now += 1
+        cache.set('b', 'b' * 10)
+        self.clock.now += 1
+        cache.get('a')
+        self.clock.now += 1
+
+        cache.set('c', 'c' * 10)
+
+        self.assertEqual(cache.get('a'), 'a' * 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'c' * 10)
+
+    def test_expired_entries_are_missing(self):
+        cache = self.create_disk_cache(ttl=60)
+        cache.set('old', 1)
+        self.clock.now += 30
+        cache.set('new', 2)
+        self.clock.now += 31
+
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(cache.get('new'), 2)
+
+    def test_invalidate_tag(self):
+        cache = self.create_disk_cache()
+        cache.set('a', 1, tag='/src/a.py')
+        cache.set('b', 2, tag='/src/b.py')
+
+        self.assertEqual(cache.invalidate_tag('/src/a.py'), 1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+
+
+class AnalysisCacheTest(CacheTestCase):
+
+    def test_error_map_round_trip(self):
+        cache = AnalysisCache(os.path.join(self.directory, 'analysis.sqlite'))
+        lines = ['def f():', '    return x']
+        errors = {2: [ErrorRecord(2, 11, "Undefined variable 'x'", 0, 1, lines)]}
+        key = cache.make_key('\n'.join(lines), 'PyLint', 'pylint=4')
+
+        cache.set_errors(key, errors, '/src/f.py')
+
+        self.assertEqual(cache.get_errors(key, lines), errors)
+        self.assertEqual(cache.get_errors(key, lines)[2][0].code_block, 'def f():\n    return x')
+
+    def test_key_depends_on_content_algorithm_and_fingerprint(self):
+        key = AnalysisCache.make_key('x = 1', 'PyLint', 'pylint=4')
+
+        self.assertEqual(key, AnalysisCache.make_key('x = 1', 'PyLint', 'pylint=4'))
+        self.assertNotEqual(key, AnalysisCache.make_key('x = 2', 'PyLint', 'pylint=4'))
+        self.assertNotEqual(key, AnalysisCache.make_key('x = 1', 'OpenAI', 'pylint=4'))
+        self.assertNotEqual(key, AnalysisCache.make_key('x = 1', 'PyLint', 'pylint=3'))
+
+
+class CorrectionCacheTest(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = CorrectionCache(self.create_disk_cache(), memory_size=2)
+
+    def test_concurrent_requests_are_coalesced(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(threading.get_ident())
+            started.set()
+            release.wait(5)
+            return 'fixed'
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(self.cache.get_or_compute, 'key', compute)
+            self.assertTrue(started.wait(5))
+            others = [executor.submit(self.cache.get_or_compute, 'key', compute) for _ in range(3)]
+            time.sleep(0.05)
+            release.set()
+            results = [future.result(5) for future in [first] + others]
+
+        self.assertEqual(results, ['fixed'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.disk_cache.get('key'), 'fixed')
+        self.assertEqual(self.cache.in_flight, {})
+
+    def test_failed_computation_is_not_cached(self):
+        def fail():
+            raise RuntimeError("API error")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute('key', fail)
+
+        self.assertEqual(self.cache.in_flight, {})
+        self.assertEqual(self.cache.get_or_compute('key', lambda: 'fixed'), 'fixed')
+
+    def test_memory_tier_falls_back_to_disk(self):
+        for key in ['a', 'b', 'c']:
+            self.cache.set(key, key.upper())
+
+        self.assertEqual(list(self.cache.memory_cache), ['b', 'c'])
+        self.assertEqual(self.cache.get('a'), 'A')
+        self.assertEqual(list(self.cache.memory_cache), ['c', 'a'])
+        self.assertEqual(self.cache.get_or_compute('b', lambda: self.fail("computed a cached value")), 'B')
+
+    def test_invalidate_tag_clears_both_tiers(self):
+        self.cache.set('a', 'A', tag='/src/a.py')
+        self.cache.set('b', 'B', tag='/src/b.py')
+
+        self.cache.invalidate_tag('/src/a.py')
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 'B')
+
+    def test_invalidate_tag_clears_values_loaded_from_disk(self):
+        loaders = {
+            'get': self.cache.get,
+            'get_or_compute': lambda key: self.cache.get_or_compute(key, lambda: self.fail("computed a cached value")),
+        }
+        for name, load in loaders.items():
+            with self.subTest(name):
+                self.cache.set('a', 'A', tag='/src/a.py')
+                self.cache.set('b', 'B', tag='/src/b.py')
+                self.cache.set('c', 'C', tag='/src/b.py')
+                self.assertNotIn('a', self.cache.memory_cache)
+
+                self.assertEqual(load('a'), 'A')
+                self.cache.invalidate_tag('/src/a.py')
+
+                self.assertNotIn('a', self.cache.memory_cache)
+                self.assertIsNone(self.cache.get('a'))
+
+    def test_key_ignores_whitespace_differences(self):
+        messages = [{'role': 'user', 'content': 'def f():\r\n    return x   \r\n'}]
+        normalized = [{'role': 'user', 'content': 'def f():\n    return x'}]
+
+        self.assertEqual(CorrectionCache.make_key('gpt-4o', messages), CorrectionCache.make_key('gpt-4o', normalized))
+        self.assertNotEqual(CorrectionCache.make_key('gpt-4o', messages),
+                            CorrectionCache.make_key('gpt-4o-mini', messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import ast
+import unittest
+
+from AIReviewer.code_chunker import build_fragment, remap_detection, split_changed_nodes, split_into_chunks
+
+MODULE = '''import os
+
+try:
+    import json
+except ImportError:
+    json = None
+
+
+class Reader:
+    """Reader."""
+
+    def read(self, path):
+        return json.load(open(os.path.join(path, 'data.json')))
+
+
+def main():
+    return Reader().read(os.getcwd())
+'''
+
+
+class BuildFragmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = ast.parse(MODULE)
+        self.lines = MODULE.splitlines()
+
+    def get_mapped_lines(self, fragment):
+        fragment_lines = fragment.content.splitlines()
+        return {line: fragment_lines[index] for index, line in enumerate(fragment.line_map) if line is not None}
+
+    def test_method_fragment_keeps_its_class(self):
+        fragment = build_fragment(self.tree, self.lines, 12, 13)
+
+        self.assertEqual(self.get_mapped_lines(fragment), {12: self.lines[11], 13: self.lines[12]})
+        fragment_tree = ast.parse(fragment.content)
+        self.assertEqual([type(node) for node in fragment_tree.body],
+                         [ast.Import, ast.ImportFrom, ast.ClassDef])
+        self.assertEqual([alias.name for alias in fragment_tree.body[1].names], ['json', 'main'])
+
+    def test_function_fragment(self):
+        fragment = build_fragment(self.tree, self.lines, 16, 17)
+
+        self.assertEqual(self.get_mapped_lines(fragment), {16: 'def main():', 17: self.lines[16]})
+        self.assertIn('from _aireviewer_context import (Reader, json)', fragment.content)
+
+    def test_block_nested_in_function_is_not_a_fragment(self):
+        with self.assertRaises(ValueError):
+            build_fragment(self.tree, self.lines, 13, 13)
+
+    def test_import_block_is_not_a_fragment(self):
+        with self.assertRaises(ValueError):
+            build_fragment(self.tree, self.lines, 1, 1)
+
+    def test_try_block_with_imports_is_not_a_fragment(self):
+        with self.assertRaises(ValueError):
+            build_fragment(self.tree, self.lines, 3, 6)
+
+
+class SplitIntoChunksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = 'import os\nimport sys\n\n' + '\n\n'.join(
+            f"def function_{index}():\n    return os.path.join(sys.prefix, 'value_{index}')" for index in range(10)
+        ) + '\n'
+        self.lines = self.content.splitlines()
+
+    def test_every_line_is_mapped_once(self):
+        chunks = split_into_chunks(self.content, 60)
+
+        self.assertGreater(len(chunks), 1)
+        mapped = []
+        for chunk in chunks:
+            chunk_lines = chunk.content.splitlines()
+            self.assertEqual(len(chunk_lines), len(chunk.line_map))
+            self.assertEqual(chunk_lines[:2], ['import os', 'import sys'])
+            for chunk_line, line in zip(chunk_lines, chunk.line_map):
+                if line is not None:
+                    self.assertEqual(chunk_line, self.lines[line - 1])
+                    mapped.append(line)
+        self.assertEqual(sorted(mapped), list(range(1, len(self.lines) + 1)))
+
+    def test_header_errors_are_taken_from_the_first_chunk(self):
+        chunks = split_into_chunks(self.content, 60)
+
+        self.assertEqual(chunks[0].line_map[:2], [1, 2])
+        self.assertTrue(all(chunk.line_map[:2] == [None, None] for chunk in chunks[1:]))
+
+    def test_single_chunk_within_the_budget(self):
+        chunks = split_into_chunks(self.content, 10000)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].content, self.content.rstrip('\n'))
+
+    def test_changed_nodes(self):
+        chunks = split_changed_nodes(self.content, {5, 13}, None)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual([line for line in chunks[0].line_map if line is not None], [4, 5, 13, 14])
+        self.assertEqual(split_changed_nodes(self.content, {3}, None), [])
+
+
+class RemapDetectionTest(unittest.TestCase):
+
+    def test_remap(self):
+        detection = "1 Unused import\n2 Undefined variable\nNo line number\n3 Ignored line\n9 Out of range\n"
+
+        self.assertEqual(remap_detection(detection, [None, 12, None]), ['12 Undefined variable'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+from AIReviewer.file_catalog import FileCatalog, IgnoreRules
+
+
+def create_rules(*files):
+    """
+    Creates the rules of .gitignore files.
+
+    Parameters:
+    *files: Tuples (base, lines) of the directory of a .gitignore file relative to the root and its lines.
+
+    Returns:
+    IgnoreRules: The rules.
+    """
+    rules = IgnoreRules()
+    for base, lines in files:
+        rules.patterns += [pattern for line in lines if (pattern := IgnoreRules.parse_pattern(line, base))]
+    return rules
+
+
+class IgnoreRulesTest(unittest.TestCase):
+
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        rules = create_rules(('', ['*.gen.py', '# comment', '']))
+
+        self.assertTrue(rules.is_ignored('a.gen.py', False))
+        self.assertTrue(rules.is_ignored('pkg/sub/a.gen.py', False))
+        self.assertFalse(rules.is_ignored('pkg/a.py', False))
+
+    def test_anchored_pattern(self):
+        rules = create_rules(('', ['/build.py', 'docs/conf.py']))
+
+        self.assertTrue(rules.is_ignored('build.py', False))
+        self.assertFalse(rules.is_ignored('pkg/build.py', False))
+        self.assertTrue(rules.is_ignored('docs/conf.py', False))
+        self.assertFalse(rules.is_ignored('pkg/docs/conf.py', False))
+
+    def test_directory_only_pattern(self):
+        rules = create_rules(('', ['generated/']))
+
+        self.assertTrue(rules.is_ignored('pkg/generated', True))
+        self.assertFalse(rules.is_ignored('pkg/generated', False))
+
+    def test_last_matching_pattern_decides(self):
+        rules = create_rules(('', ['*.py', '!keep.py', r'\!bang.py']))
+
+        self.assertTrue(rules.is_ignored('other.py', False))
+        self.assertFalse(rules.is_ignored('pkg/keep.py', False))
+        self.assertTrue(rules.is_ignored('!bang.py', False))
+
+    def test_wildcards(self):
+        rules = create_rules(('', ['a/**/z.py', 'test_?.py', 'mod[!0-9].py']))
+
+        self.assertTrue(rules.is_ignored('a/z.py', False))
+        self.assertTrue(rules.is_ignored('a/b/c/z.py', False))
+        self.assertTrue(rules.is_ignored('test_1.py', False))
+        self.assertFalse(rules.is_ignored('test_12.py', False))
+        self.assertTrue(rules.is_ignored('modx.py', False))
+        self.assertFalse(rules.is_ignored('mod1.py', False))
+
+    def test_nested_file_applies_to_its_directory(self):
+        rules = create_rules(('', ['*.tmp.py']), ('pkg', ['/local.py', '!important.tmp.py']))
+
+        self.assertTrue(rules.is_ignored('pkg/local.py', False))
+        self.assertFalse(rules.is_ignored('local.py', False))
+        self.assertFalse(rules.is_ignored('pkg/important.tmp.py', False))
+        self.assertTrue(rules.is_ignored('important.tmp.py', False))
+
+
+class FileCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.write('.gitignore', 'ignored/\n')
+        self.write('a.py', 'A = 1\n')
+        self.write('pkg/b.py', 'B = 1\n')
+        self.write('ignored/c.py', 'C = 1\n')
+
+    def write(self, relative_path, content, mtime=None):
+        path = os.path.join(self.root, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_refresh_reports_changed_content_only(self):
+        catalog = FileCatalog(self.root)
+        changes = []
+        catalog.subscribe(changes.extend)
+        self.assertEqual(catalog.files(), ['a.py', 'pkg/b.py'])
+
+        self.write('a.py', 'A = 2\n', mtime=1)
+        self.write('pkg/b.py', 'B = 1\n', mtime=1)
+        os.remove(os.path.join(self.root, 'pkg', 'b.py'))
+        self.write('d.py', 'D = 1\n')
+        catalog.refresh()
+
+        self.assertEqual(sorted((change.kind, change.path) for change in changes),
+                         [('added', 'd.py'), ('modified', 'a.py'), ('removed', 'pkg/b.py')])
+        self.assertEqual(catalog.files(), ['a.py', 'd.py'])
+
+    def test_touched_file_is_not_reported(self):
+        catalog = FileCatalog(self.root)
+
+        self.write('a.py', 'A = 1\n', mtime=1)
+
+        self.assertEqual(catalog.refresh(), [])
+        self.assertEqual(catalog.get('a.py').mtime, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from AIReviewer.file_editor import apply_changes_to_file, find_overlapping_changes
+
+MODULE = '''def first():
+    return 1
+
+
+def second():
+    return 2
+
+
+def third():
+    return 3
+'''
+
+
+class ApplyChangesToFileTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.file_path = os.path.join(self.directory, 'module.py')
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write(MODULE)
+
+    def read(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_changes_refer_to_the_original_lines(self):
+        new_content = apply_changes_to_file(self.file_path, [
+            (0, 1, 'def first():\n    """First."""\n    return 1'),
+            (8, 9, 'def third():\n    return 30'),
+            (4, 5, 'def second():\n    x = 2\n    y = 0\n    return x + y'),
+        ])
+
+        self.assertEqual(new_content, self.read())
+        self.assertEqual(new_content, '''def first():
+    """First."""
+    return 1
+
+
+def second():
+    x = 2
+    y = 0
+    return x + y
+
+
+def third():
+    return 30
+''')
+
+    def test_overlapping_changes_are_rejected(self):
+        changes = [(0, 1, 'def first():\n    return 10'), (1, 5, 'pass')]
+
+        self.assertEqual(find_overlapping_changes(changes), [(changes[0], changes[1])])
+        with self.assertRaises(ValueError):
+            apply_changes_to_file(self.file_path, changes)
+        self.assertEqual(self.read(), MODULE)
+
+    def test_broken_result_is_not_written(self):
+        with self.assertRaises(SyntaxError):
+            apply_changes_to_file(self.file_path, [(4, 5, 'def second(:\n    return 2')])
+
+        self.assertEqual(self.read(), MODULE)
+        self.assertEqual(os.listdir(self.directory), ['module.py'])
+
+    def test_file_mode_is_kept(self):
+        os.chmod(self.file_path, 0o640)
+
+        apply_changes_to_file(self.file_path, [(0, 1, 'def first():\n    return 10')])
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.file_path).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.directory), ['module.py'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import tempfile
+import unittest
+
+from AIReviewer.cache import AnalysisCache
+from AIReviewer.file_parser import FileParser
+from AIReviewer.job_manager import JobManager
+
+MODULE = '''"""Module."""
+import os
+import sys
+
+
+def main():
+    """Main."""
+    return os.getcwd(), sys.argv
+
+
+def broken():
+    """Broken."""
+    return undefined_name
+'''
+
+
+def get_messages(line_numbers):
+    """
+    Lists the errors of an error map.
+
+    Parameters:
+    line_numbers (dict): The errors as returned by `FileParser.get_errors_from_file`.
+
+    Returns:
+    list: Sorted tuples (line_number, error_msg).
+    """
+    return sorted((line_number, error.error_msg) for line_number, line_errors in line_numbers.items()
+                  for error in line_errors)
+
+
+class UpdateErrorsAfterChangesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'module.py')
+        self.write(MODULE)
+        self.file_parser = FileParser(self.file_path)
+
+    def write(self, content):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def replace_block(self, line_numbers, start, end, new_block):
+        lines = MODULE.split('\n')
+        self.write('\n'.join(lines[:start] + new_block.split('\n') + lines[end + 1:]))
+        return self.file_parser.update_errors_after_change(line_numbers, 'PyLint', start, end, new_block)
+
+    def test_changed_import_block_matches_full_analysis(self):
+        line_numbers = self.file_parser.get_errors_from_file('PyLint')
+
+        updated = self.replace_block(line_numbers, 1, 1, 'import os  # noqa')
+
+        self.assertEqual(get_messages(updated), get_messages(self.file_parser.get_errors_from_file('PyLint')))
+        self.assertFalse(any('import' in error_msg for _, error_msg in get_messages(updated)))
+
+    def test_changed_function_keeps_errors_of_other_blocks(self):
+        line_numbers = self.file_parser.get_errors_from_file('PyLint')
+        self.assertIn(13, line_numbers)
+
+        new_block = 'def main():\n    """Main."""\n\n    return os.getcwd(), sys.argv'
+        updated = self.replace_block(line_numbers, 5, 7, new_block)
+
+        self.assertEqual(get_messages(updated), get_messages(self.file_parser.get_errors_from_file('PyLint')))
+        self.assertIn(14, updated)
+
+    def test_unused_imports_are_recomputed_for_the_whole_file(self):
+        line_numbers = self.file_parser.get_errors_from_file('PyLint')
+
+        # The only use of sys is removed, the import is outside of the changed block
+        updated = self.replace_block(line_numbers, 5, 7, 'def main():\n    """Main."""\n    return os.getcwd()')
+        self.assertEqual(get_messages(updated), get_messages(self.file_parser.get_errors_from_file('PyLint')))
+        self.assertIn((3, 'W0611: Unused import sys (unused-import)'), get_messages(updated))
+
+        # The use is added back, the unused import is not reported anymore
+        updated = self.replace_block(updated, 5, 7, 'def main():\n    """Main."""\n    return os.getcwd(), sys.argv')
+        self.assertEqual(get_messages(updated), get_messages(self.file_parser.get_errors_from_file('PyLint')))
+        self.assertNotIn(3, updated)
+
+
+class PackageFragmentTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.package = os.path.join(directory.name, 'pkg')
+        os.mkdir(self.package)
+        self.write('__init__.py', '')
+        self.write('util.py', '"""Util."""\n\n\ndef present():\n    """Present."""\n')
+        self.write('mod.py', '"""Module."""\nfrom . import util\n\n\ndef main():\n    """Main."""\n'
+                             '    return util.present()\n')
+        self.file_parser = FileParser(os.path.join(self.package, 'mod.py'))
+
+    def write(self, name, content):
+        with open(os.path.join(self.package, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_fragment_resolves_relative_imports(self):
+        line_numbers = self.file_parser.get_errors_from_file('PyLint')
+        self.assertEqual(line_numbers, {})
+
+        self.write('mod.py', '"""Module."""\nfrom . import util\n\n\ndef main():\n    """Main."""\n'
+                             '    return util.missing_name()\n')
+        updated = self.file_parser.update_errors_after_change(
+            line_numbers, 'PyLint', 4, 6, 'def main():\n    """Main."""\n    return util.missing_name()')
+
+        self.assertEqual(get_messages(updated), get_messages(self.file_parser.get_errors_from_file('PyLint')))
+        self.assertEqual([error_msg.partition(':')[0] for _, error_msg in get_messages(updated)], ['E1101'])
+        self.assertEqual(sorted(os.listdir(self.package)), ['__init__.py', 'mod.py', 'util.py'])
+
+
+class SyntaxErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_path = os.path.join(directory.name, 'module.py')
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write('"""Module."""\n\n\ndef g(:\n    return 1\n')
+        self.file_parser = FileParser(file_path)
+
+    def assert_syntax_error(self, line_numbers):
+        self.assertEqual(list(line_numbers), [4])
+        error = line_numbers[4][0]
+        self.assertTrue(error.error_msg.startswith('E0001:'))
+        self.assertEqual(error.code_block, 'def g(:')
+
+    def test_syntax_error_is_reported_by_pylint(self):
+        self.assert_syntax_error(self.file_parser.get_errors_from_file('PyLint'))
+
+    def test_syntax_error_is_reported_without_openai_request(self):
+        self.assert_syntax_error(self.file_parser.get_errors_from_file('OpenAI'))
+
+
+class StartTieredAnalysisTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'module.py')
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write('"""Module."""\nimport os\n\n\ndef f():\n    return undefined_name\n')
+        self.cache = AnalysisCache(os.path.join(directory.name, 'analysis.sqlite'))
+        self.job_manager = JobManager({'analysis': 1})
+        self.addCleanup(self.job_manager.shutdown)
+
+    def test_reopened_file_shows_the_merged_errors(self):
+        # With restricted checks, PyLint does not report the errors of the fast checks
+        file_parser = FileParser(self.file_path, cache=self.cache, pylint_checks=['missing-function-docstring'])
+        _, job = file_parser.start_tiered_analysis('PyLint', job_manager=self.job_manager)
+        merged = job.result(60)
+        self.assertEqual([error_msg.partition(':')[0] for _, error_msg in get_messages(merged)],
+                         ['W0611', 'C0116', 'E0602'])
+
+        line_numbers, job = file_parser.start_tiered_analysis('PyLint', job_manager=self.job_manager)
+
+        self.assertIsNone(job)
+        self.assertEqual(get_messages(line_numbers), get_messages(merged))
+
+
+if __name__ == '__main__':
+    unittest.main()
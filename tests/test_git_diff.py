@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from AIReviewer.git_diff import get_changed_lines, parse_diff, unquote_path
+
+DIFF = '''diff --git a/pkg/module.py b/pkg/module.py
+index 1111111..2222222 100644
+--- a/pkg/module.py
++++ b/pkg/module.py
+@@ -3 +3 @@ def f():
+-    return 1
++    return 2
+@@ -10,0 +11,2 @@ def g():
++    x = 1
++    return x
+@@ -20,2 +22,0 @@ def h():
+-    y = 1
+-    return y
+diff --git a/removed.py b/removed.py
+deleted file mode 100644
+--- a/removed.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-import os
+-print(os.name)
+diff --git a/sub/sp ace.py b/sub/sp ace.py
+--- a/sub/sp ace.py\t
++++ b/sub/sp ace.py\t
+@@ -1 +1 @@
+-A = 1
++A = 2
+diff --git "a/sub/quo\\"te.py" "b/sub/quo\\"te.py"
+--- "a/sub/quo\\"te.py"
++++ "b/sub/quo\\"te.py"
+@@ -0,0 +1 @@
++B = 1
+diff --git "a/\\305\\276lut\\303\\275.py" "b/\\305\\276lut\\303\\275.py"
+--- "a/\\305\\276lut\\303\\275.py"
++++ "b/\\305\\276lut\\303\\275.py"
+@@ -2,0 +3 @@
++C = 1
+'''
+
+
+class ParseDiffTest(unittest.TestCase):
+
+    def test_changed_lines(self):
+        changed_lines = parse_diff(DIFF)
+
+        self.assertEqual(changed_lines['pkg/module.py'], {3, 11, 12, 22, 23})
+        self.assertNotIn('removed.py', changed_lines)
+        self.assertNotIn('/dev/null', changed_lines)
+
+    def test_paths_with_special_characters(self):
+        changed_lines = parse_diff(DIFF)
+
+        self.assertEqual(changed_lines['sub/sp ace.py'], {1})
+        self.assertEqual(changed_lines['sub/quo"te.py'], {1})
+        self.assertEqual(changed_lines['žlutý.py'], {3})
+        self.assertEqual(len(changed_lines), 4)
+
+    def test_unquote_path(self):
+        self.assertEqual(unquote_path('plain.py'), 'plain.py')
+        self.assertEqual(unquote_path('"tab\\there.py"'), 'tab\there.py')
+        self.assertEqual(unquote_path('"back\\\\slash.py"'), 'back\\slash.py')
+        self.assertEqual(unquote_path('"\\303\\251.py"'), 'é.py')
+
+
+@unittest.skipIf(shutil.which('git') is None, "git is not installed")
+class GetChangedLinesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.git('init', '-q')
+        for path in ['plain.py', 'sp ace.py', 'quo"te.py', 'žlutý.py']:
+            self.write(path, 'A = 1\nB = 1\n')
+        self.git('add', '.')
+        self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'base')
+
+    def git(self, *args):
+        subprocess.run(['git', '-C', self.root, *args], check=True, capture_output=True)
+
+    def write(self, relative_path, content):
+        with open(os.path.join(self.root, relative_path), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_changed_and_untracked_files_with_special_names(self):
+        for path in ['sp ace.py', 'quo"te.py', 'žlutý.py']:
+            self.write(path, 'A = 1\nB = 2\n')
+        self.write('new file.py', 'C = 1\n')
+
+        changed_lines = get_changed_lines(self.root, 'HEAD')
+
+        expected = {os.path.abspath(os.path.join(self.root, path)): {2}
+                    for path in ['sp ace.py', 'quo"te.py', 'žlutý.py']}
+        expected[os.path.abspath(os.path.join(self.root, 'new file.py'))] = None
+        self.assertEqual(changed_lines, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
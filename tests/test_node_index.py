@@ -0,0 +1,99 @@
+import ast
+import unittest
+
+from AIReviewer.node_index import GRANULARITIES, NodeIndex, node_start_line
+
+MODULE = '''import os
+
+CONSTANT = 1
+
+
+@decorator
+class Shape:
+    """Shape."""
+
+    sides = 0
+
+    def area(self):
+        if self.sides:
+            return 0
+        return 1
+
+    @property
+    def name(self):
+        return 'shape'
+
+
+def main():
+    def helper():
+        return os.getcwd()
+
+    for _ in range(3):
+        helper()
+
+# A trailing comment
+'''
+
+
+def find_linear(tree, granularity, line_number):
+    """
+    Finds the innermost indexed node enclosing the line by scanning all indexed nodes.
+
+    Parameters:
+    tree (ast.Module): The parsed module.
+    granularity (str): Which nodes are indexed.
+    line_number (int): The line number (1-based).
+
+    Returns:
+    ast.AST: The innermost enclosing node, or None.
+    """
+    spans = NodeIndex._collect_spans(tree, granularity)
+    enclosing = [span for span in spans if span.start <= line_number <= span.end]
+    if not enclosing:
+        return None
+    return min(enclosing, key=lambda span: span.end - span.start).node
+
+
+class NodeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = ast.parse(MODULE)
+        self.line_count = len(MODULE.splitlines())
+
+    def test_matches_linear_scan(self):
+        for granularity in GRANULARITIES:
+            node_index = NodeIndex(self.tree, granularity)
+            for line_number in range(1, self.line_count + 2):
+                with self.subTest(granularity=granularity, line_number=line_number):
+                    span = node_index.find(line_number)
+                    self.assertIs(span.node if span else None, find_linear(self.tree, granularity, line_number))
+
+    def test_def_granularity(self):
+        node_index = NodeIndex(self.tree, 'def')
+
+        self.assertEqual(node_index.find(3).node.targets[0].id, 'CONSTANT')
+        self.assertEqual(node_index.find(14).node.name, 'area')
+        self.assertEqual(node_index.find(24).node.name, 'helper')
+        self.assertEqual(node_index.find(27).node.name, 'main')
+        self.assertIsNone(node_index.find(2))
+        self.assertIsNone(node_index.find(29))
+
+    def test_decorators_belong_to_the_node(self):
+        node_index = NodeIndex(self.tree, 'def')
+
+        self.assertEqual(node_index.find(6).node.name, 'Shape')
+        self.assertEqual(node_index.find(6).start, 6)
+        self.assertEqual(node_index.find(17).node.name, 'name')
+        self.assertEqual(node_start_line(node_index.find(19).node), 17)
+
+    def test_statement_and_top_granularity(self):
+        self.assertIsInstance(NodeIndex(self.tree, 'statement').find(14).node, ast.Return)
+        self.assertEqual(NodeIndex(self.tree, 'top').find(14).node.name, 'Shape')
+
+    def test_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            NodeIndex(self.tree, 'module')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+from AIReviewer.error_record import ErrorRecord
+from AIReviewer.job_manager import JobManager
+from AIReviewer.prefetcher import CorrectionPrefetcher
+
+
+class FakeSolver:
+    """
+    Solver streaming a fixed correction once it is released, counting the requests.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def stream_block_correction(self, code_block, errors, tag=None):
+        self.requests.append(code_block)
+        self.started.set()
+        self.release.wait(5)
+        yield code_block.replace('undefined_name', 'None')
+
+
+class CorrectionPrefetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.job_manager = JobManager({'correction': 2})
+        self.addCleanup(self.job_manager.shutdown)
+        self.solver = FakeSolver()
+        lines = ['def f():', '    return undefined_name']
+        self.blocks = {(0, 1): [ErrorRecord(2, 11, "Undefined variable 'undefined_name'", 0, 1, lines)]}
+
+    def test_replacing_prefetcher_keeps_running_jobs(self):
+        previous = CorrectionPrefetcher(self.solver, self.job_manager)
+        previous.start(self.blocks)
+        self.assertTrue(self.solver.started.wait(5))
+
+        prefetcher = CorrectionPrefetcher(self.solver, self.job_manager)
+        prefetcher.start(self.blocks)
+        previous.close()
+        self.solver.release.set()
+
+        self.assertEqual(prefetcher.get_correction((0, 1)), 'def f():\n    return None')
+        self.assertEqual(len(self.solver.requests), 1)
+
+    def test_closing_last_owner_cancels_the_job(self):
+        prefetcher = CorrectionPrefetcher(self.solver, self.job_manager)
+        prefetcher.start(self.blocks)
+        job = prefetcher.get_job((0, 1))
+
+        prefetcher.close()
+
+        self.assertTrue(job.cancelled.is_set())
+        self.solver.release.set()
+
+    def test_provisional_errors_are_not_prefetched(self):
+        lines = ['def f():', '    return undefined_name', 'def g():', '    return undefined_name']
+        blocks = {
+            (0, 1): [ErrorRecord(2, 11, "Undefined variable 'undefined_name'", 0, 1, lines)],
+            (2, 3): [ErrorRecord(4, 11, "Undefined variable 'undefined_name'", 2, 3, lines)],
+        }
+        prefetcher = CorrectionPrefetcher(self.solver, self.job_manager, lookahead=0)
+        self.addCleanup(prefetcher.close)
+
+        prefetcher.start(blocks, prefetch=False)
+        self.assertEqual(prefetcher.jobs, {})
+
+        prefetcher.get_job((2, 3))
+        self.assertEqual(list(prefetcher.jobs), [(2, 3)])
+        self.solver.release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()